@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# BFit is a Python library for fitting a convex sum of Gaussian
+# functions to any probability distribution
+#
+# Copyright (C) 2020- The QC-Devs Community
+#
+# This file is part of BFit.
+#
+# BFit is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# BFit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+# ---
+r"""Benchmarks of BFit.
+
+The benchmarks follow the conventions of airspeed velocity (asv): each class has the
+attributes `params` & `param_names`, a `setup` method, and `time_*` (or `peakmem_*`) methods
+that are measured. They can be run with asv using the current Python environment (no network
+is needed) or with the simple runner of this package::
+
+    asv run --python=same --quick
+    python -m benchmarks [--quick] [name-filter]
+
+"""
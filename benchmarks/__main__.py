@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# BFit is a Python library for fitting a convex sum of Gaussian
+# functions to any probability distribution
+#
+# Copyright (C) 2020- The QC-Devs Community
+#
+# This file is part of BFit.
+#
+# BFit is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# BFit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+# ---
+r"""Run the benchmarks without asv, printing the time of each benchmark and parameter."""
+
+import argparse
+import importlib
+import itertools
+import os
+import timeit
+
+
+def _benchmark_classes():
+    r"""Yield the name & class of each benchmark suite in this package."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for file_name in sorted(os.listdir(directory)):
+        if file_name.startswith("bench_") and file_name.endswith(".py"):
+            module = importlib.import_module("benchmarks." + file_name[:-3])
+            for name in sorted(dir(module)):
+                obj = getattr(module, name)
+                if isinstance(obj, type) and obj.__module__ == module.__name__:
+                    yield module.__name__.split(".")[-1] + "." + name, obj
+
+
+def _params(suite):
+    r"""Return the list of parameter combinations of a benchmark suite."""
+    params = getattr(suite, "params", [])
+    if not params:
+        return [()]
+    if not isinstance(params[0], (list, tuple)):
+        params = [params]
+    return list(itertools.product(*params))
+
+
+def main(args=None):
+    r"""Run the benchmarks whose name contains the filter and print their timings."""
+    parser = argparse.ArgumentParser(description="Run BFit benchmarks without asv.")
+    parser.add_argument("filter", nargs="?", default="", help="Run benchmarks containing this.")
+    parser.add_argument("--quick", action="store_true", help="Run each benchmark only once.")
+    args = parser.parse_args(args)
+
+    for suite_name, suite in _benchmark_classes():
+        methods = [m for m in sorted(dir(suite)) if m.startswith("time_")]
+        for method, param in itertools.product(methods, _params(suite)):
+            name = f"{suite_name}.{method}"
+            if args.filter not in name:
+                continue
+            bench = suite()
+            if hasattr(bench, "setup"):
+                bench.setup(*param)
+            func = getattr(bench, method)
+            if args.quick:
+                timing = timeit.timeit(lambda: func(*param), number=1)
+            else:
+                number = max(1, int(0.2 / max(timeit.timeit(lambda: func(*param), number=1),
+                                              1e-6)))
+                timing = min(timeit.repeat(lambda: func(*param), number=number, repeat=3))
+                timing /= number
+            print(f"{name:<60} {str(param):<30} {timing:12.6f} s")
+
+
+if __name__ == "__main__":
+    main()
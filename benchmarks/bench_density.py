@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# BFit is a Python library for fitting a convex sum of Gaussian
+# functions to any probability distribution
+#
+# Copyright (C) 2020- The QC-Devs Community
+#
+# This file is part of BFit.
+#
+# BFit is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# BFit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+# ---
+r"""Benchmarks of the Slater atomic densities."""
+
+import numpy as np
+
+from bfit.density import SlaterAtoms
+
+
+class SlaterAtomsSuite:
+    r"""Evaluate atomic density of light and heavy atoms."""
+
+    params = (["he", "ne", "xe", "rn"], [1000, 100000])
+    param_names = ["element", "num_pts"]
+
+    def setup(self, element, num_pts):
+        r"""Load the Slater wave-function."""
+        self.atom = SlaterAtoms(element)
+        self.points = np.linspace(0.0, 20.0, num_pts)
+
+    def time_atomic_density(self, element, num_pts):
+        r"""Time evaluating the total atomic density."""
+        self.atom.atomic_density(self.points)
+
+    def time_atomic_density_valence(self, element, num_pts):
+        r"""Time evaluating the valence atomic density."""
+        self.atom.atomic_density(self.points, mode="valence")
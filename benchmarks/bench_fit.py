@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# BFit is a Python library for fitting a convex sum of Gaussian
+# functions to any probability distribution
+#
+# Copyright (C) 2020- The QC-Devs Community
+#
+# This file is part of BFit.
+#
+# BFit is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# BFit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+# ---
+r"""Benchmarks of the fitting algorithms."""
+
+import warnings
+
+import numpy as np
+
+from bfit.fit import KLDivergenceFPI, ScipyFit
+from bfit.grid import ClenshawRadialGrid
+from bfit.measure import KLDivergence
+from bfit.model import AtomicGaussianDensity
+
+
+def _fitting_data(num_pts, nbasis):
+    r"""Return grid, density & initial guess of a Be-like two-Gaussian density."""
+    grid = ClenshawRadialGrid(4, num_core_pts=num_pts // 2, num_diffuse_pts=num_pts // 2)
+    density = 2.0 * (50.0 / np.pi)**1.5 * np.exp(-50.0 * grid.points**2) + \
+        2.0 * (0.5 / np.pi)**1.5 * np.exp(-0.5 * grid.points**2)
+    coeffs = np.ones(nbasis) * 4.0 / nbasis
+    expons = np.logspace(-1, 3, nbasis)
+    return grid, density, coeffs, expons
+
+
+class KLDivergenceFPISuite:
+    r"""Run iterations of the Kullback-Leibler fixed point iteration method."""
+
+    params = ([1000, 10000], [5, 25])
+    param_names = ["num_pts", "nbasis"]
+
+    def setup(self, num_pts, nbasis):
+        r"""Construct the fitting object."""
+        grid, density, self.coeffs, self.expons = _fitting_data(num_pts, nbasis)
+        model = AtomicGaussianDensity(grid.points, num_s=nbasis, normalize=True)
+        self.fit = KLDivergenceFPI(grid, density, model, integral_dens=4.0, spherical=True)
+
+    def time_run_one_iteration(self, num_pts, nbasis):
+        r"""Time one iteration of KL-FPI method."""
+        self.fit.run(self.coeffs, self.expons, maxiter=1)
+
+    def time_run_ten_iterations(self, num_pts, nbasis):
+        r"""Time ten iterations of KL-FPI method."""
+        self.fit.run(self.coeffs, self.expons, maxiter=10, c_threshold=0., e_threshold=0.,
+                     d_threshold=0.)
+
+
+class ScipyFitSuite:
+    r"""Optimize Kullback-Leibler with scipy.optimize methods for a few iterations."""
+
+    params = (["slsqp", "trust-constr"], [1000, 10000], [5, 10])
+    param_names = ["method", "num_pts", "nbasis"]
+
+    def setup(self, method, num_pts, nbasis):
+        r"""Construct the fitting object."""
+        grid, density, self.coeffs, self.expons = _fitting_data(num_pts, nbasis)
+        model = AtomicGaussianDensity(grid.points, num_s=nbasis, normalize=True)
+        self.fit = ScipyFit(grid, density, model, measure=KLDivergence(), method=method,
+                            integral_dens=4.0, spherical=True)
+
+    def time_run(self, method, num_pts, nbasis):
+        r"""Time ten iterations of the optimization."""
+        with warnings.catch_warnings():
+            # optimization doesn't converge in ten iterations
+            warnings.simplefilter("ignore")
+            self.fit.run(self.coeffs, self.expons, maxiter=10)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# BFit is a Python library for fitting a convex sum of Gaussian
+# functions to any probability distribution
+#
+# Copyright (C) 2020- The QC-Devs Community
+#
+# This file is part of BFit.
+#
+# BFit is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# BFit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+# ---
+r"""Benchmarks of the greedy algorithms."""
+
+import numpy as np
+
+from bfit.greedy import GreedyKLFPI
+from bfit.grid import UniformRadialGrid
+
+
+class GreedyKLFPISuite:
+    r"""Run the greedy Kullback-Leibler algorithm for a few basis-functions."""
+
+    params = ([500, 2000], [2, 3])
+    param_names = ["num_pts", "max_numb_funcs"]
+
+    def setup(self, num_pts, max_numb_funcs):
+        r"""Construct the greedy object fitting a three Gaussian density."""
+        self.grid = UniformRadialGrid(num_pts, 0.0, 15.0)
+        points = self.grid.points
+        self.density = 0.2 * (20.0 / np.pi)**1.5 * np.exp(-20.0 * points**2) + \
+            0.5 * (2.0 / np.pi)**1.5 * np.exp(-2.0 * points**2) + \
+            0.3 * (0.3 / np.pi)**1.5 * np.exp(-0.3 * points**2)
+
+    def time_run(self, num_pts, max_numb_funcs):
+        r"""Time the greedy algorithm."""
+        greedy = GreedyKLFPI(self.grid, self.density, "pick-one", l_maxiter=100, g_maxiter=500,
+                             integral_dens=1.0, spherical=True)
+        # p-type initial guesses are random
+        np.random.seed(42)
+        greedy.run(2.0, max_numb_funcs=max_numb_funcs)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# BFit is a Python library for fitting a convex sum of Gaussian
+# functions to any probability distribution
+#
+# Copyright (C) 2020- The QC-Devs Community
+#
+# This file is part of BFit.
+#
+# BFit is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# BFit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+# ---
+r"""Benchmarks of the measures."""
+
+import numpy as np
+
+from bfit.measure import KLDivergence, TsallisDivergence
+
+
+class MeasureSuite:
+    r"""Evaluate Kullback-Leibler and Tsallis divergences with & without derivatives."""
+
+    params = (["kl", "tsallis"], [1000, 100000, 1000000])
+    param_names = ["measure", "num_pts"]
+
+    def setup(self, measure, num_pts):
+        r"""Construct the measure, and density & model with some values below the mask."""
+        points = np.linspace(0.0, 30.0, num_pts)
+        self.density = np.exp(-points)
+        self.model = 1.1 * np.exp(-1.05 * points)
+        self.measure = KLDivergence() if measure == "kl" else TsallisDivergence(alpha=1.5)
+
+    def time_evaluate(self, measure, num_pts):
+        r"""Time evaluating the measure."""
+        self.measure.evaluate(self.density, self.model)
+
+    def time_evaluate_deriv(self, measure, num_pts):
+        r"""Time evaluating the measure & its derivative."""
+        self.measure.evaluate(self.density, self.model, deriv=True)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# BFit is a Python library for fitting a convex sum of Gaussian
+# functions to any probability distribution
+#
+# Copyright (C) 2020- The QC-Devs Community
+#
+# This file is part of BFit.
+#
+# BFit is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# BFit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+# ---
+r"""Benchmarks of the Gaussian density models."""
+
+import numpy as np
+
+from bfit.grid import CubicGrid, UniformRadialGrid
+from bfit.model import AtomicGaussianDensity, MolecularGaussianDensity
+
+
+def _parameters(nbasis):
+    r"""Return coefficients & exponents (spanning tight to diffuse) of `nbasis` Gaussians."""
+    return np.linspace(0.5, 2.0, nbasis), np.logspace(-2, 4, nbasis)
+
+
+class AtomicGaussianDensitySuite:
+    r"""Evaluate atomic Gaussian model with & without derivatives on radial grids."""
+
+    params = ([1000, 10000, 100000], [5, 25, 50])
+    param_names = ["num_pts", "nbasis"]
+
+    def setup(self, num_pts, nbasis):
+        r"""Construct the model with s-type & p-type Gaussians, without caching."""
+        grid = UniformRadialGrid(num_pts, 0.0, 25.0)
+        num_p = nbasis // 5
+        self.model = AtomicGaussianDensity(
+            grid.points, num_s=nbasis - num_p, num_p=num_p, normalize=True, cache_size=0
+        )
+        self.coeffs, self.expons = _parameters(nbasis)
+        self.vector = np.ones(num_pts)
+
+    def time_evaluate(self, num_pts, nbasis):
+        r"""Time evaluating the model."""
+        self.model.evaluate(self.coeffs, self.expons)
+
+    def time_evaluate_deriv(self, num_pts, nbasis):
+        r"""Time evaluating the model & its derivatives."""
+        self.model.evaluate(self.coeffs, self.expons, deriv=True)
+
+    def time_vjp(self, num_pts, nbasis):
+        r"""Time the vector-Jacobian product of the model."""
+        self.model.vjp(self.coeffs, self.expons, self.vector)
+
+    def peakmem_evaluate_deriv(self, num_pts, nbasis):
+        r"""Measure peak memory of evaluating the model & its derivatives."""
+        self.model.evaluate(self.coeffs, self.expons, deriv=True)
+
+
+class MolecularGaussianDensitySuite:
+    r"""Evaluate molecular Gaussian model with & without derivatives on cubic grids."""
+
+    params = ([20, 40], [2, 6], [None, 1e-12])
+    param_names = ["num_pts_axis", "natoms", "screen_tol"]
+
+    def setup(self, num_pts_axis, natoms, screen_tol):
+        r"""Construct a chain of atoms with 10 s-type & 2 p-type Gaussians each."""
+        spacing = 16.0 / num_pts_axis
+        grid = CubicGrid(np.array([-8.0, -8.0, -8.0]), np.eye(3) * spacing, (num_pts_axis,) * 3)
+        coords = np.zeros((natoms, 3))
+        coords[:, 0] = np.linspace(-6.0, 6.0, natoms)
+        basis = np.array([[10, 2]] * natoms)
+        self.model = MolecularGaussianDensity(
+            grid.points, coords, basis, normalize=True, cache_size=0, screen_tol=screen_tol
+        )
+        # most diffuse exponent is large enough for screening to neglect far away points
+        coeffs, expons = np.linspace(0.5, 2.0, 12), np.logspace(0, 4, 12)
+        self.coeffs, self.expons = np.tile(coeffs, natoms), np.tile(expons, natoms)
+
+    def time_evaluate(self, num_pts_axis, natoms, screen_tol):
+        r"""Time evaluating the model."""
+        self.model.evaluate(self.coeffs, self.expons)
+
+    def time_evaluate_deriv(self, num_pts_axis, natoms, screen_tol):
+        r"""Time evaluating the model & its derivatives."""
+        self.model.evaluate(self.coeffs, self.expons, deriv=True)
@@ -22,9 +22,14 @@
 # ---
 r"""Package for fitting densities to a linear combination of Gaussians."""
 
+from bfit.batch import *
 from bfit.density import *
 from bfit.fit import *
 from bfit.greedy import *
 from bfit.grid import *
+from bfit.integrals import *
 from bfit.measure import *
 from bfit.model import *
+from bfit.observer import *
+from bfit.precision import *
+from bfit.profiling import *
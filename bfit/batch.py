@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+# BFit is a Python library for fitting a convex sum of Gaussian
+# functions to any probability distribution
+#
+# Copyright (C) 2020- The QC-Devs Community
+#
+# This file is part of BFit.
+#
+# BFit is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# BFit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+# ---
+r"""Batch Module for fitting the densities of many atoms in parallel."""
+
+from concurrent.futures import as_completed, Executor, ProcessPoolExecutor
+import os
+
+import numpy as np
+
+from bfit.density import SlaterAtoms
+from bfit.fit import KLDivergenceFPI, ScipyFit
+from bfit.grid import ClenshawRadialGrid
+from bfit.measure import KLDivergence
+from bfit.model import AtomicGaussianDensity
+from bfit.parse_ugbs import get_ugbs_exponents
+
+__all__ = ["fit_atom", "run_batch", "load_batch_results"]
+
+
+# Element symbols ordered by atomic number, from H to Lr.
+_ELEMENTS = [
+    "h", "he", "li", "be", "b", "c", "n", "o", "f", "ne", "na", "mg", "al", "si", "p", "s", "cl",
+    "ar", "k", "ca", "sc", "ti", "v", "cr", "mn", "fe", "co", "ni", "cu", "zn", "ga", "ge", "as",
+    "se", "br", "kr", "rb", "sr", "y", "zr", "nb", "mo", "tc", "ru", "rh", "pd", "ag", "cd", "in",
+    "sn", "sb", "te", "i", "xe", "cs", "ba", "la", "ce", "pr", "nd", "pm", "sm", "eu", "gd", "tb",
+    "dy", "ho", "er", "tm", "yb", "lu", "hf", "ta", "w", "re", "os", "ir", "pt", "au", "hg", "tl",
+    "pb", "bi", "po", "at", "rn", "fr", "ra", "ac", "th", "pa", "u", "np", "pu", "am", "cm", "bk",
+    "cf", "es", "fm", "md", "no", "lr",
+]
+
+# Default specification of the grid, model & fitting method of a job.
+_DEFAULT_GRID = {"num_core_pts": 10000, "num_diffuse_pts": 899, "extra_pts": [50, 75, 100]}
+_DEFAULT_MODEL = {"ugbs_factor": 2.0, "normalize": True}
+_DEFAULT_FITTER = {"method": "kl-fpi", "mask_value": 1e-18, "options": {}}
+
+
+def _job_name(job):
+    r"""Return the name of a job used for its output file."""
+    if "name" in job:
+        return job["name"]
+    charge = job.get("charge", 0)
+    suffix = {0: "", -1: "_anion", 1: "_cation"}.get(charge, "")
+    return job["element"].lower() + suffix
+
+
+def fit_atom(job):
+    r"""
+    Fit a Gaussian model to the Hartree-Fock density of an atom or ion.
+
+    Parameters
+    ----------
+    job : dict
+        Specification of the fit containing the following keys:
+
+        "element" : str
+            Symbol of the element.
+        "charge" : int, optional
+            Charge of the atom, either 0 (neutral, default), -1 (anion) or 1 (cation).
+        "name" : str, optional
+            Name of the job. Default is the lower-case element symbol, with the suffix
+            "_anion" or "_cation" for ions.
+        "grid" : dict or _BaseRadialGrid, optional
+            Radial grid or keyword arguments of `ClenshawRadialGrid` (excluding the atomic
+            number). Default is 10000 core points, 899 diffuse points and extra points
+            [50, 75, 100].
+        "model" : dict, optional
+            Specification of the `AtomicGaussianDensity` model & its initial guess, containing
+            "normalize" (default True) and either "coeffs", "exps", "num_s" & "num_p", or
+            "ugbs_factor" (default 2.0) in which case the initial exponents are the universal
+            Gaussian basis-set exponents multiplied by this factor and the initial coefficients
+            are the number of electrons divided equally between the basis-functions.
+        "fitter" : dict, optional
+            Specification of the fitting method containing "method" (default "kl-fpi"),
+            "mask_value" (default 1e-18) and "options", the keyword arguments passed to the
+            `run` method of the fitting object. If the method is not "kl-fpi", then the
+            Kullback-Leibler divergence is optimized by `ScipyFit` using this
+            `scipy.optimize.minimize` method.
+
+    Returns
+    -------
+    result : dict
+        The results of the fit containing the "name", "element", "charge", "coeffs", "exps",
+        "num_s", "num_p", "success", "fun" and "performance" of the fitting results.
+
+    """
+    if not isinstance(job, dict) or "element" not in job:
+        raise ValueError(f"Job {job} should be a dictionary with key 'element'.")
+    element = job["element"].lower()
+    if element not in _ELEMENTS:
+        raise ValueError(f"Element {job['element']} was not recognized.")
+    charge = job.get("charge", 0)
+    if charge not in (-1, 0, 1):
+        raise ValueError(f"Charge {charge} should be either -1, 0 or 1.")
+    atomic_numb = _ELEMENTS.index(element) + 1
+    numb_electrons = atomic_numb - charge
+
+    # Construct the integration grid
+    grid = job.get("grid", _DEFAULT_GRID)
+    if isinstance(grid, dict):
+        grid = ClenshawRadialGrid(atomic_numb, **grid)
+
+    # Construct the model & its initial guess
+    model_spec = dict(_DEFAULT_MODEL, **job.get("model", {}))
+    if "exps" in model_spec:
+        num_s, num_p = model_spec["num_s"], model_spec["num_p"]
+        coeffs = np.array(model_spec["coeffs"], dtype=float)
+        exps = np.array(model_spec["exps"], dtype=float)
+    else:
+        ugbs = get_ugbs_exponents(element)
+        num_s, num_p = len(ugbs["S"]), len(ugbs["P"])
+        coeffs = np.array([numb_electrons / (num_s + num_p)] * (num_s + num_p))
+        exps = np.array(ugbs["S"] + ugbs["P"]) * model_spec["ugbs_factor"]
+    model = AtomicGaussianDensity(
+        grid.points, num_s=num_s, num_p=num_p, normalize=model_spec["normalize"]
+    )
+
+    # Construct the atomic density & fitting object and run the fit
+    density = SlaterAtoms(element, anion=charge == -1, cation=charge == 1).atomic_density(
+        grid.points
+    )
+    fitter_spec = dict(_DEFAULT_FITTER, **job.get("fitter", {}))
+    if fitter_spec["method"].lower() == "kl-fpi":
+        fit = KLDivergenceFPI(grid, density, model, mask_value=fitter_spec["mask_value"],
+                              integral_dens=numb_electrons, spherical=True)
+    else:
+        fit = ScipyFit(grid, density, model, measure=KLDivergence(fitter_spec["mask_value"]),
+                       method=fitter_spec["method"], integral_dens=numb_electrons,
+                       spherical=True)
+    results = fit.run(coeffs, exps, **fitter_spec["options"])
+
+    return {"name": _job_name(job),
+            "element": element,
+            "charge": charge,
+            "coeffs": results["coeffs"],
+            "exps": results["exps"],
+            "num_s": num_s,
+            "num_p": num_p,
+            "success": results["success"],
+            "fun": results["fun"],
+            "performance": np.array(results["performance"])}
+
+
+def _save_result(file_path, result):
+    r"""Write the result to a npz file, such that the file is never partially written."""
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **result)
+    os.replace(tmp_path, file_path)
+
+
+def run_batch(jobs, output_dir, max_workers=None, executor=None, overwrite=False):
+    r"""
+    Fit the densities of many atoms in parallel and save each result as soon as it finishes.
+
+    The result of each job is saved in the file "{name}.npz" in `output_dir` as soon as that
+    job finishes, so that a failure or interruption of the batch doesn't lose the results of
+    the completed jobs. Jobs whose output file already exists are skipped, so re-running the
+    same batch resumes it.
+
+    Parameters
+    ----------
+    jobs : List[dict]
+        List of jobs, each specifying the element, charge, grid, model and fitting method.
+        See `fit_atom` for the specification of a job.
+    output_dir : str
+        The directory where the result of each job is saved. It is created if it doesn't exist.
+    max_workers : int, optional
+        The number of processes used to run the jobs. Default is the number of processors.
+        Ignored if `executor` is provided.
+    executor : concurrent.futures.Executor, optional
+        Executor used to run the jobs. If None, a process pool with `max_workers` processes
+        is used.
+    overwrite : bool, optional
+        If true, then jobs whose output file already exists are run again.
+
+    Returns
+    -------
+    result : dict
+        Dictionary containing:
+
+        "completed" : List[str]
+            The paths of the output files of the jobs that were run (or skipped).
+        "failed" : dict
+            The name of each job that failed and the error that was raised.
+
+    """
+    names = [_job_name(job) for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Names of the jobs {names} should be unique.")
+    if executor is not None and not isinstance(executor, Executor):
+        raise TypeError(f"Executor {type(executor)} should be a concurrent.futures.Executor.")
+    os.makedirs(output_dir, exist_ok=True)
+
+    completed, failed = [], {}
+    pending = []
+    for name, job in zip(names, jobs):
+        file_path = os.path.join(output_dir, name + ".npz")
+        if os.path.isfile(file_path) and not overwrite:
+            completed.append(file_path)
+        else:
+            pending.append((name, file_path, job))
+
+    pool = ProcessPoolExecutor(max_workers) if executor is None else executor
+    try:
+        futures = {pool.submit(fit_atom, job): (name, file_path)
+                   for name, file_path, job in pending}
+        for future in as_completed(futures):
+            name, file_path = futures[future]
+            try:
+                result = future.result()
+            except Exception as error:  # pylint: disable=broad-except
+                failed[name] = error
+                continue
+            _save_result(file_path, result)
+            completed.append(file_path)
+    finally:
+        if executor is None:
+            pool.shutdown()
+    return {"completed": completed, "failed": failed}
+
+
+def load_batch_results(output_dir, names=None):
+    r"""
+    Load the results saved by `run_batch` into a single dictionary.
+
+    The keys are the same as the ones in "./bfit/data/kl_fpi_results.npz", so the
+    table can be regenerated with `np.savez(file, **load_batch_results(output_dir))`.
+
+    Parameters
+    ----------
+    output_dir : str
+        The directory where the results of each job were saved.
+    names : List[str], optional
+        The names of the jobs to load. Default loads all results in `output_dir`.
+
+    Returns
+    -------
+    dict :
+        Dictionary with keys "{name}_coeffs", "{name}_exps", "{name}_num_s" and
+        "{name}_num_p" for each job.
+
+    """
+    if names is None:
+        names = sorted(f[:-4] for f in os.listdir(output_dir) if f.endswith(".npz"))
+    results = {}
+    for name in names:
+        with np.load(os.path.join(output_dir, name + ".npz")) as result:
+            for key in ["coeffs", "exps", "num_s", "num_p"]:
+                results[name + "_" + key] = result[key]
+    return results
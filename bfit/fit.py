@@ -22,20 +22,223 @@
 # ---
 r"""Fitting Algorithms."""
 
+from collections import OrderedDict
+import os
+import tempfile
 import warnings
 from timeit import default_timer as timer
 
 import numpy as np
+from scipy.linalg import solve_triangular
 from scipy.optimize import minimize, NonlinearConstraint
 
-from bfit.measure import KLDivergence, Measure, SquaredDifference
+from bfit.measure import _masked_ratio, KLDivergence, Measure, SquaredDifference
+from bfit.observer import Observer
+from bfit.profiling import _profiled, _profiled_function, _profiled_run
 
-__all__ = ["KLDivergenceFPI", "ScipyFit"]
+__all__ = ["KLDivergenceFPI", "ScipyFit", "GramLeastSquares"]
+
+
+def _save_checkpoint(path, kind, **state):
+    r"""
+    Save the state of an algorithm to a compressed npz file.
+
+    The state is written to a temporary file which then replaces `path`, so an interrupted save
+    never leaves a corrupted checkpoint behind.
+
+    Parameters
+    ----------
+    path : str or path-like
+        The checkpoint file.
+    kind : str
+        The name of the algorithm, which is checked when the state is loaded.
+    state : ndarray or scalar
+        The arrays & numbers of the state of the algorithm.
+
+    """
+    path = os.fspath(path)
+    handle, temp = tempfile.mkstemp(suffix=".npz", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(handle, "wb") as file:
+            np.savez_compressed(file, kind=kind, **state)
+        os.replace(temp, path)
+    except BaseException:
+        os.remove(temp)
+        raise
+
+
+def _load_checkpoint(path, kind):
+    r"""
+    Load the state of an algorithm saved by `_save_checkpoint`.
+
+    Parameters
+    ----------
+    path : str or path-like
+        The checkpoint file.
+    kind : str
+        The name of the algorithm whose state is loaded.
+
+    Returns
+    -------
+    dict :
+        The arrays of the state of the algorithm.
+
+    """
+    with np.load(path, allow_pickle=False) as data:
+        state = dict(data)
+    if str(state.pop("kind", None)) != kind:
+        raise ValueError(f"Checkpoint {path} isn't a state of {kind}.")
+    return state
+
+
+def _save_history(path, kind, index, **rows):
+    r"""
+    Save the rows added to the history arrays of an algorithm since its previous checkpoint.
+
+    The rows are saved to their own file next to the checkpoint, so the cost of a checkpoint
+    doesn't grow with the length of the history. They should be saved before the state of the
+    algorithm, which records the number of history files (see `_load_history`).
+
+    Parameters
+    ----------
+    path : str or path-like
+        The checkpoint file.
+    kind : str
+        The name of the algorithm, which is checked when the history is loaded.
+    index : int
+        The index of the history file, i.e. the number of history files saved before.
+    rows : ndarray
+        The rows added to each history array.
+
+    """
+    _save_checkpoint(f"{os.fspath(path)}.history{index}", kind + " history", **rows)
+
+
+def _load_history(path, kind, count):
+    r"""
+    Load the history arrays of an algorithm saved by the first `count` calls of `_save_history`.
+
+    Parameters
+    ----------
+    path : str or path-like
+        The checkpoint file.
+    kind : str
+        The name of the algorithm whose history is loaded.
+    count : int
+        The number of history files, as recorded in the state of the algorithm.
+
+    Returns
+    -------
+    dict :
+        The lists of rows of each history array.
+
+    """
+    history = {}
+    for index in range(count):
+        rows = _load_checkpoint(f"{os.fspath(path)}.history{index}", kind + " history")
+        for key, value in rows.items():
+            history.setdefault(key, []).extend(value)
+    return history
+
+
+class _Workspace:
+    r"""
+    Preallocated arrays that the fitting algorithms write into on every iteration.
+
+    The arrays are sized from the number of grid points and basis functions, so that an
+    iteration does not allocate any array proportional to the size of the grid.
+    """
+
+    def __init__(self, npoints, nbasis, dtype):
+        r"""
+        Construct the workspace.
+
+        Parameters
+        ----------
+        npoints : int
+            The number of grid points :math:`N`.
+        nbasis : int
+            The number of basis functions :math:`M`.
+        dtype : np.dtype
+            The data type of the arrays.
+
+        """
+        # basis functions evaluated on the grid points
+        self.basis = np.empty((npoints, nbasis), dtype=dtype)
+        # model density, ratio of density over model and two scratch vectors
+        self.model = np.empty(npoints, dtype=dtype)
+        self.ratio = np.empty(npoints, dtype=dtype)
+        self.weights = np.empty(npoints, dtype=dtype)
+        self.integrand = np.empty(npoints, dtype=dtype)
+        self.mask = np.empty(npoints, dtype=bool)
+
+    def fits(self, npoints, nbasis, dtype):
+        r"""Return true if the workspace has the given sizes & data type."""
+        return self.basis.shape == (npoints, nbasis) and self.basis.dtype == dtype
+
+
+class _AndersonMixing:
+    r"""
+    Anderson mixing of the iterates of a fixed-point iteration :math:`x_{k+1} = G(x_k)`.
+
+    The next iterate is the combination of the previous updates :math:`G(x_i)` whose residuals
+    :math:`G(x_i) - x_i` combine to the smallest residual (in the least-squares sense).
+    This is the same as the direct inversion in the iterative subspace (DIIS) of the residuals.
+    """
+
+    def __init__(self, size):
+        r"""
+        Construct the Anderson mixing.
+
+        Parameters
+        ----------
+        size : int
+            The number of previous iterates used for mixing.
+
+        """
+        self.size = size
+        self._iterates, self._updates = [], []
+
+    def reset(self):
+        r"""Forget the previous iterates, so the next iterate is the plain update."""
+        self._iterates, self._updates = [], []
+
+    def mix(self, iterate, update):
+        r"""
+        Return the next iterate from the current iterate & its update.
+
+        Parameters
+        ----------
+        iterate : ndarray
+            The current iterate :math:`x_k`.
+        update : ndarray
+            The update of the current iterate :math:`G(x_k)`.
+
+        Returns
+        -------
+        ndarray :
+            The mixed next iterate, or `update` itself if there aren't enough previous iterates.
+
+        """
+        self._iterates.append(iterate)
+        self._updates.append(update)
+        if len(self._iterates) > self.size + 1:
+            del self._iterates[0], self._updates[0]
+        if len(self._iterates) < 2:
+            return update
+        updates = np.array(self._updates)
+        residuals = updates - np.array(self._iterates)
+        # minimize |f_k - dF gamma| over the differences of residuals & updates
+        gamma = np.linalg.lstsq(np.diff(residuals, axis=0).T, residuals[-1], rcond=None)[0]
+        return update - np.dot(np.diff(updates, axis=0).T, gamma)
 
 
 class _BaseFit:
     r"""Base Fitting Class."""
 
+    # profile of the instrumented methods, only enabled during a run with `profile` argument
+    _profile = None
+
     def __init__(self, grid, density, model, measure, integral_dens=None, spherical=False,
                  mask_value=1e-18):
         r"""
@@ -45,7 +248,9 @@ class _BaseFit:
         ----------
         grid : (_BaseRadialGrid, CubicGrid)
             The grid class that contains the grid points and a integrate function.
-             Located in `grid.py`
+             Located in `grid.py`. If it also has a `weights` attribute, then integrals are
+             computed as dot products with these quadrature weights, summed according to the
+             `precision` policy of the grid (if any).
         density : ndarray(N,)
             The true density evaluated on :math:`N` grid points.
         model : (AtomicGaussianDensity, MolecularGaussianDensity)
@@ -84,6 +289,12 @@ class _BaseFit:
         self._model = model
         self._measure = measure
         self._spherical = spherical
+        # quadrature weights (including 4 pi r^2 for spherical integration), if known
+        self._quad_weights = self._get_quadrature_weights()
+        # summation of the (scalar) integrals, if the grid has a precision policy
+        self._precision = getattr(self.grid, "precision", None)
+        # integrals of the model alone are computed analytically, if the model has them
+        self._analytic = self._has_analytic_integrals()
         # compute norm of density
         if integral_dens is None:
             self._integral_dens = self.integrate(density)
@@ -93,6 +304,18 @@ class _BaseFit:
         # Used to calculate the error measures in model only.
         self.kl_error = KLDivergence(mask_value=mask_value)
         self.ls_error = SquaredDifference()
+        # preallocated arrays reused on every iteration, if the fitting algorithm uses them
+        self._workspace = None
+        # number of model density evaluations, reported to the observers of the runs
+        self._nevals = 0
+
+    def __getstate__(self):
+        r"""Return the state of the fitting object without its buffers, for copying & pickling."""
+        state = self.__dict__.copy()
+        if state["_workspace"] is not None:
+            # the (empty) workspace is resized on the first iteration of the copy
+            state["_workspace"] = _Workspace(0, 0, np.float64)
+        return state
 
     @property
     def grid(self):
@@ -124,6 +347,11 @@ class _BaseFit:
         """Whether to perform spherical integration."""
         return self._spherical
 
+    def _profiled_objects(self):
+        r"""Return the objects whose methods are profiled during a run, see `Profile`."""
+        return [self, self.model, self.measure, self.kl_error, self.ls_error]
+
+    @_profiled("fit.integrate")
     def integrate(self, integrand):
         r"""
         Integrate the integrand.
@@ -142,17 +370,124 @@ class _BaseFit:
             is true then returns :math:`\int_0^\infty f(r) 4 \pi r^2 dr`.
 
         """
+        if self._quad_weights is not None:
+            if self._precision is not None:
+                return self._precision.integrate(self._quad_weights, integrand)
+            return np.dot(self._quad_weights, integrand)
         if self.spherical:
             return self.grid.integrate(integrand * 4.0 * np.pi * self.grid.points**2.0)
         return self.grid.integrate(integrand)
 
+    def _has_analytic_integrals(self):
+        r"""
+        Return whether the model has closed-form integrals over the domain of integration.
+
+        The closed-form integrals are over the whole space, i.e. the three-dimensional space
+        for spherical integration, or the space of the grid points if they are multi-dimensional.
+        One-dimensional grids without spherical integration only cover half of the line, so their
+        integrals are always computed numerically.
+
+        """
+        if not (hasattr(self.model, "integral") and hasattr(self.model, "dim")):
+            return False
+        if self.spherical:
+            return self.model.dim == 3
+        return self.grid.points.ndim > 1 and self.model.dim == self.grid.points.shape[1]
+
+    def _model_integral(self, coeffs, expons, approx):
+        r"""Return the integral of the model density, analytically if possible."""
+        if self._analytic:
+            return self.model.integral(coeffs, expons)
+        return self.integrate(approx)
+
+    def _get_quadrature_weights(self):
+        r"""
+        Return the quadrature weights of the grid, so that integration is a dot product.
+
+        Returns
+        -------
+        ndarray(N,) or None :
+            The weights :math:`w_i` such that :math:`\int f(x) dx \approx \sum_i w_i f(x_i)`.
+            If `spherical` attribute is true, the :math:`4 \pi r^2` term is included in
+            the weights. If the weights of the grid are unknown, None is returned.
+
+        """
+        weights = getattr(self.grid, "weights", None)
+        if weights is None:
+            return None
+        if self.spherical:
+            if hasattr(self.grid, "spherical_weights"):
+                return self.grid.spherical_weights
+            return weights * 4.0 * np.pi * self.grid.points**2.0
+        return weights
+
+    @_profiled("fit.integrate_many")
+    def integrate_many(self, integrands, factor=None):
+        r"""
+        Integrate each column of a matrix of integrands.
+
+        Parameters
+        ----------
+        integrands : ndarray(N, K)
+            The :math:`K` integrands :math:`g_j(x)` defined on :math:`N` points (as columns).
+            If `spherical` attribute is true, then the radial component is
+            integrated in spherical coordinates.
+        factor : ndarray(N,), optional
+            The function :math:`f(x)` multiplying every integrand. It is multiplied into the
+            quadrature weights, so no temporary (N, K) array is made.
+
+        Returns
+        -------
+        ndarray(K,) :
+            The integrals :math:`\int f(x) g_j(x) dx` of each column :math:`j`.
+
+        """
+        if self._quad_weights is not None:
+            weights = self._quad_weights
+            if factor is not None:
+                weights = factor * weights
+            # one matrix-vector product instead of K integrations
+            return np.dot(weights, integrands)
+        if factor is not None:
+            integrands = factor[:, None] * integrands
+        return np.array([self.integrate(column) for column in integrands.T])
+
+    def _get_workspace(self):
+        r"""
+        Return the workspace, resized if the model or grid changed since it was allocated.
+
+        Returns
+        -------
+        _Workspace or None :
+            The workspace of preallocated arrays, or None if the fitting algorithm does not use
+            one or the quadrature weights of the grid are unknown.
+
+        """
+        if self._workspace is None or self._quad_weights is None:
+            return None
+        npoints, nbasis = len(self.density), self.model.nbasis
+        # the data type of the model (e.g. float32 with a single precision policy)
+        dtype = np.result_type(self.model.radii, np.float32)
+        if not self._workspace.fits(npoints, nbasis, dtype):
+            self._workspace = _Workspace(npoints, nbasis, dtype)
+        return self._workspace
+
+    def _evaluate_model_workspace(self, coeffs, expons, workspace):
+        r"""Evaluate the basis functions & model density into the workspace."""
+        self._nevals += 1
+        basis = self.model.evaluate_basis(expons, out=workspace.basis)
+        model = np.dot(basis, coeffs.astype(basis.dtype, copy=False), out=workspace.model)
+        return basis, model
+
+    @_profiled("fit.goodness_of_fit")
     def goodness_of_fit(self, coeffs, expons):
         r"""
         Compute various measures over the grid to determine the accuracy of the fitted model.
 
         In particular, it computes the integral of the model, the :math:`L_1` distance,
         the :math:`L_\infty` distance and attribute `measure` distance between true and model
-        functions.
+        functions. The integral of the model is computed analytically if the model has
+        closed-form integrals (see `AtomicGaussianDensity.integral`).
 
         Parameters
         ----------
@@ -180,16 +515,45 @@ class _BaseFit:
             If :math:`g` is negative, then this returns infinity.
 
         """
+        workspace = self._get_workspace()
+        if workspace is not None:
+            return self._goodness_of_fit_workspace(coeffs, expons, workspace)
         # evaluate approximate model density
+        self._nevals += 1
         approx = self.model.evaluate(coeffs, expons)
         diff = np.abs(self.density - approx)
-        return [
-            self.integrate(approx),
-            self.integrate(diff),
-            np.max(diff),
-            self.integrate(self.ls_error.evaluate(self.density, approx, deriv=False)),
-            self.integrate(self.kl_error.evaluate(self.density, approx, deriv=False))
-        ]
+        integrands = (
+            diff,
+            self.ls_error.evaluate(self.density, approx, deriv=False),
+            self.kl_error.evaluate(self.density, approx, deriv=False)
+        )
+        if not self._analytic:
+            integrands = (approx,) + integrands
+        if self._precision is None or self._precision.summation == "plain":
+            integrals = list(self.integrate_many(np.column_stack(integrands)))
+        else:
+            integrals = [self.integrate(integrand) for integrand in integrands]
+        if self._analytic:
+            integrals.insert(0, self.model.integral(coeffs, expons))
+        return [integrals[0], integrals[1], np.max(diff), integrals[2], integrals[3]]
+
+    def _goodness_of_fit_workspace(self, coeffs, expons, workspace):
+        r"""Compute the same measures as `goodness_of_fit` in the arrays of the workspace."""
+        _, approx = self._evaluate_model_workspace(coeffs, expons, workspace)
+        diff = np.subtract(self.density, approx, out=workspace.integrand)
+        np.abs(diff, out=diff)
+        integral = self._model_integral(coeffs, expons, approx)
+        l_1, l_infinity = self.integrate(diff), np.max(diff)
+        least_squares = self.integrate(np.square(diff, out=diff))
+        if approx.size != 0 and np.min(approx) < 0.:
+            kl_value = self.kl_error.evaluate(self.density, approx, deriv=False)
+        else:
+            kl_value = _masked_ratio(self.density, approx, self.kl_error.mask_value, 1.0,
+                                     out=workspace.ratio, mask=workspace.mask)
+            with np.errstate(divide='ignore', invalid="ignore"):
+                np.log(kl_value, out=kl_value)
+                kl_value *= self.density
+        return [integral, l_1, l_infinity, least_squares, self.integrate(kl_value)]
 
 
 class KLDivergenceFPI(_BaseFit):
@@ -240,13 +604,17 @@ class KLDivergenceFPI(_BaseFit):
         self._lm = self.integrate(self.density) / self.integral_dens
         if self._lm == 0. or np.isnan(self._lm):
             raise RuntimeError(f"Lagrange multiplier cannot be {self._lm}.")
+        # arrays reused on every iteration (resized if the number of basis functions changes)
+        self._workspace = _Workspace(0, 0, np.float64)
 
     @property
     def lagrange_multiplier(self):
         """Lagrange multiplier of Kullback-Leibler optimization problem."""
         return self._lm
 
-    def _update_params(self, coeffs, expons, update_coeffs=True, update_expons=False):
+    @_profiled("fit.update_params")
+    def _update_params(self, coeffs, expons, update_coeffs=True, update_expons=False,
+                       divergence=False):
         r"""
         Update coefficients & exponents of the Gaussian density model.
 
@@ -262,6 +630,9 @@ class KLDivergenceFPI(_BaseFit):
         update_expons : bool, optional
             Whether to optimize exponents of Gaussian basis functions.
             Default is true.
+        divergence : bool, optional
+            Whether to also return the Kullback-Leibler divergence of the given (not updated)
+            coefficients & exponents, computed from the model density evaluated for the update.
 
         Returns
         -------
@@ -271,38 +642,89 @@ class KLDivergenceFPI(_BaseFit):
         expons : ndarray
             The updated exponents of Gaussian basis functions. Only returned if
             `update_expones=True`.
+        kl : float
+            The Kullback-Leibler divergence of the given coefficients & exponents.
+            Only returned if `divergence=True`.
 
         """
         if not update_coeffs and not update_expons:
             raise ValueError("At least one of args update_coeff or update_expons should be True.")
-        # compute model density & its derivative
-        m, dm = self.model.evaluate(coeffs, expons, deriv=True)
-        # compute KL divergence & its derivative
-        _, dk = self.measure.evaluate(self.density, m, deriv=True)
+        workspace = self._get_workspace()
+        if workspace is None:
+            # compute model density & its derivative
+            self._nevals += 1
+            m, dm = self.model.evaluate(coeffs, expons, deriv=True)
+            basis = dm[:, :self.model.nbasis]
+            # compute KL divergence & its derivative
+            k, dk = self.measure.evaluate(self.density, m, deriv=True)
+            ratio = -dk
+        else:
+            # the derivatives w.r.t. coefficients are the basis functions, and the negative
+            # derivative of KL divergence is the ratio of density over model
+            basis, m = self._evaluate_model_workspace(coeffs, expons, workspace)
+            ratio = workspace.ratio
+            if m.size != 0 and np.min(m) < 0.:
+                ratio.fill(-self.measure.negative_val)
+            else:
+                _masked_ratio(self.density, m, self.measure.mask_value, 1.0, out=ratio,
+                              mask=workspace.mask)
         # compute averages needed to update parameters
-        avrg1, avrg2 = np.zeros(self.model.nbasis), np.zeros(self.model.nbasis)
-        for index in range(self.model.nbasis):
-            integrand = -dk * dm[:, index]
-            avrg1[index] = self.integrate(integrand)
-            if update_expons:
-                if self.model.natoms == 1:
-                    # case of AtomicGaussianDensity or MolecularGaussianDensity model with 1 atom
-                    radii = np.ravel(self.model.radii)
-                else:
-                    # case of MolecularGaussianDensity model with more than 1 atom
-                    center_index = self.model.assign_basis_to_center(index)
-                    radii = self.model.radii[center_index]
-                avrg2[index] = self.integrate(integrand * radii**2)
+        nbasis = self.model.nbasis
+        avrg1, avrg2 = np.zeros(nbasis), np.zeros(nbasis)
+        avrg1[:] = self._integrate_columns(basis, ratio, workspace)
+        if update_expons:
+            radii = np.atleast_2d(self.model.radii)
+            if self.model.natoms == 1:
+                # case of AtomicGaussianDensity or MolecularGaussianDensity model with 1 atom
+                centers = np.zeros(nbasis, dtype=int)
+            else:
+                # case of MolecularGaussianDensity model with more than 1 atom
+                centers = self.model.assign_basis_to_center(np.arange(nbasis))
+            # basis functions of each center are contiguous, so integrate them together
+            bounds = np.cumsum(np.bincount(centers, minlength=len(radii)))
+            start = 0
+            for index, end in enumerate(bounds):
+                if end > start:
+                    if workspace is None:
+                        factor = ratio * radii[index]**2
+                    else:
+                        factor = np.multiply(ratio, radii[index], out=workspace.integrand)
+                        factor *= radii[index]
+                    avrg2[start:end] = self._integrate_columns(
+                        basis[:, start:end], factor, workspace
+                    )
+                start = end
 
         # compute updated coeffs & expons
         if update_coeffs:
             coeffs = coeffs * avrg1 / self._lm
         if update_expons:
             expons = self.model.prefactor * avrg1 / avrg2
-        return coeffs, expons
-
+        if not divergence:
+            return coeffs, expons
+        # the integrand of KL divergence is density times the logarithm of the ratio
+        if workspace is None:
+            kl_value = k
+        elif m.size != 0 and np.min(m) < 0.:
+            kl_value = ratio
+            kl_value.fill(self.measure.negative_val)
+        else:
+            with np.errstate(divide='ignore', invalid="ignore"):
+                kl_value = np.log(ratio, out=ratio)
+                kl_value *= self.density
+        return coeffs, expons, self.integrate(kl_value)
+
+    def _integrate_columns(self, integrands, factor, workspace):
+        r"""Integrate the columns times the factor, using the workspace for the weights."""
+        if workspace is None:
+            return self.integrate_many(integrands, factor)
+        weights = np.multiply(self._quad_weights, factor, out=workspace.weights)
+        return np.dot(weights, integrands)
+
+    @_profiled_run("fit.run")
     def run(self, c0, e0, opt_coeffs=True, opt_expons=True, maxiter=500, c_threshold=1.e-6,
-            e_threshold=1.e-6, d_threshold=1.e-6, disp=False):
+            e_threshold=1.e-6, d_threshold=1.e-6, disp=False, record=1, anderson=0,
+            checkpoint=None, checkpoint_every=100, resume=None, observer=None):
         r"""
         Optimize the coefficients & exponents of Gaussian basis functions via fixed-point.
 
@@ -327,7 +749,43 @@ class KLDivergenceFPI(_BaseFit):
         d_threshold : float
             The termination threshold for absolute change in divergence value. Default is 1e-6.
         disp : bool
-            If true, then at each iteration various error measures will be printed.
+            If true, then at each recorded iteration various error measures will be printed.
+        record : (int, "final", "kl"), optional
+            When the performance measures are computed with `goodness_of_fit()` method, which
+            evaluates the model density again. If an integer :math:`k`, they are recorded every
+            :math:`k` iterations and at the last iteration. If "final", they are only recorded
+            at the last iteration, and if "kl", they are not recorded. Default is 1, i.e. every
+            iteration.
+        anderson : int, optional
+            The number of previous iterates used to accelerate the fixed-point iteration with
+            Anderson mixing (DIIS) of the coefficients & logarithm of exponents. If zero (default),
+            then the plain fixed-point updates are used. The plain update is used instead of the
+            mixed one if it has non-positive coefficients or a different sum of coefficients,
+            and the mixing restarts from the plain update if the divergence increases.
+        checkpoint : str or path-like, optional
+            If provided, the state of the algorithm is saved to this (npz) file every
+            `checkpoint_every` iterations, so that an interrupted run can be resumed. The values
+            of the divergence & performance measures added since the previous checkpoint are
+            saved to the file with the suffix ".history<i>" for the i-th checkpoint.
+        checkpoint_every : int, optional
+            The number of iterations between two checkpoints. Default is 100.
+        resume : str or path-like, optional
+            If provided, the algorithm continues from the state saved in this checkpoint file,
+            rather than from `c0` & `e0`, as if it had never been interrupted. The other arguments
+            should be the same as the ones of the interrupted run.
+        observer : Observer, optional
+            If provided, its `update` method receives the record of each iteration (see
+            `bfit.observer.Observer`), where "fun" is the latest computed KL divergence (see
+            Notes) and the additional keys are "delta_coeffs" & "delta_exps", the maximum absolute
+            change in coefficients & exponents, "delta_fun", the absolute change in divergence,
+            "performance", the list of performance measures if recorded at this iteration (or
+            else None), and "accelerated", whether the parameters are mixed by Anderson mixing.
+            The history of the divergence & performance measures isn't accumulated then, i.e.
+            "fun" & "performance" of the returned dictionary only have their last values.
+        profile : bool or Profile, optional
+            If true or a `Profile` object, the number of calls & time spent in the evaluations of
+            the model & measure, the integrations and the other instrumented methods are recorded
+            during the run (see `bfit.profiling.Profile`). Default is False.
 
         Returns
         -------
@@ -343,10 +801,26 @@ class KLDivergenceFPI(_BaseFit):
             "fun" : ndarray
                 Values of the KL divergence (objective function) at each iteration.
             "performance" : ndarray
-                Values of various performance measures of modeled density at each iteration,
-                as computed by `goodness_of_fit()` method.
+                Values of various performance measures of modeled density at each recorded
+                iteration, as computed by `goodness_of_fit()` method.
             "time" : float
                 The time in seconds it took to complete the algorithm.
+            "niter" : int
+                The number of iterations.
+            "naccel" : int
+                The number of iterations whose (accepted) parameters were accelerated by Anderson
+                mixing.
+            "profile" : dict
+                The number of calls & time spent in each instrumented method, as returned by
+                `Profile.totals`. Only included if `profile` is enabled.
+
+        Notes
+        -----
+        - Unless the performance measures are recorded at every iteration without Anderson
+          mixing, the KL divergence
+          of each iteration is computed from the model density evaluated for the next update.
+          The change in divergence used for convergence then lags one iteration behind, so the
+          algorithm may take one extra iteration.
 
         """
         # check the shape of initial coeffs and expons
@@ -356,6 +830,29 @@ class KLDivergenceFPI(_BaseFit):
             raise ValueError(f"Argument init_coeffs shape != ({self.model.nbasis},)")
         if e0.shape != (self.model.nbasis,):
             raise ValueError(f"Argument init_expons shape != ({self.model.nbasis},)")
+        if isinstance(record, str):
+            if record not in ("final", "kl"):
+                raise ValueError(f"Argument record {record} should be 'final' or 'kl'.")
+            every = None
+        elif isinstance(record, (int, np.integer)) and not isinstance(record, bool):
+            if record < 1:
+                raise ValueError(f"Argument record {record} should be a positive integer.")
+            every = record
+        else:
+            raise TypeError(f"Argument record {type(record)} should be an integer or string.")
+        if not isinstance(anderson, (int, np.integer)) or anderson < 0:
+            raise ValueError(f"Argument anderson {anderson} should be a non-negative integer.")
+        if not isinstance(checkpoint_every, (int, np.integer)) or checkpoint_every < 1:
+            raise ValueError(f"Argument checkpoint_every {checkpoint_every} should be a positive "
+                             f"integer.")
+        if observer is not None and not isinstance(observer, Observer):
+            raise TypeError(f"Argument observer {type(observer)} should be an Observer.")
+        mixing = _AndersonMixing(anderson) if anderson > 0 else None
+        # KL divergence is computed from the updates, unless it is recorded every iteration
+        lazy = every != 1 or mixing is not None
+        accelerated, naccel = False, 0
+        # plain update & its divergence, used when the Anderson mixing is restarted
+        fun_base, plain_cs, plain_es = np.inf, c0, e0
 
         new_cs, new_es = c0, e0
 
@@ -364,8 +861,29 @@ class KLDivergenceFPI(_BaseFit):
         max_diff_expons = np.inf
 
         fun, performance = [], []
-        niter = 0
+        niter, recorded = 0, False
+        # number of history files of the checkpoint & of values of fun & performance in them
+        nhistory, nfun, nperformance = 0, 0, 0
+        nevals = self._nevals
         start = timer()
+        if resume is not None:
+            state = _load_checkpoint(resume, "KLDivergenceFPI")
+            new_cs, new_es = state["coeffs"], state["exps"]
+            if new_cs.shape != c0.shape:
+                raise ValueError(f"Checkpoint {resume} has {new_cs.size} basis functions, "
+                                 f"not {c0.size}.")
+            nhistory = int(state["nhistory"])
+            history = _load_history(resume, "KLDivergenceFPI", nhistory)
+            fun, performance = history.get("fun", []), history.get("performance", [])
+            nfun, nperformance = len(fun), len(performance)
+            niter, recorded = int(state["niter"]), bool(state["recorded"])
+            naccel = int(state["naccel"])
+            diff_divergence, max_diff_coeffs, max_diff_expons = state["diffs"]
+            accelerated, fun_base = bool(state["accelerated"]), state["fun_base"][()]
+            plain_cs, plain_es = state["plain_coeffs"], state["plain_exps"]
+            if mixing is not None:
+                mixing._iterates, mixing._updates = list(state["iterates"]), list(state["updates"])
+            start -= float(state["time"])
 
         if disp:
             # Template for the header.
@@ -389,30 +907,96 @@ class KLDivergenceFPI(_BaseFit):
             # update old coeffs & expons
             old_cs, old_es = new_cs, new_es
             # update coeffs and/or exponents
-            if opt_coeffs and opt_expons:
-                new_cs, new_es = self._update_params(new_cs, new_es, True, True)
-            elif opt_coeffs:
-                new_cs, new_es = self._update_params(new_cs, new_es, True, False)
-            elif opt_expons:
-                new_cs, new_es = self._update_params(new_cs, new_es, False, True)
-            else:
+            if not opt_coeffs and not opt_expons:
                 raise ValueError("Both opt_coeffs & opt_expons are False! Nothing to optimize!")
+            update = self._update_params(new_cs, new_es, opt_coeffs, opt_expons, lazy)
+            new_cs, new_es = update[:2]
+            if mixing is not None:
+                if accelerated and update[2] > fun_base:
+                    # the accelerated parameters increased the divergence, so restart the mixing
+                    # from the plain update of the previous parameters
+                    mixing.reset()
+                    naccel -= 1
+                    old_cs, old_es = plain_cs, plain_es
+                    update = self._update_params(old_cs, old_es, opt_coeffs, opt_expons, True)
+                fun_base, (plain_cs, plain_es) = update[2], update[:2]
+                new_cs, new_es, accelerated = self._anderson_mix(
+                    mixing, old_cs, old_es, plain_cs, plain_es
+                )
+                naccel += accelerated
             # compute max change in cs & expons
             max_diff_coeffs = np.max(np.abs(new_cs - old_cs))
             max_diff_expons = np.max(np.abs(new_es - old_es))
             # compute errors & update niter
-            performance.append(self.goodness_of_fit(new_cs, new_es))
-            fun.append(performance[-1][-1])
             niter += 1
+            recorded = not lazy or (every is not None and niter % every == 0)
+            if recorded:
+                performance.append(self.goodness_of_fit(new_cs, new_es))
+            if not lazy:
+                fun.append(performance[-1][-1])
+            elif niter != 1:
+                # divergence of the previous iteration, i.e. the parameters of this update
+                fun.append(update[2])
 
             # compute absolute change in divergence
-            if niter != 1:
-                diff_divergence = np.abs(performance[niter - 1][-1] - performance[niter - 2][-1])
-
-            if disp:
+            if len(fun) > 1:
+                diff_divergence = np.abs(fun[-1] - fun[-2])
+            if observer is not None:
+                # the observer receives every iteration, so only the values needed by the next
+                # iteration are kept, rather than the whole history
+                del fun[:-2], performance[:-1]
+
+            if disp and recorded:
                 print(template_iters.format(
                      niter, *performance[-1], max_diff_coeffs, max_diff_expons, diff_divergence)
                 )
+            if observer is not None:
+                observer.update({
+                    "algorithm": type(self).__name__, "iteration": niter,
+                    "time": timer() - start, "fun": float(fun[-1]) if fun else None,
+                    "nevals": self._nevals - nevals, "delta_coeffs": float(max_diff_coeffs),
+                    "delta_exps": float(max_diff_expons), "delta_fun": float(diff_divergence),
+                    "performance": [float(x) for x in performance[-1]] if recorded else None,
+                    "accelerated": accelerated,
+                })
+
+            if checkpoint is not None and niter % checkpoint_every == 0:
+                if observer is not None:
+                    # only the last values are kept (see above), which replace the previous ones
+                    nhistory, nfun, nperformance = 0, 0, 0
+                # only the values added since the previous checkpoint are saved
+                _save_history(
+                    checkpoint, "KLDivergenceFPI", nhistory, fun=np.array(fun[nfun:]),
+                    performance=np.array(performance[nperformance:]),
+                )
+                nhistory, nfun, nperformance = nhistory + 1, len(fun), len(performance)
+                _save_checkpoint(
+                    checkpoint, "KLDivergenceFPI", coeffs=new_cs, exps=new_es, nhistory=nhistory,
+                    niter=niter, recorded=recorded, naccel=naccel,
+                    diffs=[diff_divergence, max_diff_coeffs, max_diff_expons],
+                    accelerated=accelerated, fun_base=fun_base, plain_coeffs=plain_cs,
+                    plain_exps=plain_es, time=timer() - start,
+                    iterates=np.array(mixing._iterates if mixing is not None else []),
+                    updates=np.array(mixing._updates if mixing is not None else []),
+                )
+
+        if lazy and niter != 0:
+            # divergence (and performance measures) of the last iteration
+            if recorded:
+                final = performance[-1]
+            else:
+                final = self.goodness_of_fit(new_cs, new_es)
+                if record != "kl":
+                    performance.append(final)
+            fun.append(final[-1])
+            if len(fun) > 1:
+                diff_divergence = np.abs(fun[-1] - fun[-2])
+            if disp and not recorded and record != "kl":
+                print(template_iters.format(
+                     niter, *final, max_diff_coeffs, max_diff_expons, diff_divergence)
+                )
+        if observer is not None:
+            del fun[:-1], performance[:-1]
 
         end = timer()
         time = end - start
@@ -435,10 +1019,55 @@ class KLDivergenceFPI(_BaseFit):
                    "fun": np.array(fun),
                    "success": success,
                    "performance": np.array(performance),
-                   "time": time}
+                   "time": time,
+                   "niter": niter,
+                   "naccel": naccel}
 
         return results
 
+    @staticmethod
+    def _anderson_mix(mixing, coeffs, expons, new_coeffs, new_expons):
+        r"""
+        Return the parameters mixed with the previous ones, or the plain update if unsafe.
+
+        The logarithms of the parameters are mixed, so they remain positive, and the mixed
+        coefficients are rescaled to the sum of the updated coefficients (i.e. normalization).
+
+        Parameters
+        ----------
+        mixing : _AndersonMixing
+            The Anderson mixing of the previous iterates.
+        coeffs, expons : ndarray
+            The coefficients & exponents of the current iteration.
+        new_coeffs, new_expons : ndarray
+            The coefficients & exponents of the plain fixed-point update.
+
+        Returns
+        -------
+        coeffs, expons : ndarray
+            The coefficients & exponents of the next iteration.
+        accelerated : bool
+            Whether the returned parameters are the mixed ones.
+
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            update = np.log(np.concatenate((new_coeffs, new_expons)))
+            mixed = mixing.mix(np.log(np.concatenate((coeffs, expons))), update)
+        if mixed is update:
+            return new_coeffs, new_expons, False
+        with np.errstate(over="ignore"):
+            mixed = np.exp(mixed)
+        nbasis = len(coeffs)
+        mixed_coeffs, mixed_expons = mixed[:nbasis], mixed[nbasis:]
+        norm = np.sum(new_coeffs)
+        scale = norm / np.sum(mixed_coeffs)
+        # fall back to the plain update if the mixing broke positivity or normalization
+        if not np.all(np.isfinite(mixed)) or not np.all(mixed > 0.) or \
+                not np.abs(scale - 1.) < 0.5:
+            mixing.reset()
+            return new_coeffs, new_expons, False
+        return mixed_coeffs * scale, mixed_expons, True
+
 
 class ScipyFit(_BaseFit):
     r"""
@@ -468,7 +1097,8 @@ class ScipyFit(_BaseFit):
     """
 
     def __init__(self, grid, density, model, measure=KLDivergence, method="SLSQP", weights=None,
-                 integral_dens=None, spherical=False, mask_value=1e-18):
+                 integral_dens=None, spherical=False, mask_value=1e-18, vjp=False,
+                 analytic_norm=False):
         r"""
         Construct the ScipyFit object.
 
@@ -498,6 +1128,19 @@ class ScipyFit(_BaseFit):
         mask_value : float, optional
             Mask value used for calculating the Kullback-Leibler divergence. This value sets
             :math:`\log(f(x) / g(x)) = 0` when `g(x)` is less than the mask value.
+        vjp : bool, optional
+            If true, the derivatives of the objective function and constraint are computed as
+            vector-Jacobian products of the model (see `AtomicGaussianDensity.vjp`), without
+            storing the derivative of the model on the grid points of shape (N, 2M).
+            This reduces the memory from :math:`O(NM)` to :math:`O(N + M)`, e.g. for
+            three-dimensional grids. The grid should have quadrature weights.
+        analytic_norm : bool, optional
+            If true, the normalization constraint & its derivatives are computed from the
+            closed-form integrals of the model over the whole space (see
+            `AtomicGaussianDensity.integral`) instead of the grid. The grid should then cover
+            the model, otherwise the optimizer can move density beyond the grid points where
+            the objective function doesn't see it. Requires a model with closed-form integrals
+            over the domain of integration.
 
         """
         if np.any(abs(grid.points - model.points) > 1.e-12):
@@ -515,9 +1158,26 @@ class ScipyFit(_BaseFit):
             weights = np.ones(len(density))
         self.weights = weights
         super().__init__(grid, density, model, measure, integral_dens, spherical, mask_value)
-
+        if vjp and self._quad_weights is None:
+            raise ValueError("Argument vjp requires a grid with quadrature weights.")
+        self._vjp = vjp
+        if analytic_norm and not self._analytic:
+            raise ValueError("Argument analytic_norm requires a model with closed-form integrals.")
+        self._analytic_norm = analytic_norm
+        # quantities computed at the last evaluated parameters, shared by objective & constraint
+        self._memo = None
+        # quantities computed at the last parameters probed by the finite differences of SLSQP
+        self._probe_memo = None
+
+    def __getstate__(self):
+        r"""Return the state of the fitting object without its memo, for copying & pickling."""
+        state = super().__getstate__()
+        state["_memo"], state["_probe_memo"] = None, None
+        return state
+
+    @_profiled_run("fit.run")
     def run(self, c0, e0, opt_coeffs=True, opt_expons=True, maxiter=1000, tol=1.e-14, disp=False,
-            with_constraint=True):
+            with_constraint=True, hessian=False, observer=None):
         r"""
         Optimize coefficients and/or exponents of Gaussian basis functions with constraint.
 
@@ -542,6 +1202,20 @@ class ScipyFit(_BaseFit):
         with_constraint : bool
             If true, then adds the constraint that the integration of the model density must
             be equal to the constraint of true density. The default is True.
+        hessian : bool
+            If true, then the analytic Hessian of the objective function & the constraint are
+            used by trust-constr (instead of quasi-Newton approximations). Only supported for
+            the trust-constr method and measures implementing `second_derivative`.
+            The default is False.
+        observer : Observer, optional
+            If provided, its `update` method receives the record of each iteration of
+            `scipy.optimize.minimize` (see `bfit.observer.Observer`), with the additional keys
+            "delta_coeffs" & "delta_exps", the maximum absolute change in coefficients & exponents
+            since the previous iteration.
+        profile : bool or Profile, optional
+            If true or a `Profile` object, the number of calls & time spent in the evaluations of
+            the model & measure, the integrations and the other instrumented methods are recorded
+            during the run (see `bfit.profiling.Profile`). Default is False.
 
         Returns
         -------
@@ -565,12 +1239,23 @@ class ScipyFit(_BaseFit):
                 as computed by `_BaseFit.goodness_of_fit` method.
             "time" : float
                 The time in seconds it took to optimize.
+            "niter" : int or None
+                The number of iterations of `scipy.optimize.minimize`, or None if the method
+                doesn't report it.
+            "profile" : dict
+                The number of calls & time spent in each instrumented method, as returned by
+                `Profile.totals`. Only included if `profile` is enabled.
 
         Notes
         -----
         - The coefficients and exponents are bounded to be positive.
 
         """
+        if hessian and self.method != "trust-constr":
+            raise ValueError(f"Argument hessian is only supported by trust-constr, not "
+                             f"{self.method}.")
+        if observer is not None and not isinstance(observer, Observer):
+            raise TypeError(f"Argument observer {type(observer)} should be an Observer.")
         # set bounds, initial guess & args
         if opt_coeffs and opt_expons:
             bounds = [(1.e-12, np.inf)] * 2 * self.model.nbasis
@@ -590,9 +1275,18 @@ class ScipyFit(_BaseFit):
         constraints = []
         if with_constraint:
             if self.method == "slsqp":
+                # the derivative of the constraint is approximated by SLSQP with finite differences
+                # of const_norm, which only needs the (cheaper) model value at each step. The
+                # exact derivative makes symmetric initial guesses (e.g. identical p-type
+                # functions) converge to other local minima.
                 constraints = [{"fun": self.const_norm, "type": "eq", "args": args}]
             elif self.method == "trust-constr":
-                constraints = [NonlinearConstraint(self.const_norm, 0.0, 0.0, jac="3-point")]
+                constraints = [NonlinearConstraint(
+                    lambda x: self.const_norm(x, *args), 0.0, 0.0,
+                    jac=lambda x: self.const_norm_jac(x, *args)[None, :],
+                    **({"hess": lambda x, v: v[0] * self.const_norm_hess(x, *args)}
+                       if hessian else {})
+                )]
         # set optimization options
         if self.method == "slsqp":
             options = {"ftol": tol, "maxiter": maxiter, "disp": disp}
@@ -651,17 +1345,26 @@ class ScipyFit(_BaseFit):
         # optimize
         # scipy.minimize no longer supports extended precision
         x0 = x0.astype(np.float64)
+        # forget evaluations of previous runs, the model may have changed since
+        self._memo, self._probe_memo = None, None
         start = timer()  # Start timer
-        res = minimize(fun=self.func,
-                       x0=x0,
-                       args=args,
-                       method=self.method,
-                       jac=True,
-                       bounds=bounds,
-                       constraints=constraints,
-                       options=options,
-                       callback=callback,
-                       )
+        if observer is not None:
+            callback = self._observer_callback(observer, callback, x0, args, start)
+        if callback is not None and self._profile is not None:
+            callback = _profiled_function(self._profile, "fit.callback", callback)
+        # with fixed exponents, the Gaussian columns are evaluated once & reused by the model
+        with self.model._cache_columns(0 if opt_expons else self.model.nbasis):
+            res = minimize(fun=self.func,
+                           x0=x0,
+                           args=args,
+                           method=self.method,
+                           jac=True,
+                           hess=self.hess if hessian else None,
+                           bounds=bounds,
+                           constraints=constraints,
+                           options=options,
+                           callback=callback,
+                           )
         end = timer()
         time = end - start
 
@@ -694,9 +1397,58 @@ class ScipyFit(_BaseFit):
                    "message": res["message"],
                    "jacobian": res["jac"],
                    "performance": np.array(self.goodness_of_fit(coeffs, expons)),
-                   "time": time}
+                   "time": time,
+                   "niter": res.get("nit")}
         return results
 
+    def _observer_callback(self, observer, callback, x0, args, start):
+        r"""
+        Return the callback of `scipy.optimize.minimize` sending the records to the observer.
+
+        Parameters
+        ----------
+        observer : Observer
+            The observer receiving the record of each iteration.
+        callback : callable or None
+            The callback (printing the performance measures) also called at each iteration.
+        x0 : ndarray
+            The initial parameters.
+        args : tuple
+            Additional arguments to the model.
+        start : float
+            The time at which the optimization started.
+
+        Returns
+        -------
+        callable :
+            The callback taking the parameters of the iteration (and the state of the optimizer).
+
+        """
+        state = {"x": x0, "iteration": 0, "nevals": self._nevals}
+
+        def observe(xk, *optimizer_state):
+            if callback is not None:
+                callback(xk, *optimizer_state)
+            # the objective function was (almost always) evaluated at these parameters
+            memo = self._memo
+            if memo is not None and "obj" in memo and np.array_equal(memo["x"], xk):
+                fun = memo["obj"]
+            else:
+                fun = self.func(xk, *args)[0]
+            coeffs, expons, _, _ = self._split_parameters(xk, *args)
+            old_coeffs, old_expons, _, _ = self._split_parameters(state["x"], *args)
+            state["x"] = np.copy(xk)
+            state["iteration"] += 1
+            observer.update({
+                "algorithm": type(self).__name__, "iteration": state["iteration"],
+                "time": timer() - start, "fun": float(fun),
+                "nevals": self._nevals - state["nevals"],
+                "delta_coeffs": float(np.max(np.abs(coeffs - old_coeffs), initial=0.)),
+                "delta_exps": float(np.max(np.abs(expons - old_expons), initial=0.)),
+            })
+        return observe
+
+    @_profiled("fit.func")
     def func(self, x, *args):
         r"""Compute objective function and its derivative w.r.t. Gaussian basis parameters.
 
@@ -714,20 +1466,126 @@ class ScipyFit(_BaseFit):
             The objective function value and its derivative wrt to coefficients and exponents.
 
         """
-        # compute linear combination of gaussian basis functions
-        m, dm = self.evaluate_model(x, *args)
-        # compute KL divergence
-        k, dk = self.measure.evaluate(self.density, m, deriv=True)
-        # compute objective function & its derivative
-        obj = self.integrate(self.weights * k)
-        d_obj = np.zeros_like(x)
-        for index in range(len(x)):
-            d_obj[index] = self.integrate(self.weights * dk * dm[:, index])
-        return obj, d_obj
+        memo = self._evaluate_memo(x, *args, deriv=not self._vjp)
+        if "obj" not in memo:
+            # compute KL divergence
+            k, dk = self.measure.evaluate(self.density, memo["m"], deriv=True)
+            # compute objective function & its derivative
+            memo["obj"] = self.integrate(self.weights * k)
+            memo["d_obj"] = np.zeros_like(x)
+            if self._vjp:
+                vector = self._quad_weights * self.weights * dk
+                memo["d_obj"][:] = self.evaluate_model_vjp(x, vector, *args)
+            else:
+                memo["d_obj"][:] = self.integrate_many(memo["dm"], self.weights * dk)
+        return memo["obj"], memo["d_obj"].copy()
+
+    @_profiled("fit.hess")
+    def hess(self, x, *args):
+        r"""Compute the Hessian of objective function w.r.t. Gaussian basis parameters.
 
+        The Hessian of :math:`\int w(x) D(f(x), g(x)) dx` is the sum of
+        :math:`\int w D'' \nabla g \nabla g^T dx` and :math:`\int w D' \nabla^2 g dx`,
+        where :math:`D', D''` are the derivatives of the measure w.r.t. model density and the
+        Hessian of the model :math:`\nabla^2 g` is block-diagonal for each basis function.
+
+        Parameters
+        ----------
+        x : ndarray
+            The parameters of Gaussian basis which is being optimized. Contains both the
+            coefficients and exponents together in a 1-D array.
+        args :
+            Additional arguments to the model.
+
+        Returns
+        -------
+        ndarray :
+            The Hessian of objective function w.r.t. parameters `x`.
+
+        """
+        memo = self._evaluate_memo(x, *args, deriv=True)
+        if "hess" not in memo:
+            factor = self.weights * self.measure.second_derivative(self.density, memo["m"])
+            hessian = np.array([self.integrate_many(memo["dm"], factor * column)
+                                for column in memo["dm"].T])
+            memo["hess"] = hessian + self._model_hessian(x, self._measure_derivative(memo), *args)
+        return memo["hess"].copy()
+
+    @_profiled("fit.hessp")
+    def hessp(self, x, p, *args):
+        r"""Compute the product of the Hessian of objective function with a vector.
+
+        This is the product of `hess` with vector `p` without computing the Hessian, i.e.
+        :math:`\int w D'' (\nabla g \cdot p) \nabla g dx + \int w D' \nabla^2 g p dx`.
+
+        Parameters
+        ----------
+        x : ndarray
+            The parameters of Gaussian basis which is being optimized. Contains both the
+            coefficients and exponents together in a 1-D array.
+        p : ndarray
+            The vector multiplying the Hessian, with the same shape as `x`.
+        args :
+            Additional arguments to the model.
+
+        Returns
+        -------
+        ndarray :
+            The product of the Hessian of objective function w.r.t. parameters `x` with `p`.
+
+        """
+        memo = self._evaluate_memo(x, *args, deriv=True)
+        if "hess" in memo:
+            return np.dot(memo["hess"], p)
+        factor = self.weights * self.measure.second_derivative(self.density, memo["m"])
+        product = self.integrate_many(memo["dm"], factor * np.dot(memo["dm"], p))
+        return product + np.dot(self._model_hessian(x, self._measure_derivative(memo), *args), p)
+
+    def _measure_derivative(self, memo):
+        r"""Return the weighted derivative of the measure w.r.t. the model density in memo."""
+        if "d_measure" not in memo:
+            _, dk = self.measure.evaluate(self.density, memo["m"], deriv=True)
+            memo["d_measure"] = self.weights * dk
+        return memo["d_measure"]
+
+    def _model_hessian(self, x, factor, *args):
+        r"""
+        Compute the integrals of a factor times the Hessian of the model w.r.t. parameters `x`.
+
+        Parameters
+        ----------
+        x : ndarray
+            The parameters of Gaussian basis-functions.
+        factor : ndarray(N,)
+            The function multiplying the Hessian of the model on the grid points.
+        args :
+            Additional parameters for the model.
+
+        Returns
+        -------
+        ndarray :
+            The (block-diagonal) matrix :math:`\int h(x) \nabla^2 g(x) dx` w.r.t. `x`.
+
+        """
+        memo = self._evaluate_memo(x, *args, deriv=False)
+        coeffs, expons, start, end = self._split_parameters(x, *args)
+        if "d2m" not in memo:
+            memo["d2m"] = self.model.second_derivative(coeffs, expons)
+        nbasis = self.model.nbasis
+        index = np.arange(nbasis)
+        hessian = np.zeros((2 * nbasis, 2 * nbasis))
+        hessian[index, nbasis + index] = self.integrate_many(memo["d2m"][0], factor)
+        hessian[nbasis + index, index] = hessian[index, nbasis + index]
+        hessian[nbasis + index, nbasis + index] = self.integrate_many(memo["d2m"][1], factor)
+        return hessian[start:end, start:end]
+
+    @_profiled("fit.const_norm")
     def const_norm(self, x, *args):
         r"""Compute deviation in normalization constraint :math:`\sum c_i - \int f(x) dx`.
 
+        The integral of the model is computed analytically if `analytic_norm` is true,
+        otherwise it is integrated on the grid.
+
         Parameters
         ----------
         x : ndarray
@@ -742,12 +1600,136 @@ class ScipyFit(_BaseFit):
             The deviation of the integrla with the normalization constant.
 
         """
-        # compute linear combination of gaussian basis functions
-        m, _ = self.evaluate_model(x, *args)
-        cons = self.integral_dens - self.integrate(m)
-        return cons
+        if self._analytic_norm:
+            coeffs, expons, _, _ = self._split_parameters(x, *args)
+            return self.integral_dens - self.model.integral(coeffs, expons)
+        memo = self._evaluate_memo(x, *args, deriv=False, probe=True)
+        if "cons" not in memo:
+            memo["cons"] = self.integral_dens - self.integrate(memo["m"])
+        return memo["cons"]
+
+    @_profiled("fit.const_norm_jac")
+    def const_norm_jac(self, x, *args):
+        r"""Compute derivative of normalization constraint w.r.t. Gaussian basis parameters.
+
+        This is :math:`-\int \frac{\partial f(x)}{\partial \theta_j} dx` for each parameter
+        :math:`\theta_j` being optimized, i.e. minus the integrals of the model derivatives.
+
+        Parameters
+        ----------
+        x : ndarray
+            The parameters of Gaussian basis-functions. Contains both the
+            coefficients and exponents together in a 1-D array.
+        args :
+            Additional parameters for the model.
+
+        Returns
+        -------
+        ndarray :
+            The derivative of the constraint w.r.t. each parameter in `x`.
+
+        """
+        if self._analytic_norm:
+            coeffs, _, start, end = self._split_parameters(x, *args)
+            moments = self._moments(x, 1, *args)
+            return -np.concatenate((moments[0], coeffs * moments[1]))[start:end]
+        memo = self._evaluate_memo(x, *args, deriv=not self._vjp)
+        if "d_cons" not in memo:
+            memo["d_cons"] = np.zeros_like(x)
+            if self._vjp:
+                memo["d_cons"][:] = -self.evaluate_model_vjp(x, self._quad_weights, *args)
+            else:
+                memo["d_cons"][:] = -self.integrate_many(memo["dm"])
+        return memo["d_cons"].copy()
+
+    @_profiled("fit.const_norm_hess")
+    def const_norm_hess(self, x, *args):
+        r"""Compute the Hessian of normalization constraint w.r.t. Gaussian basis parameters.
 
-    def evaluate_model(self, x, *args):
+        This is minus the integrals of the (block-diagonal) second derivatives of the model.
+
+        Parameters
+        ----------
+        x : ndarray
+            The parameters of Gaussian basis-functions. Contains both the
+            coefficients and exponents together in a 1-D array.
+        args :
+            Additional parameters for the model.
+
+        Returns
+        -------
+        ndarray :
+            The Hessian of the constraint w.r.t. parameters `x`.
+
+        """
+        if self._analytic_norm:
+            coeffs, _, start, end = self._split_parameters(x, *args)
+            moments = self._moments(x, 2, *args)
+            nbasis = self.model.nbasis
+            index = np.arange(nbasis)
+            hessian = np.zeros((2 * nbasis, 2 * nbasis))
+            hessian[index, nbasis + index] = -moments[1]
+            hessian[nbasis + index, index] = -moments[1]
+            hessian[nbasis + index, nbasis + index] = -coeffs * moments[2]
+            return hessian[start:end, start:end]
+        memo = self._evaluate_memo(x, *args, deriv=False)
+        if "hess_cons" not in memo:
+            memo["hess_cons"] = -self._model_hessian(x, None, *args)
+        return memo["hess_cons"].copy()
+
+    def _moments(self, x, deriv, *args):
+        r"""Return the analytic integrals of the basis functions & their exponent derivatives."""
+        _, expons, _, _ = self._split_parameters(x, *args)
+        return self.model.moments(expons, deriv=deriv).astype(float)
+
+    def _evaluate_memo(self, x, *args, deriv=True, probe=False):
+        r"""
+        Return the quantities computed at parameters `x`, evaluating the model if needed.
+
+        The optimizer calls the objective function, the constraint & its derivative at the
+        same parameters, so the model evaluation (and quantities derived from it) of the last
+        parameters is stored and reused. SLSQP approximates the derivative of the constraint by
+        finite differences, i.e. it evaluates the constraint at probes around the current
+        parameters. The last probe is stored separately, so that the probes don't evict the
+        evaluation at the current parameters.
+
+        Parameters
+        ----------
+        x : ndarray
+            The parameters of Gaussian basis-functions.
+        args :
+            Additional parameters for the model.
+        deriv : bool, optional
+            Whether the derivative of the model density is needed.
+        probe : bool, optional
+            Whether `x` may be a probe of the finite differences, in which case a new evaluation
+            replaces the last probe rather than the evaluation at the current parameters.
+
+        Returns
+        -------
+        dict :
+            Dictionary containing the model density "m" & its derivative "dm" (if `deriv`
+            is true), and any other quantity already computed at these parameters.
+
+        """
+        for memo in (self._memo, self._probe_memo):
+            if memo is not None and len(memo["args"]) == len(args) and \
+                    np.array_equal(memo["x"], x) and \
+                    all(np.array_equal(a, b) for a, b in zip(memo["args"], args)):
+                break
+        else:
+            memo = {"x": np.copy(x), "args": tuple(np.copy(a) for a in args)}
+            self._probe_memo = memo
+        if not probe and memo is self._probe_memo:
+            # parameters of the objective function are the current ones
+            self._memo, self._probe_memo = memo, None
+        if deriv and "dm" not in memo:
+            memo["m"], memo["dm"] = self.evaluate_model(x, *args)
+        elif "m" not in memo:
+            memo["m"] = self.evaluate_model(x, *args, deriv=False)
+        return memo
+
+    def evaluate_model(self, x, *args, deriv=True):
         r"""
         Evaluate the model density & its derivative.
 
@@ -758,14 +1740,48 @@ class ScipyFit(_BaseFit):
             coefficients and exponents together in a 1-D array.
         args :
             Additional parameters for the model.
+        deriv : bool, optional
+            Whether to compute the derivative of the model density w.r.t. parameters `x`.
 
         Returns
         -------
         float, ndarray :
-            Evaluates the model density & its derivative.
+            Evaluates the model density & its derivative (only returned if `deriv=True`).
 
         """
-        # assign coefficients & exponents
+        coeffs, expons, start, end = self._split_parameters(x, *args)
+        self._nevals += 1
+        if not deriv:
+            return self.model.evaluate(coeffs, expons)
+        # compute model density & its derivative
+        m, dm = self.model.evaluate(coeffs, expons, deriv=True)
+        return m, dm[:, start: end]
+
+    def evaluate_model_vjp(self, x, vector, *args):
+        r"""
+        Evaluate the vector-Jacobian product of the model density w.r.t. parameters `x`.
+
+        Parameters
+        ----------
+        x : ndarray
+            The parameters of Gaussian basis-functions. Contains both the
+            coefficients and exponents together in a 1-D array.
+        vector : ndarray(N,)
+            The vector evaluated on the grid points that multiplies the derivative of the model.
+        args :
+            Additional parameters for the model.
+
+        Returns
+        -------
+        ndarray :
+            The product of `vector` with the derivative of the model w.r.t. each parameter in `x`.
+
+        """
+        coeffs, expons, start, end = self._split_parameters(x, *args)
+        return self.model.vjp(coeffs, expons, vector)[start: end]
+
+    def _split_parameters(self, x, *args):
+        r"""Return coefficients, exponents & range of model parameters corresponding to `x`."""
         if len(args) != 0:
             if args[0] == "fixed_coeffs":
                 coeffs = args[1]
@@ -780,6 +1796,506 @@ class ScipyFit(_BaseFit):
         else:
             coeffs, expons = x[:self.model.nbasis], x[self.model.nbasis:]
             start, end = 0, 2 * self.model.nbasis
-        # compute model density & its derivative
-        m, dm = self.model.evaluate(coeffs, expons, deriv=True)
-        return m, dm[:, start: end]
+        return coeffs, expons, start, end
+
+
+def _extend_cholesky(gram, order, lower, index):
+    r"""
+    Return the Cholesky factor of the Gram matrix of the passive set extended by one index.
+
+    Parameters
+    ----------
+    gram : ndarray(M, M)
+        The Gram matrix.
+    order : list[int]
+        The indices of the passive set, in the order of the rows of the factor.
+    lower : ndarray(K, K)
+        The lower-triangular Cholesky factor of `gram[order][:, order]`.
+    index : int
+        The index added to the passive set.
+
+    Returns
+    -------
+    ndarray(K + 1, K + 1) or None :
+        The extended factor, or None if the basis function of `index` is (numerically) a linear
+        combination of the ones of the passive set.
+
+    """
+    if order:
+        row = solve_triangular(lower, gram[order, index], lower=True, check_finite=False)
+    else:
+        row = np.zeros(0)
+    diag = gram[index, index] - np.dot(row, row)
+    if diag <= 10. * np.finfo(float).eps * len(gram) * gram[index, index]:
+        return None
+    size = len(order)
+    extended = np.zeros((size + 1, size + 1))
+    extended[:size, :size] = lower
+    extended[size, :size] = row
+    extended[size, size] = np.sqrt(diag)
+    return extended
+
+
+def _cholesky_passive(gram, order):
+    r"""Return the passive set without dependent basis functions & its Cholesky factor."""
+    if order:
+        try:
+            lower = np.linalg.cholesky(gram[np.ix_(order, order)])
+            diag = np.diag(lower) ** 2
+            if np.all(diag > 10. * np.finfo(float).eps * len(gram) * gram[order, order]):
+                return list(order), lower
+        except np.linalg.LinAlgError:
+            pass
+    # some basis functions are (numerically) dependent, so they are dropped one by one
+    kept, lower = [], np.zeros((0, 0))
+    for index in order:
+        extended = _extend_cholesky(gram, kept, lower, index)
+        if extended is not None:
+            kept, lower = kept + [index], extended
+    return kept, lower
+
+
+def _cholesky_solve(lower, vector):
+    r"""Solve the linear system with the matrix given by its lower-triangular Cholesky factor."""
+    vector = solve_triangular(lower, vector, lower=True, check_finite=False)
+    return solve_triangular(lower.T, vector, lower=False, check_finite=False)
+
+
+def _gram_nnls(gram, vector, passive=None, factor=None, maxiter=None):
+    r"""
+    Solve the non-negative least-squares problem with the Gram matrix by an active-set method.
+
+    This minimizes :math:`c^T G c - 2 b^T c` subject to :math:`c \geq 0` with the Lawson-Hanson
+    active-set method on the :math:`M \times M` system. The Cholesky factor of the Gram matrix
+    of the passive set (i.e. positive coefficients) is extended by one row when a basis function
+    is added to it, and only recomputed when basis functions are removed from it.
+
+    Parameters
+    ----------
+    gram : ndarray(M, M)
+        The (symmetric positive semi-definite) Gram matrix :math:`G`.
+    vector : ndarray(M,)
+        The projections :math:`b` of the density on the basis functions.
+    passive : list[int], optional
+        The initial passive set, e.g. the passive set of a similar problem (warm start).
+    factor : ndarray(K, K), optional
+        The lower-triangular Cholesky factor of the Gram matrix of the initial passive set.
+        If None, it is computed.
+    maxiter : int, optional
+        Maximum number of basis functions added to the passive set. Default is :math:`3M`.
+
+    Returns
+    -------
+    coeffs : ndarray(M,)
+        The non-negative coefficients.
+    passive : list[int]
+        The final passive set.
+    factor : ndarray(K, K)
+        The Cholesky factor of the Gram matrix of the final passive set.
+
+    """
+    # the factorization is done in double precision (LAPACK), whatever the grid precision
+    gram, vector = np.asarray(gram, dtype=float), np.asarray(vector, dtype=float)
+    nbasis = len(vector)
+    maxiter = 3 * nbasis if maxiter is None else maxiter
+    scale = 10. * np.finfo(float).eps * nbasis
+    coeffs = np.zeros(nbasis)
+    order, lower = [], np.zeros((0, 0))
+    if passive is not None and len(passive) != 0:
+        if factor is None:
+            order, lower = _cholesky_passive(gram, list(passive))
+        else:
+            order, lower = list(passive), factor
+        # drop the basis functions of the initial passive set with non-positive coefficients,
+        # so that the active-set iterations start from a feasible point
+        while order:
+            solution = _cholesky_solve(lower, vector[order])
+            if np.all(solution > 0.):
+                coeffs[order] = solution
+                break
+            order, lower = _cholesky_passive(
+                gram, [i for i, value in zip(order, solution) if value > 0.]
+            )
+    excluded = np.zeros(nbasis, dtype=bool)
+    for _ in range(maxiter):
+        # negative gradient of the objective function (divided by 2)
+        gradient = vector - np.dot(gram, coeffs)
+        # the gradient is only accurate up to the rounding errors of its terms
+        tol = scale * np.max(np.abs(vector) + np.dot(np.abs(gram), coeffs), initial=0.)
+        gradient[order] = -np.inf
+        gradient[excluded] = -np.inf
+        index = np.argmax(gradient)
+        if gradient[index] <= tol:
+            break
+        extended = _extend_cholesky(gram, order, lower, index)
+        if extended is None:
+            excluded[index] = True
+            continue
+        order, lower = order + [index], extended
+        while True:
+            solution = _cholesky_solve(lower, vector[order])
+            if np.all(solution > 0.):
+                coeffs[:] = 0.
+                coeffs[order] = solution
+                break
+            # move towards the solution until a coefficient becomes zero & remove it
+            current = coeffs[order]
+            negative = solution <= 0.
+            step = current[negative] - solution[negative]
+            ratios = np.divide(current[negative], step, out=np.zeros_like(step), where=step > 0.)
+            current += np.min(ratios) * (solution - current)
+            remove = negative & (current <= 0.)
+            remove[np.argmin(np.where(negative, current, np.inf))] = True
+            excluded[index] |= bool(remove[-1])
+            values = dict(zip(order, current))
+            order, lower = _cholesky_passive(
+                gram, [i for i, flag in zip(order, remove) if not flag]
+            )
+            coeffs[:] = 0.
+            coeffs[order] = [values[i] for i in order]
+            if not order:
+                break
+    return coeffs, order, lower
+
+
+def _gram_nnls_keys(gram, vector, keys, parent=None):
+    r"""
+    Solve the non-negative least-squares problem, warm started from the state of another basis.
+
+    Parameters
+    ----------
+    gram : ndarray(M, M)
+        The Gram matrix of the basis functions.
+    vector : ndarray(M,)
+        The projections of the density on the basis functions.
+    keys : list
+        The (hashable) keys identifying each basis function.
+    parent : tuple, optional
+        The solver state of another set of basis functions, i.e. the keys of its passive set
+        & their Cholesky factor. The passive basis functions which are also in this basis are
+        the initial passive set, and the factor is reused if all of them are.
+
+    Returns
+    -------
+    coeffs : ndarray(M,)
+        The non-negative coefficients.
+    state : tuple
+        The keys of the basis functions of the final passive set & their Cholesky factor.
+
+    """
+    passive, factor = None, None
+    if parent is not None:
+        position = {key: i for i, key in enumerate(keys)}
+        passive = [position.get(key) for key in parent[0]]
+        if None in passive:
+            # some basis functions were removed, so the factorization is recomputed
+            passive = [i for i in passive if i is not None]
+        else:
+            factor = parent[1]
+    coeffs, passive, factor = _gram_nnls(gram, vector, passive, factor)
+    return coeffs, ([keys[i] for i in passive], factor)
+
+
+class GramLeastSquares(_BaseFit):
+    r"""
+    Least-squares fitting of the coefficients using the Gram matrix of the Gaussian basis.
+
+    The least-squares objective function with fixed exponents is a quadratic function of the
+    coefficients:
+
+    .. math::
+        \int (f(x) - \sum_i c_i g_i(x))^2 dx = \|f\|^2 - 2 \sum_i c_i \langle f, g_i \rangle +
+                                               \sum_{ij} c_i c_j \langle g_i, g_j \rangle.
+
+    The norm :math:`\|f\|^2` of the density is integrated on the grid once, the projections
+    :math:`\langle f, g_i \rangle` of the density are integrated on the grid once per basis
+    function, and the Gram matrix :math:`G_{ij} = \langle g_i, g_j \rangle` is computed
+    analytically. Optimizing the coefficients is then a problem of size :math:`M \times M`,
+    independent of the number of grid points.
+
+    """
+
+    def __init__(self, grid, density, model, integral_dens=None, spherical=False,
+                 cache_size=4096):
+        r"""
+        Construct the GramLeastSquares class.
+
+        Parameters
+        ----------
+        grid : (_BaseRadialGrid, CubicGrid)
+            The grid class.
+        density : ndarray(N,)
+            The true density evaluated on the grid points.
+        model : (AtomicGaussianDensity, MolecularGaussianDensity)
+            The Gaussian basis model density. It should have closed-form integrals over the
+            domain of integration, see `AtomicGaussianDensity.overlaps`.
+        integral_dens : float, optional
+            If this is provided, then the model is constrained to integrate to this value.
+            If not, then the model is constrained to the numerical integration of the
+            density.
+        spherical : bool, optional
+            Whether to perform spherical integration by adding :math:`4 \pi r^2` term
+            to the integrand. Only used when grid is one-dimensional and positive (radial grid).
+        cache_size : int, optional
+            Maximum number of projections :math:`\langle f, g_i \rangle` of basis functions
+            kept in memory, so only the basis functions with new exponents (e.g. the ones added
+            by the greedy algorithm) are integrated on the grid.
+
+        """
+        if np.any(abs(grid.points - model.points) > 1.e-12):
+            raise ValueError("The grid.points & model.points are not the same!")
+        if len(grid.points) != len(density):
+            raise ValueError(f"Argument density should have ({len(grid.points)},) shape.")
+        if not isinstance(cache_size, int) or cache_size < 1:
+            raise TypeError("Argument cache_size should be a positive integer.")
+        super().__init__(grid, density, model, SquaredDifference(), integral_dens, spherical)
+        if not self._analytic or not hasattr(self.model, "overlaps"):
+            raise ValueError(
+                "The model should have closed-form integrals over the domain of integration, "
+                "i.e. spherical integration or multi-dimensional grid points."
+            )
+        self._norm_sq = self.integrate(self.density**2)
+        self._cache_size = cache_size
+        # projections of each basis function, keyed by its center, type & exponent
+        self._cache = OrderedDict()
+        # projections, Gram matrix & integrals of the basis of the last exponents
+        self._last = None
+
+    def __getstate__(self):
+        r"""Return the state of the fitting object without its caches, for copying & pickling."""
+        state = super().__getstate__()
+        state["_cache"], state["_last"] = OrderedDict(), None
+        return state
+
+    @property
+    def norm_sq(self):
+        r"""Return the squared norm :math:`\|f\|^2` of the density integrated on the grid."""
+        return self._norm_sq
+
+    def _keys(self, expons):
+        r"""Return the key (center, prefactor, exponent) identifying each basis function."""
+        nbasis = self.model.nbasis
+        centers = np.zeros(nbasis, dtype=int) if self.model.natoms == 1 else \
+            self.model.assign_basis_to_center(np.arange(nbasis))
+        return list(zip(centers.tolist(), self.model.prefactor.tolist(), expons.tolist()))
+
+    def _quantities(self, expons):
+        r"""Return the projections, Gram matrix, integrals & keys of the basis functions."""
+        expons = np.asarray(expons, dtype=float)
+        # the prefactors distinguish the types of basis functions, which the greedy algorithm
+        # changes for the same model
+        keys = self._keys(expons)
+        if self._last is not None and self._last[3] == keys:
+            return self._last
+        missing = [i for i, key in enumerate(keys) if key not in self._cache]
+        if missing:
+            # only the basis functions not seen before are integrated on the grid
+            basis = self.model.evaluate_basis(expons, index=np.array(missing))
+            values = np.asarray(self.integrate_many(basis, self.density), dtype=float)
+            for i, value in zip(missing, values):
+                self._cache[keys[i]] = value
+        projections = np.empty(len(keys))
+        for i, key in enumerate(keys):
+            projections[i] = self._cache[key]
+            self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        self._last = (projections, self.model.overlaps(expons).astype(float),
+                      self.model.moments(expons).astype(float), keys)
+        return self._last
+
+    def projections(self, expons):
+        r"""
+        Return the projections :math:`\langle f, g_i \rangle` of the density on the basis.
+
+        Parameters
+        ----------
+        expons : ndarray(M,)
+            The exponents of Gaussian basis functions.
+
+        Returns
+        -------
+        ndarray(M,) :
+            The integrals of the density times each basis function on the grid.
+
+        """
+        return self._quantities(expons)[0].copy()
+
+    def gram(self, expons):
+        r"""
+        Return the Gram matrix :math:`\langle g_i, g_j \rangle` of the basis functions.
+
+        Parameters
+        ----------
+        expons : ndarray(M,)
+            The exponents of Gaussian basis functions.
+
+        Returns
+        -------
+        ndarray(M, M) :
+            The analytic overlaps of each pair of basis functions.
+
+        """
+        return self._quantities(expons)[1].copy()
+
+    @_profiled("fit.func")
+    def func(self, coeffs, expons):
+        r"""
+        Compute the least-squares objective function and its derivative w.r.t. coefficients.
+
+        Parameters
+        ----------
+        coeffs : ndarray(M,)
+            The coefficients of Gaussian basis functions.
+        expons : ndarray(M,)
+            The exponents of Gaussian basis functions.
+
+        Returns
+        -------
+        (float, ndarray(M,)) :
+            The objective function value and its derivative w.r.t. coefficients.
+
+        """
+        projections, gram, _, _ = self._quantities(expons)
+        gram_coeffs = np.dot(gram, coeffs)
+        value = self._norm_sq - 2. * np.dot(coeffs, projections) + np.dot(coeffs, gram_coeffs)
+        return value, 2. * (gram_coeffs - projections)
+
+    @_profiled("fit.solve")
+    def solve(self, expons, nonneg=True):
+        r"""
+        Return the coefficients minimizing the objective function without constraint.
+
+        Parameters
+        ----------
+        expons : ndarray(M,)
+            The exponents of Gaussian basis functions.
+        nonneg : bool, optional
+            Whether the coefficients are non-negative, in which case the non-negative
+            least-squares problem :math:`\min_{c \geq 0} c^T G c - 2 c^T b` is solved.
+
+        Returns
+        -------
+        ndarray(M,) :
+            The optimal coefficients.
+
+        """
+        if nonneg:
+            return self.solve_nnls(expons)[0]
+        projections, gram, _, _ = self._quantities(expons)
+        # minimum-norm solution of G c = b, dropping the numerically zero eigenvalues of
+        # (nearly) linearly dependent basis functions
+        eigvals, eigvecs = np.linalg.eigh(gram)
+        keep = eigvals > np.finfo(float).eps * np.max(np.abs(eigvals)) * len(eigvals)
+        return np.dot(eigvecs[:, keep], np.dot(eigvecs[:, keep].T, projections) / eigvals[keep])
+
+    @_profiled("fit.solve_nnls")
+    def solve_nnls(self, expons, parent=None):
+        r"""
+        Return the non-negative coefficients minimizing the objective function & solver state.
+
+        The non-negative least-squares problem :math:`\min_{c \geq 0} c^T G c - 2 c^T b` is
+        solved by an active-set method on the :math:`M \times M` system. If the solver state of a
+        similar set of basis functions is given (e.g. the basis from which a greedy candidate is
+        made by adding an exponent), its passive set & Cholesky factor are reused, so only the
+        new basis functions are added to the factorization.
+
+        Parameters
+        ----------
+        expons : ndarray(M,)
+            The exponents of Gaussian basis functions.
+        parent : tuple, optional
+            The solver state returned by a previous call.
+
+        Returns
+        -------
+        coeffs : ndarray(M,)
+            The optimal non-negative coefficients.
+        state : tuple
+            The solver state, i.e. the basis functions of the passive set & its Cholesky factor.
+
+        """
+        projections, gram, _, keys = self._quantities(expons)
+        return _gram_nnls_keys(gram, projections, keys, parent)
+
+    @_profiled_run("fit.run")
+    def run(self, e0, c0=None, nonneg=True, with_constraint=True, maxiter=1000, tol=1.e-14):
+        r"""
+        Optimize the coefficients of Gaussian basis functions with fixed exponents.
+
+        Parameters
+        ----------
+        e0 : ndarray(M,)
+            The (fixed) exponents of Gaussian basis functions.
+        c0 : ndarray(M,), optional
+            Initial guess for coefficients. If None, the solution without constraint is used.
+        nonneg : bool, optional
+            Whether the coefficients are non-negative.
+        with_constraint : bool, optional
+            If true, then adds the constraint that the (analytic) integral of the model density
+            must be equal to the integral of the true density, and the problem is solved with
+            SLSQP. Otherwise, the problem is solved directly.
+        maxiter : int, optional
+            Maximum number of iterations of SLSQP.
+        tol : float, optional
+            Precision goal for the value of objective function in the stopping criterion of
+            SLSQP.
+        profile : bool or Profile, optional
+            If true or a `Profile` object, the number of calls & time spent in the evaluations of
+            the model & measure, the integrations and the other instrumented methods are recorded
+            during the run (see `bfit.profiling.Profile`). Default is False.
+
+        Returns
+        -------
+        dict :
+            The optimization results presented as a dictionary containing:
+
+            "coeffs" : ndarray
+                The optimized coefficients of the Gaussian model.
+            "exps" : ndarray
+                The exponents of the Gaussian model.
+            "success": bool
+                Whether the optimization exited successfully.
+            "message" : str
+                Information about the cause of termination.
+            "fun" : float
+                Value of the least-squares objective function.
+            "jacobian": ndarray
+                The derivative of the objective function w.r.t. coefficients.
+            "performance" : list
+                Values of various performance measures of modeled density, as computed by
+                `_BaseFit.goodness_of_fit` method.
+            "time" : float
+                The time in seconds it took to optimize.
+            "profile" : dict
+                The number of calls & time spent in each instrumented method, as returned by
+                `Profile.totals`. Only included if `profile` is enabled.
+
+        """
+        e0 = np.asarray(e0, dtype=float)
+        if e0.shape != (self.model.nbasis,):
+            raise ValueError(f"Argument e0 should have ({self.model.nbasis},) shape.")
+        start = timer()
+        coeffs = self.solve(e0, nonneg) if c0 is None else np.asarray(c0, dtype=float)
+        success, message = True, "Solved the least-squares problem without constraint."
+        if with_constraint:
+            moments = self._quantities(e0)[2]
+            constraints = [{"fun": lambda c: self.integral_dens - np.dot(moments, c),
+                            "jac": lambda c: -moments, "type": "eq"}]
+            bounds = [(0., np.inf)] * self.model.nbasis if nonneg else None
+            res = minimize(fun=self.func, x0=coeffs, args=(e0,), method="slsqp", jac=True,
+                           bounds=bounds, constraints=constraints,
+                           options={"ftol": tol, "maxiter": maxiter})
+            coeffs, success, message = res["x"], res["success"], res["message"]
+            if not success:
+                warnings.warn(f"Failed Optimization: {message}")
+        time = timer() - start
+        fun, jacobian = self.func(coeffs, e0)
+        return {"coeffs": coeffs,
+                "exps": e0,
+                "success": success,
+                "message": message,
+                "fun": fun,
+                "jacobian": jacobian,
+                "performance": np.array(self.goodness_of_fit(coeffs, e0)),
+                "time": time}
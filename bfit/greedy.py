@@ -23,18 +23,31 @@
 r"""Greedy Fitting Module."""
 
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+import copy
+import functools
+from timeit import default_timer as timer
+import warnings
 
 import numpy as np
-from scipy.optimize import nnls
 
-from bfit.fit import _BaseFit, KLDivergenceFPI, ScipyFit
+from bfit.fit import (
+    _BaseFit, _gram_nnls, _gram_nnls_keys, _load_checkpoint, _load_history, _save_checkpoint,
+    _save_history, KLDivergenceFPI, ScipyFit,
+)
 from bfit.measure import SquaredDifference
 from bfit.model import AtomicGaussianDensity
+from bfit.observer import Observer
+from bfit.profiling import _profiled, _profiled_run
 
 __all__ = ["GreedyLeastSquares", "GreedyKLFPI"]
 
+# Minimum number of Gaussian columns cached by the model during a run of GreedyLeastSquares.
+_COLUMNS_CACHE_SIZE = 256
 
-def remove_redundancies(coeffs, fparams, eps=1e-3):
+
+def remove_redundancies(coeffs, fparams, eps=1e-3, relative=False):
     r"""
     Check if the exponents have similar values and group them together.
 
@@ -44,6 +57,10 @@ def remove_redundancies(coeffs, fparams, eps=1e-3):
     Note: as of now this only works if each basis function depends on only one
     parameters e.g. e^(-x), not e^(-x + y).
 
+    The function parameters are sorted, and consecutive ones closer than the threshold are
+    grouped together (i.e. groups are chains of similar values). Each group is replaced by its
+    first basis function, whose coefficient is the sum of the coefficients of the group.
+
     Parameters
     ----------
     coeffs : np.ndarray(M,)
@@ -52,6 +69,10 @@ def remove_redundancies(coeffs, fparams, eps=1e-3):
         Function parameters of the basis function set of size :math:`M`.
     eps : float
         Value that indicates the threshold for how close two parameters are.
+    relative : bool
+        If True, two parameters :math:`a` and :math:`b` are close when
+        :math:`|a - b| < \epsilon \max(|a|, |b|)`, otherwise when :math:`|a - b| < \epsilon`.
+        Relative thresholds are suited to exponents spanning many orders of magnitude.
 
     Returns
     -------
@@ -60,32 +81,239 @@ def remove_redundancies(coeffs, fparams, eps=1e-3):
         are removed and the coefficients corresponding to that parameter are added together.
 
     """
-    new_coeffs = coeffs.copy()
-    new_exps = fparams.copy()
-
-    # Indexes where they're the same.
-    indexes_same = []
-    for i, alpha in enumerate(fparams):
-        similar_indexes = []
-        for j in range(i + 1, len(fparams)):
-            if j not in similar_indexes:
-                if np.abs(alpha - fparams[j]) < eps:
-                    if i not in similar_indexes:
-                        similar_indexes.append(i)
-                    similar_indexes.append(j)
-        if len(similar_indexes) != 0:
-            indexes_same.append(similar_indexes)
-
-    # Add the coefficients together and add/group them, if need be
-    for group_similar_items in indexes_same:
-        for i in range(1, len(group_similar_items)):
-            new_coeffs[group_similar_items[0]] += coeffs[group_similar_items[i]]
-
-    if len(indexes_same) != 0:
-        indices = [y for x in indexes_same for y in x[1:]]
-        new_exps = np.delete(new_exps, indices)
-        new_coeffs = np.delete(new_coeffs, indices)
-    return new_coeffs, new_exps
+    coeffs, fparams = np.asarray(coeffs), np.asarray(fparams)
+    if coeffs.ndim != 1 or coeffs.shape != fparams.shape:
+        raise ValueError(f"Coefficients {coeffs.shape} & function parameters {fparams.shape} "
+                         f"should be one-dimensional arrays of the same size.")
+    if eps < 0.:
+        raise ValueError(f"Threshold eps {eps} should be non-negative.")
+    if fparams.size == 0:
+        return coeffs.copy(), fparams.copy()
+    # consecutive sorted function parameters closer than the threshold are in the same group
+    order = np.argsort(fparams, kind="stable")
+    sorted_fparams = fparams[order]
+    gaps = np.diff(sorted_fparams)
+    if relative:
+        bound = eps * np.maximum(np.abs(sorted_fparams[:-1]), np.abs(sorted_fparams[1:]))
+    else:
+        bound = eps
+    starts = np.flatnonzero(np.concatenate(([True], gaps >= bound)))
+    # each group is replaced by its first basis function, keeping the original order
+    new_coeffs = np.add.reduceat(coeffs[order], starts)
+    first = np.minimum.reduceat(order, starts)
+    kept = np.argsort(first)
+    return new_coeffs[kept], fparams[first[kept]]
+
+
+class CandidateDelta:
+    r"""
+    Initial guess of the greedy algorithm stored as its difference from the parent basis.
+
+    The exponents of the initial guess are obtained by inserting new exponents into the
+    exponents of the parent basis one after another, and then removing basis-functions one
+    after another. The coefficients of the inserted basis-functions all have the same value.
+
+    """
+
+    def __init__(self, inserted, removed=()):
+        r"""
+        Construct the CandidateDelta object.
+
+        Parameters
+        ----------
+        inserted : sequence of (int, float)
+            The position and exponent of each inserted basis-function, in the order of insertion.
+            Each position refers to the exponents obtained after the previous insertions.
+        removed : sequence of int, optional
+            The position of each removed basis-function, in the order of removal.
+            Each position refers to the exponents obtained after the previous insertions and
+            removals.
+
+        """
+        self._inserted = tuple((int(index), value) for index, value in inserted)
+        self._removed = tuple(int(index) for index in removed)
+
+    @property
+    def inserted(self):
+        r"""Return the position and exponent of each inserted basis-function."""
+        return self._inserted
+
+    @property
+    def removed(self):
+        r"""Return the position of each removed basis-function."""
+        return self._removed
+
+    def __repr__(self):
+        r"""Return the representation of the difference from the parent basis."""
+        return f"CandidateDelta(inserted={self.inserted}, removed={self.removed})"
+
+    def indices(self, size):
+        r"""
+        Return the index of each basis-function of the initial guess.
+
+        Parameters
+        ----------
+        size : int
+            Number of basis-functions of the parent basis.
+
+        Returns
+        -------
+        ndarray(K,) :
+            The index of each basis-function in the parent basis if it comes from the parent,
+            otherwise `size` plus its position in `inserted`.
+
+        """
+        return np.array(self._indices(size), dtype=int)
+
+    def _indices(self, size):
+        r"""Return the index of each basis-function of the initial guess as a list."""
+        indices = list(range(size))
+        for i, (index, _) in enumerate(self._inserted):
+            indices.insert(index, size + i)
+        for index in self._removed:
+            del indices[index]
+        return indices
+
+    def apply(self, coeffs, fparams, coeff_val=100.):
+        r"""
+        Return the initial guess obtained from the parameters of the parent basis.
+
+        Parameters
+        ----------
+        coeffs : np.ndarray(M,)
+            Coefficients of the parent basis.
+        fparams : np.ndarray(M,)
+            Function parameters of the parent basis.
+        coeff_val : float
+            Coefficient of the inserted basis-functions.
+
+        Returns
+        -------
+        np.ndarray :
+            The initial guess, coefficients are listed first, then exponents.
+
+        """
+        # coefficients & exponents of the parent followed by the inserted ones are gathered at once
+        size = len(fparams)
+        params = np.empty((2, size + len(self._inserted)), dtype=np.result_type(coeffs, fparams))
+        params[0, :size], params[0, size:] = coeffs, coeff_val
+        params[1, :size], params[1, size:] = fparams, [value for _, value in self._inserted]
+        return params[:, self._indices(size)].ravel()
+
+    def exponents(self, fparams):
+        r"""
+        Return the function parameters of the initial guess.
+
+        Parameters
+        ----------
+        fparams : np.ndarray(M,)
+            Function parameters of the parent basis.
+
+        Returns
+        -------
+        np.ndarray :
+            The function parameters of the initial guess.
+
+        """
+        values = np.array([value for _, value in self._inserted], dtype=fparams.dtype)
+        return np.concatenate((fparams, values))[self.indices(len(fparams))]
+
+
+def get_next_deltas(factor, fparams):
+    r"""
+    Get the next (n+1) choices of `get_next_choices` as differences from the parent basis.
+
+    Parameters
+    ----------
+    factor : float
+        Number used to give two choices by multiplying each end point.
+    fparams : np.ndarray
+        Function parameters.
+
+    Returns
+    -------
+    List[CandidateDelta]
+        List of the next possible initial guesses for :math:`(n+1)` basis-functions.
+
+    """
+    size = len(fparams)
+    deltas = []
+    for index in range(size):
+        if index == 0:
+            value = fparams[0] / factor
+        else:
+            value = (fparams[index - 1] + fparams[index]) / 2
+        deltas.append(CandidateDelta([(index, value)]))
+    if size != 0:
+        deltas.append(CandidateDelta([(size, fparams[-1] * factor)]))
+    return deltas
+
+
+def get_two_next_deltas(factor, fparams):
+    r"""
+    Get the next (n+2) choices of `get_two_next_choices` as differences from the parent basis.
+
+    Parameters
+    ----------
+    factor : float
+        Number used to give two choices by multiplying each end point.
+    fparams : np.ndarray(M,)
+        Function parameters of the basis function set of size :math:`M`.
+
+    Returns
+    -------
+    List[CandidateDelta]
+        List of the next possible initial guesses for :math:`(n+2)` basis-functions.
+
+    """
+    size = len(fparams)
+    deltas = []
+    for first in get_next_deltas(factor, fparams):
+        index = first.inserted[0][0]
+        # pairs of insertions are only counted once, except the last end point is
+        # combined with both of the last choices
+        start = size if index == size else index
+        deltas.extend(
+            CandidateDelta(first.inserted + second.inserted)
+            for second in get_next_deltas(factor, first.exponents(fparams))[start:]
+        )
+    return deltas
+
+
+def pick_two_lose_one_deltas(factor, fparams):
+    r"""
+    Get the (n+1) choices of `pick_two_lose_one` as differences from the parent basis.
+
+    Parameters
+    ----------
+    factor : float
+        Number used to give two choices by multiplying each end point.
+    fparams : np.ndarray(M,)
+        Function parameters of the basis function set of size :math:`M`.
+
+    Returns
+    -------
+    List[CandidateDelta]
+        List of the next possible initial guesses for :math:`(n+1)` basis-functions.
+
+    """
+    return [
+        CandidateDelta(delta.inserted, (index,))
+        for delta in get_two_next_deltas(factor, fparams)
+        for index in range(len(fparams) + 2)
+    ]
+
+
+def _unique_deltas(deltas, fparams):
+    r"""Return the initial guesses with distinct exponents, in the order they first appear."""
+    size, values = len(fparams), fparams.tolist()
+    unique = OrderedDict()
+    for delta in deltas:
+        # the exponents are compared as Python floats to avoid creating an array for each one
+        inserted = [value for _, value in delta.inserted]
+        key = tuple(values[i] if i < size else inserted[i - size] for i in delta._indices(size))
+        unique.setdefault(key, delta)
+    return list(unique.values())
 
 
 def get_next_choices(factor, coeffs, fparams, coeff_val=100.):
@@ -120,23 +348,13 @@ def get_next_choices(factor, coeffs, fparams, coeff_val=100.):
     List[np.ndarray]
         List of the next possible initial guesses for :math:`(n+1)` basis-functions,
         coefficients are listed first, then exponents.
+
+    See Also
+    --------
+    get_next_deltas : The same initial guesses as differences from the parent basis.
+
     """
-    size = fparams.shape[0]
-    all_choices = []
-    for index, exp in np.ndenumerate(fparams):
-        if index[0] == 0:
-            exps_arr = np.insert(fparams, index, exp / factor)
-            coeffs_arr = np.insert(coeffs, index, coeff_val)
-        elif index[0] <= size:
-            exps_arr = np.insert(fparams, index, (fparams[index[0] - 1] +
-                                                  fparams[index[0]]) / 2)
-            coeffs_arr = np.insert(coeffs, index, coeff_val)
-        all_choices.append(np.append(coeffs_arr, exps_arr))
-        if index[0] == size - 1:
-            exps_arr = np.append(fparams, np.array([exp * factor]))
-            endpt = np.append(coeffs, np.array([coeff_val]))
-            all_choices.append(np.append(endpt, exps_arr))
-    return all_choices
+    return [delta.apply(coeffs, fparams, coeff_val) for delta in get_next_deltas(factor, fparams)]
 
 
 def get_two_next_choices(factor, coeffs, fparams, coeff_val=100.):
@@ -172,56 +390,14 @@ def get_two_next_choices(factor, coeffs, fparams, coeff_val=100.):
         List of the next possible initial guesses for :math:`(n+2)` basis-functions,
         coefficients are listed first, then exponents.
 
-    """
-
-    def _get_next_possible_coeffs_and_exps2(factor, coeffs, exps, coeff_val=100.):
-        # This is the same function as get_next_choices except that
-        #   it returns the coefficients and exponents separately.
-        size = exps.shape[0]
-        all_choices_of_exponents = []
-        all_choices_of_coeffs = []
-        for index, exp in np.ndenumerate(exps):
-            if index[0] == 0:
-                exponent_array = np.insert(exps, index, exp / factor)
-                coefficient_array = np.insert(coeffs, index, coeff_val)
-            elif index[0] <= size:
-                exponent_array = np.insert(exps, index, (exps[index[0] - 1] + exps[index[0]]) / 2)
-                coefficient_array = np.insert(coeffs, index, coeff_val)
-            all_choices_of_exponents.append(exponent_array)
-            all_choices_of_coeffs.append(coefficient_array)
-            if index[0] == size - 1:
-                exponent_array = np.append(exps, np.array([exp * factor]))
-                all_choices_of_exponents.append(exponent_array)
-                all_choices_of_coeffs.append(np.append(coeffs, np.array([coeff_val])))
-        return all_choices_of_coeffs, all_choices_of_exponents
+    See Also
+    --------
+    get_two_next_deltas : The same initial guesses as differences from the parent basis.
 
-    size = len(fparams)
-    choices_coeff = []
-    choices_fparams = []
-    for i, e in enumerate(fparams):
-        if i == 0:
-            fparam_arr = np.insert(fparams, 0, e / factor)
-            coeff_arr = np.insert(coeffs, 0, coeff_val)
-        elif i <= size:
-            fparam_arr = np.insert(fparams, i, (fparams[i - 1] + fparams[i]) / 2)
-            coeff_arr = np.insert(coeffs, i, coeff_val)
-
-        coeff2, exp2 = _get_next_possible_coeffs_and_exps2(factor, coeff_arr, fparam_arr, coeff_val)
-        choices_coeff.extend(coeff2[i:])
-        choices_fparams.extend(exp2[i:])
-
-        if i == size - 1:
-            fparam_arr = np.append(fparams, np.array([e * factor]))
-            endpt = np.append(coeffs, np.array([coeff_val]))
-            coeff2, exp2 = _get_next_possible_coeffs_and_exps2(factor, endpt, fparam_arr, coeff_val)
-            choices_coeff.extend(coeff2[-2:])
-            choices_fparams.extend(exp2[-2:])
-
-    # Append coefficients and exponents together.
-    all_choices_params = []
-    for i, c in enumerate(choices_coeff):
-        all_choices_params.append(np.append(c, choices_fparams[i]))
-    return all_choices_params
+    """
+    return [
+        delta.apply(coeffs, fparams, coeff_val) for delta in get_two_next_deltas(factor, fparams)
+    ]
 
 
 def pick_two_lose_one(factor, coeffs, exps, coeff_val=100.):
@@ -250,21 +426,105 @@ def pick_two_lose_one(factor, coeffs, exps, coeff_val=100.):
     List[np.ndarray]
         List of the next possible initial guesses for `(n+1)` basis-functions,
         coefficients are listed first, then exponents.
+
+    See Also
+    --------
+    pick_two_lose_one_deltas : The same initial guesses as differences from the parent basis.
+
+    """
+    return [
+        delta.apply(coeffs, exps, coeff_val) for delta in pick_two_lose_one_deltas(factor, exps)
+    ]
+
+
+def _optimize_local_choice(greedy, param, num_s, num_p, columns=None, maxiter=None,
+                           resume=False):
+    r"""
+    Optimize an initial guess of the greedy algorithm with a given number of basis-functions.
+
+    Parameters
+    ----------
+    greedy : GreedyStrategy
+        The greedy object whose model is changed to have `num_s` s-type and `num_p` p-type
+        Gaussian functions.
+    param : ndarray
+        The initial guess for the coefficients and exponents.
+    num_s : int
+        Number of s-type Gaussian functions.
+    num_p : int
+        Number of p-type Gaussian functions.
+    columns : (ndarray, ndarray), optional
+        The exponents of the parent basis and their Gaussian columns on the grid points. While
+        the initial guess is optimized, the model reuses these columns for the exponents of
+        the initial guess taken from the parent basis, and only computes the inserted ones (see
+        `AtomicGaussianDensity._set_parent_columns`).
+    maxiter : int, optional
+        If provided, the initial guess is optimized for at most `maxiter` iterations (see
+        `GreedyStrategy._run_local_choice`). Otherwise, it is fully optimized.
+    resume : bool, optional
+        Whether `param` are the parameters of a previous (stopped) optimization of the initial
+        guess, rather than the initial guess itself. Only used if `maxiter` is provided.
+
+    Returns
+    -------
+    (ndarray, float, bool) :
+        The locally optimized parameters, the value of the objective function and whether the
+        optimization converged.
+
     """
-    all_choices = []
-    two_choices = get_two_next_choices(factor, coeffs, exps, coeff_val)
-    for p in two_choices:
-        coeff, exp = p[:len(p) // 2], p[len(p) // 2:]
-        for j in range(0, len(p) // 2):
-            new_coeff = np.delete(coeff, j)
-            new_exp = np.delete(exp, j)
-            all_choices.append(np.append(new_coeff, new_exp))
-    return all_choices
+    profile, start = greedy._profile, timer()
+    if columns is not None:
+        greedy.model._set_parent_columns(*columns)
+    try:
+        greedy.model.change_numb_s_and_numb_p(num_s, num_p)
+        if maxiter is None:
+            local_param, converged = greedy.get_optimization_routine(param, local=True), True
+        else:
+            local_param, converged = greedy._run_local_choice(param, maxiter, resume)
+    finally:
+        if columns is not None:
+            greedy.model._set_parent_columns(None)
+    value = greedy.eval_obj_function(local_param)
+    if profile is not None:
+        profile.add("greedy.candidate", timer() - start)
+    return local_param, value, converged
+
+
+def _optimize_local_batch(greedy, arguments, copy_greedy=True):
+    r"""
+    Optimize a batch of initial guesses one after another on a worker.
+
+    Parameters
+    ----------
+    greedy : GreedyStrategy
+        The greedy object whose initial guesses are optimized.
+    arguments : dict
+        The arguments of `_optimize_local_choice` (after the greedy object) for each guess.
+    copy_greedy : bool, optional
+        Whether the guesses are optimized on a copy of the greedy object (see
+        `GreedyStrategy._copy_for_worker`), rather than on `greedy` itself, e.g. because it
+        is a copy already unpickled by a worker process.
+
+    Returns
+    -------
+    dict :
+        The parameters, value of the objective function and convergence of each guess.
+
+    """
+    if copy_greedy:
+        greedy = greedy._copy_for_worker()
+    return {i: _optimize_local_choice(greedy, *args) for i, args in arguments.items()}
 
 
 class GreedyStrategy(metaclass=ABCMeta):
     r"""Base greedy strategy class for fitting s-type, p-type Gaussians."""
 
+    # Whether resuming a local optimization (see `_run_local_choice`) gives the same result as
+    # not stopping it. If not, the best initial guess of a race is optimized again from the start.
+    _exact_resume = False
+    # profile of the instrumented methods, only enabled during a run with `profile` argument
+    _profile = None
+
     def __init__(self, fitting_obj, choice_function="pick-one"):
         r"""
         Construct the base greedy class.
@@ -289,14 +549,18 @@ class GreedyStrategy(metaclass=ABCMeta):
         if not isinstance(fitting_obj, _BaseFit):
             raise TypeError(f"Fitting object {type(fitting_obj)} should be of type _BaseFit.")
 
+        # the initial guesses are generated as differences from the parent basis
         if choice_function == "pick-one":
             self.next_param_func = get_next_choices
+            self._next_delta_func = get_next_deltas
             self._numb_func_increase = 1  # How many basis functions were increased
         elif choice_function == "pick-two":
             self.next_param_func = get_two_next_choices
+            self._next_delta_func = get_two_next_deltas
             self._numb_func_increase = 2
         elif choice_function == "pick-two-lose-one":
             self.next_param_func = pick_two_lose_one
+            self._next_delta_func = pick_two_lose_one_deltas
             self._numb_func_increase = 1
         else:
             raise ValueError(f"Choice parameter {choice_function} was not recognized.")
@@ -346,6 +610,39 @@ class GreedyStrategy(metaclass=ABCMeta):
         r"""Run the optimization for fitting the Gaussian model to a density."""
         raise NotImplementedError()
 
+    def _update_parent(self, params):
+        r"""Update the parameters from which the next initial guesses are generated."""
+
+    def _run_local_choice(self, params, maxiter, resume=False):
+        r"""
+        Optimize an initial guess for at most `maxiter` iterations of the local optimization.
+
+        This is used for racing the initial guesses, where each optimization is stopped and
+        then resumed from its last parameters.
+
+        Parameters
+        ----------
+        params : ndarray
+            The initial guess, or the last parameters of its optimization if `resume` is True.
+        maxiter : int
+            Maximum number of iterations.
+        resume : bool, optional
+            Whether the optimization of the initial guess is resumed.
+
+        Returns
+        -------
+        (ndarray, bool) :
+            The optimized parameters and whether the optimization converged before reaching
+            `maxiter` iterations.
+
+        """
+        raise NotImplementedError(f"{type(self).__name__} doesn't support racing initial guesses.")
+
+    def _profiled_objects(self):
+        r"""Return the objects whose methods are profiled during a run, see `Profile`."""
+        return [self] + self.fitting_obj._profiled_objects()
+
+    @_profiled("greedy.eval_obj_function")
     def eval_obj_function(self, params):
         r"""Return evaluation the objective function."""
         model = self.model.evaluate(params[:len(params)//2], params[len(params)//2:])
@@ -361,7 +658,8 @@ class GreedyStrategy(metaclass=ABCMeta):
         else:
             self.err_arr.append(err)
 
-    def _find_best_lparams(self, param_list, num_s_choices, num_p_choices):
+    def _find_best_lparams(self, param_list, num_s_choices, num_p_choices, executor=None,
+                           parent=None, racing=None, max_workers=None):
         r"""
         Return the best initial guess from a list of potential model parameter choices.
 
@@ -373,6 +671,24 @@ class GreedyStrategy(metaclass=ABCMeta):
             Number of guesses for adding extra s-type Gaussians.
         num_p_choices : int
             Number of guesses for adding extra p-type Gaussians.
+        executor : concurrent.futures.Executor, optional
+            If provided, the initial guesses are optimized concurrently using this executor,
+            with one copy of the fitting object per worker (see `_optimize_local_choices`).
+            Otherwise, they're optimized one after another.
+        parent : ndarray, optional
+            The exponents of the parent basis of the initial guesses. If provided, the Gaussian
+            columns of the parent basis are evaluated once and reused by every initial guess.
+        racing : int, optional
+            If provided, the initial guesses are raced by successive halving: every initial guess
+            is optimized for `racing` iterations, then only the better half of them (in terms of
+            the objective function) is optimized further with twice as many iterations, and so
+            on until one of them is left. Each optimization is resumed from its last parameters,
+            and at most `l_maxiter` iterations are done in total for each initial guess. If the
+            local optimization can't be resumed exactly (e.g. quasi-Newton methods), the last
+            initial guess left is fully optimized from the start.
+            Otherwise, every initial guess is fully optimized.
+        max_workers : int, optional
+            The number of workers of `executor`, see `_optimize_local_choices`.
 
         Returns
         -------
@@ -382,36 +698,112 @@ class GreedyStrategy(metaclass=ABCMeta):
             True if adding S-type is the most optimal, False otherwise.
 
         """
+        # Number of S-type and P-type functions of the model for each guess.
+        numbers = [
+            (self.num_s + self.numb_func_increase, self.num_p) if i < num_s_choices
+            else (self.num_s, self.num_p + self.numb_func_increase)
+            for i in range(0, num_s_choices + num_p_choices)
+        ]
+        columns = None
+        if parent is not None and isinstance(self.model, AtomicGaussianDensity):
+            columns = (parent, self.model._gaussian_matrix(parent))
+        choices = range(0, num_s_choices + num_p_choices)
+        if racing is None:
+            results = self._optimize_local_choices(
+                {i: (param_list[i], *numbers[i], columns) for i in choices}, executor, max_workers
+            )
+        else:
+            # parameters, objective function & convergence of the optimization of each guess
+            states = {i: (param_list[i], None, False) for i in choices}
+            alive, budget, niter = list(choices), racing, 0
+            while True:
+                step = min(budget, self.l_maxiter - niter)
+                results = self._optimize_local_choices(
+                    {i: (states[i][0], *numbers[i], columns, step, niter != 0)
+                     for i in alive if not states[i][2]}, executor, max_workers
+                )
+                states.update(results)
+                niter += step
+                if niter >= self.l_maxiter or all(states[i][2] for i in alive):
+                    break
+                # keep the better half of the guesses, the earlier guess being better in a tie
+                alive = sorted(alive, key=lambda i: (states[i][1], i))[:(len(alive) + 1) // 2]
+                alive.sort()
+                if len(alive) == 1 and not self._exact_resume:
+                    # the last guess is fully optimized from the start, as without racing
+                    states.update(self._optimize_local_choices(
+                        {alive[0]: (param_list[alive[0]], *numbers[alive[0]], columns)}, executor,
+                        max_workers
+                    ))
+                    break
+                budget *= 2
+            results = {i: states[i] for i in alive}
+
         # Initialize the values being returned.
         best_local_value = 1e10
         best_local_param = None
         is_s_optimal = False
-        for i in range(0, num_s_choices + num_p_choices):
-            # Get the function parameter guess.
-            param = param_list[i]
-
-            # Update model for the new number of S-type and P-type functions.
-            if i < num_s_choices:
-                # Update the number of s-type basis functions for this guess.
-                self.model.change_numb_s_and_numb_p(
-                    self.num_s + self.numb_func_increase, self.num_p
-                )
-            else:
-                # Update the number of p-type basis functions for this guess.
-                self.model.change_numb_s_and_numb_p(
-                    self.num_s, self.num_p + self.numb_func_increase
-                )
-
-            # Optimize using this initial guess and get cost-function value.
-            local_param = self.get_optimization_routine(param, local=True)
-            cost_func = self.eval_obj_function(local_param)
+        # Results are compared in the order of the guesses, so that the best choice doesn't
+        # depend on whether (or how) they were optimized concurrently.
+        for i in sorted(results):
+            local_param, cost_func, _ = results[i]
             # If it is the best found, then return it.
             if cost_func < best_local_value:
-                best_local_value = self.eval_obj_function(local_param)
+                best_local_value = cost_func
                 best_local_param = local_param
                 is_s_optimal = bool(i < num_s_choices)
         return best_local_value, best_local_param, is_s_optimal
 
+    def _optimize_local_choices(self, arguments, executor=None, max_workers=None):
+        r"""
+        Optimize initial guesses one after another or concurrently with the executor.
+
+        Parameters
+        ----------
+        arguments : dict
+            The arguments of `_optimize_local_choice` (after the greedy object) for each guess.
+        executor : concurrent.futures.Executor, optional
+            If provided, the initial guesses are split into batches optimized concurrently
+            with this executor, each one on its own copy of the greedy object.
+        max_workers : int, optional
+            The number of workers of `executor`. If provided, the initial guesses are split into
+            one batch per worker, so the greedy object is copied (or pickled) once per worker.
+            Otherwise, each initial guess is its own batch.
+
+        Returns
+        -------
+        dict :
+            The parameters, value of the objective function and convergence of each guess.
+
+        """
+        if executor is None:
+            return {i: _optimize_local_choice(self, *args) for i, args in arguments.items()}
+        # Each guess changes the number of basis-functions of the model, so the guesses of
+        # each worker are optimized on its own copy of the greedy (and fitting) object. The
+        # copy is made by the worker thread, or by pickling the greedy object for a worker
+        # process, and doesn't include the caches & buffers of the fitting object.
+        nworkers = len(arguments) if max_workers is None else max_workers
+        items = list(arguments.items())
+        batches = [dict(items[k::nworkers]) for k in range(min(nworkers, len(items)))]
+        copy_greedy = not isinstance(executor, ProcessPoolExecutor)
+        futures = [executor.submit(_optimize_local_batch, self, batch, copy_greedy)
+                   for batch in batches]
+        return {i: result for future in futures for i, result in future.result().items()}
+
+    def _copy_for_worker(self):
+        r"""
+        Return copy of the greedy object whose model and fitting object aren't shared.
+
+        The caches & buffers of the fitting object and its model are not copied (see their
+        `__getstate__` methods).
+        """
+        worker = copy.copy(self)
+        # grid & density are never modified, so they're shared rather than copied.
+        shared = {id(self.grid): self.grid, id(self.density): self.density}
+        worker.fitting_obj = copy.deepcopy(self.fitting_obj, shared)
+        worker.err_arr = []
+        return worker
+
     def _split_parameters(self, params):
         r"""Split parameters into the s-type, p-type coefficients and exponents."""
         s_coeffs = params[:self.num_s]
@@ -444,7 +836,12 @@ class GreedyStrategy(metaclass=ABCMeta):
         ))
         return template_iters
 
-    def run(self, factor, d_threshold=1e-8, max_numb_funcs=30, add_extra_choices=None, disp=False):
+    @_profiled_run("greedy.run")
+    def run(
+        self, factor, d_threshold=1e-8, max_numb_funcs=30, add_extra_choices=None, disp=False,
+        executor=None, redundancy_eps=1e-3, relative_eps=False, racing=None, checkpoint=None,
+        resume=None, observer=None, max_workers=None,
+    ):
         r"""
         Add new Gaussians to fit to a density until convergence is achieved.
 
@@ -470,6 +867,55 @@ class GreedyStrategy(metaclass=ABCMeta):
             list of initial guesses that should match attribute `numb_func_increase`.
         disp : bool
             Whether to display the output.
+        executor : concurrent.futures.Executor, optional
+            Executor (e.g. `ThreadPoolExecutor` or `ProcessPoolExecutor`) used to optimize the
+            initial guesses of each iteration concurrently. The guesses of each batch (see
+            `max_workers`) are optimized on its own copy of the fitting object (without its
+            caches & buffers) and the best one is chosen in the same order as the serial
+            algorithm, so the results do not depend on the executor. When using a process pool,
+            the fitting object (grid, model and measure) should be picklable.
+            If None, the initial guesses are optimized one after another.
+        redundancy_eps : float, optional
+            The threshold for two exponents of the same type to be redundant. If the best
+            choice has redundant exponents, it is rejected. See `remove_redundancies`.
+        relative_eps : bool, optional
+            Whether `redundancy_eps` is relative to the exponents, rather than absolute.
+        racing : int, optional
+            If provided, the initial guesses of each iteration are raced by successive halving
+            instead of being fully optimized: all of them are optimized for `racing` iterations,
+            the worse half is dropped, and the remaining ones are optimized further (resuming from
+            their last parameters) with twice as many iterations, until one of them is left or
+            the maximum number of local iterations is reached. This saves most of the
+            optimizations of initial guesses which are clearly worse than the best one.
+        checkpoint : str or path-like, optional
+            If provided, the state of the greedy algorithm (including the state of the global
+            random number generator of NumPy, used for the initial guesses of p-type functions)
+            is saved to this (npz) file after every iteration, so that an interrupted run can be
+            resumed. The parameters & performance measures added by the i-th iteration are saved
+            to the file with the suffix ".history<i>".
+        resume : str or path-like, optional
+            If provided, the greedy algorithm continues from the state saved in this checkpoint
+            file as if it had never been interrupted. The greedy object should be constructed,
+            and this method called, with the same arguments as for the interrupted run.
+        observer : Observer, optional
+            If provided, its `update` method receives the record of each iteration of this call
+            (see `bfit.observer.Observer`), where "fun" is the best objective function so far and
+            "nevals" counts the model evaluations of the fitting object (not the ones of the
+            copies optimizing the initial guesses concurrently with `executor`). The additional
+            keys are "delta_fun", the absolute change in the best objective function, "num_s" &
+            "num_p", the number of s-type & p-type functions, "accepted", whether the best choice
+            was accepted (rather than rejected for being redundant or worse), and "performance",
+            the performance measures of the best parameters.
+        max_workers : int, optional
+            The number of workers of `executor`. If provided, the initial guesses of each
+            iteration are split into one batch per worker, so the fitting object is copied (or
+            pickled for a process pool) once per worker rather than once per initial guess.
+            It should be the `max_workers` argument of the executor.
+        profile : bool or Profile, optional
+            If true or a `Profile` object, the number of calls & time spent in the optimization
+            of each initial guess, the evaluations of the model & measure, the integrations and
+            the other instrumented methods are recorded during the run (see
+            `bfit.profiling.Profile`). Default is False.
 
         Returns
         -------
@@ -495,22 +941,40 @@ class GreedyStrategy(metaclass=ABCMeta):
                 List of the optimal parameters of each iteration.
             "exit_information": str
                 Information about termination of the greedy algorithm.
+            "profile" : dict
+                The number of calls & time spent in each instrumented method, as returned by
+                `Profile.totals`. Only included if `profile` is enabled.
 
         """
         if not isinstance(factor, float):
             raise TypeError(f"Factor {factor} parameter should be a float.")
         if factor <= 0.0:
             raise ValueError(f"Scale {factor} should be positive.")
+        if executor is not None and not isinstance(executor, Executor):
+            raise TypeError(f"Executor {type(executor)} should be a concurrent.futures.Executor.")
+        if racing is not None and (not isinstance(racing, int) or racing <= 0):
+            raise ValueError(f"Racing {racing} should be a positive integer.")
+        if max_workers is not None and (not isinstance(max_workers, int) or max_workers <= 0):
+            raise ValueError(f"Argument max_workers {max_workers} should be a positive integer.")
+        if observer is not None and not isinstance(observer, Observer):
+            raise TypeError(f"Argument observer {type(observer)} should be an Observer.")
 
         # Initialize all the variables
-        gparams = self.get_best_one_function_solution()
-        self.store_errors(gparams)
+        niter, nevals, start = 0, self.fitting_obj._nevals, timer()
         exit_info = None  # String containing information about how it exits.
-        numb_funcs = 1  # Number of current functions in model.
-        prev_gval, best_gval = np.inf, self.eval_obj_function(gparams)
-        params_iter = [gparams]  # Storing the parameters at each iteration.
-        numb_redum = 0  # Number of redundancies, termination criteria.
-        factor0 = factor  # Scaling parameter that changes.
+        if resume is None:
+            gparams = self.get_best_one_function_solution()
+            self.store_errors(gparams)
+            numb_funcs = 1  # Number of current functions in model.
+            prev_gval, best_gval = np.inf, self.eval_obj_function(gparams)
+            params_iter = [gparams]  # Storing the parameters at each iteration.
+            numb_redum = 0  # Number of redundancies, termination criteria.
+            factor0 = factor  # Scaling parameter that changes.
+            # number of history files of the checkpoint & of parameters & errors in them
+            history = (0, 0, 0)
+        else:
+            (gparams, numb_funcs, prev_gval, best_gval, params_iter, numb_redum, factor,
+             factor0, history) = self._load_state(resume)
 
         # Start the greedy algorithm
         if disp:
@@ -519,11 +983,16 @@ class GreedyStrategy(metaclass=ABCMeta):
         success = True
         while numb_funcs <= max_numb_funcs - 1 and numb_redum < 5 and \
                 np.abs(best_gval - prev_gval) >= d_threshold:
+            self._update_parent(gparams)
             s_coeffs, s_exps, p_coeffs, p_exps = self._split_parameters(gparams)
 
             # Get the next list of choices of parameters for S-type and P-type orbitals.
-            # Add new S-type and then P-types initial guess.
-            choices_parameters_s = self.next_param_func(factor, s_coeffs, s_exps)
+            # Add new S-type and then P-types initial guess. Choices are generated as
+            # differences from the current basis, and duplicate choices are only optimized once.
+            choices_parameters_s = [
+                delta.apply(s_coeffs, s_exps)
+                for delta in _unique_deltas(self._next_delta_func(factor, s_exps), s_exps)
+            ]
             choices_parameters_s = [
                 np.hstack((x[:self.num_s + self.numb_func_increase], p_coeffs,
                            x[self.num_s + self.numb_func_increase:], p_exps))
@@ -537,7 +1006,10 @@ class GreedyStrategy(metaclass=ABCMeta):
                     np.random.random((2 * self.numb_func_increase,)) * 90 + 10,
                 ]
             else:
-                choices_parameters_p = self.next_param_func(factor, p_coeffs, p_exps)
+                choices_parameters_p = [
+                    delta.apply(p_coeffs, p_exps)
+                    for delta in _unique_deltas(self._next_delta_func(factor, p_exps), p_exps)
+                ]
             choices_parameters_p = [
                 np.hstack((s_coeffs, x[:self.num_p + self.numb_func_increase],
                            s_exps, x[self.num_p + self.numb_func_increase:]))
@@ -552,7 +1024,8 @@ class GreedyStrategy(metaclass=ABCMeta):
 
             # Run fast, quick optimization and find the best parameter out of the choices.
             _, best_lparam, is_s_optimal = self._find_best_lparams(
-                total_choices, num_s_choices, num_p_choices
+                total_choices, num_s_choices, num_p_choices, executor,
+                np.hstack((s_exps, p_exps)), racing, max_workers
             )
 
             # Update model for the new number of S-type and P-type functions.
@@ -571,10 +1044,11 @@ class GreedyStrategy(metaclass=ABCMeta):
             # Check if redundancies were found in the coefficients and exponents, remove them,
             #   change the factor and try again.
             s_coeffs, s_exps, p_coeffs, p_exps = self._split_parameters(opt_lparam)
-            s_coeffs_new, _ = remove_redundancies(s_coeffs, s_exps)
-            p_coeffs_new, _ = remove_redundancies(p_coeffs, p_exps)
+            s_coeffs_new, _ = remove_redundancies(s_coeffs, s_exps, redundancy_eps, relative_eps)
+            p_coeffs_new, _ = remove_redundancies(p_coeffs, p_exps, redundancy_eps, relative_eps)
             found_s_redundances = self.num_s != len(s_coeffs_new)
             found_p_redundancies = self.num_p != len(p_coeffs_new)
+            accepted = False
             if found_s_redundances or found_p_redundancies or opt_lvalue > best_gval:
                 # Move back one function and try a different factor to generate
                 #    better initial guesses.
@@ -594,12 +1068,27 @@ class GreedyStrategy(metaclass=ABCMeta):
                 prev_gval, best_gval = best_gval, opt_lvalue
                 numb_redum = 0    # Reset the number of redundancies.
                 factor = factor0  # Reset Original Factor.
+                accepted = True
+            niter += 1
+
+            if checkpoint is not None:
+                history = self._save_state(checkpoint, gparams, numb_funcs, prev_gval, best_gval,
+                                           params_iter, numb_redum, factor, factor0, history)
 
             if disp:
                 print(template_iters.format(
                     numb_funcs, self.num_s, self.num_p, *self.err_arr[-1],
                     np.abs(best_gval - prev_gval)
                 ))
+            if observer is not None:
+                observer.update({
+                    "algorithm": type(self).__name__, "iteration": niter,
+                    "time": timer() - start, "fun": float(best_gval),
+                    "nevals": self.fitting_obj._nevals - nevals,
+                    "delta_fun": float(np.abs(best_gval - prev_gval)), "num_s": self.num_s,
+                    "num_p": self.num_p, "accepted": accepted,
+                    "performance": [float(x) for x in self.err_arr[-1]],
+                })
 
         if numb_funcs == max_numb_funcs - 1 or numb_redum == 5:
             success = False
@@ -638,6 +1127,48 @@ class GreedyStrategy(metaclass=ABCMeta):
                    "exit_information": exit_info}
         return results
 
+    def _save_state(self, path, gparams, numb_funcs, prev_gval, best_gval, params_iter,
+                    numb_redum, factor, factor0, history):
+        r"""
+        Save the state of the greedy algorithm after an iteration to a checkpoint file.
+
+        Only the parameters & errors added since the previous checkpoint are saved (see
+        `bfit.fit._save_history`), so `history` is the number of history files of the checkpoint
+        & of parameters & errors in them. Their updated numbers are returned.
+        """
+        nhistory, nparams, nerrors = history
+        new_params = params_iter[nparams:]
+        _save_history(
+            path, type(self).__name__, nhistory,
+            params_iter=np.concatenate(new_params) if new_params else np.array([]),
+            sizes=[len(params) for params in new_params], err_arr=np.array(self.err_arr[nerrors:]),
+        )
+        _, keys, pos, has_gauss, cached_gauss = np.random.get_state()
+        _save_checkpoint(
+            path, type(self).__name__, gparams=gparams, numb_funcs=numb_funcs,
+            gvals=[prev_gval, best_gval], nhistory=nhistory + 1, numb_redum=numb_redum,
+            factors=[factor, factor0], num_funcs=[self.num_s, self.num_p], random_keys=keys,
+            random_state=[pos, has_gauss], random_gauss=cached_gauss,
+        )
+        return nhistory + 1, len(params_iter), len(self.err_arr)
+
+    def _load_state(self, path):
+        r"""Restore the state of the greedy algorithm saved by `_save_state`."""
+        state = _load_checkpoint(path, type(self).__name__)
+        history = _load_history(path, type(self).__name__, int(state["nhistory"]))
+        self.num_s, self.num_p = (int(number) for number in state["num_funcs"])
+        self.model.change_numb_s_and_numb_p(self.num_s, self.num_p)
+        self.err_arr = history["err_arr"]
+        np.random.set_state(("MT19937", state["random_keys"], *(int(x) for x in
+                             state["random_state"]), float(state["random_gauss"])))
+        params_iter = np.split(np.array(history["params_iter"]),
+                               np.cumsum(history["sizes"])[:-1])
+        prev_gval, best_gval = state["gvals"]
+        factor, factor0 = (float(value) for value in state["factors"])
+        return (state["gparams"], int(state["numb_funcs"]), prev_gval, best_gval, params_iter,
+                int(state["numb_redum"]), factor, factor0,
+                (int(state["nhistory"]), len(params_iter), len(self.err_arr)))
+
     @staticmethod
     def _final_exit_info(num_func, max_func, best_val, prev_gval, d_threshold):
         r"""Return string that holds how the greedy algorithm teminated."""
@@ -720,6 +1251,11 @@ class GreedyLeastSquares(GreedyStrategy):
         gaussian_obj = ScipyFit(grid, density, model, measure=SquaredDifference(), method=method,
                                 integral_dens=integral_dens, spherical=spherical)
         super().__init__(gaussian_obj, choice)
+        # state of the NNLS solution of the parent of the initial guesses
+        self._parent = None
+        # keys, scaled columns, norms of the columns, Gram matrix & projections of the density
+        # of the parent of the initial guesses, which are extended by the inserted columns
+        self._gram = None
 
     @property
     def local_tol(self):
@@ -781,35 +1317,149 @@ class GreedyLeastSquares(GreedyStrategy):
         )
         return p_min[1]
 
+    def _cofactor_keys(self, exponents):
+        r"""Return the key (is p-type, exponent) of each column of the cofactor matrix."""
+        types = [False] * self.model.num_s + [True] * self.model.num_p
+        return list(zip(types, np.asarray(exponents, dtype=float).tolist()))
+
     def _create_cofactor_matrix(self, exponents):
         r"""Create cofactor matrix for solving nnls."""
-        exponents_s = exponents[:self.model.num_s]
-        grid_squared_col = np.power(self.grid.points, 2.0).reshape((len(self.grid.points), 1))
-        exponential = np.exp(-exponents_s * grid_squared_col)
-
-        if self.model.num_p != 0:
-            exponents_p = exponents[self.model.num_s:]
-            exponential = np.hstack(
-                (exponential, grid_squared_col * np.exp(-exponents_p * grid_squared_col))
-            )
-        return exponential
+        return self._cofactor_columns(self._cofactor_keys(exponents))
+
+    def _cofactor_columns(self, keys):
+        r"""Return the columns of the cofactor matrix with the given keys."""
+        # the Gaussian columns are taken from the cache of the model (enabled during `run`), so
+        # they're shared with the evaluations of the model; NNLS is solved in double precision
+        is_p = np.array([key[0] for key in keys], dtype=bool)
+        columns = self.model._gaussian_matrix(np.array([key[1] for key in keys]))
+        columns = columns.astype(float)
+        columns[:, is_p] *= np.ravel(self.model.radii).astype(float)[:, None] ** 2
+        return columns
+
+    @_profiled("greedy.solve_nnls")
+    def _solve_nnls(self, exponents, parent=None):
+        r"""
+        Solve the non-negative coefficients of the exponents & return the solver state.
+
+        This is the problem :math:`\min_{c \geq 0} \|A c - f\|^2` (see `optimize_using_nnls`),
+        i.e. the unweighted sum over the grid points with the (unnormalized) cofactor matrix
+        :math:`A` of the exponents. It is solved by an active-set method on the normal
+        equations, warm started from the solver state of the `parent` set of exponents. The
+        columns of :math:`A` are scaled to unit norm, so the condition number of :math:`A^T A`
+        only grows with the collinearity of the columns rather than with their very different
+        magnitudes. The normal equations are extended from the ones of the parent (see
+        `_normal_equations`).
+        """
+        keys = self._cofactor_keys(exponents)
+        norms, gram, vector = self._normal_equations(keys)
+        coeffs, state = _gram_nnls_keys(gram, vector, keys, parent)
+        return coeffs / norms, state
+
+    def _normal_equations(self, keys):
+        r"""
+        Return the normal equations of the cofactor matrix with columns scaled to unit norm.
+
+        The Gram matrix & projections of the density of the columns of the parent of the
+        initial guesses are reused, so only the inner products of the other columns are
+        computed, i.e. :math:`O(NMK)` operations for :math:`K` columns not in the parent
+        instead of :math:`O(NM^2)`.
+
+        Parameters
+        ----------
+        keys : list
+            The key (is p-type, exponent) of each column of the cofactor matrix.
+
+        Returns
+        -------
+        norms : ndarray(M,)
+            The norm of each column of the cofactor matrix (one for a zero column).
+        gram : ndarray(M, M)
+            The Gram matrix of the scaled columns.
+        vector : ndarray(M,)
+            The projections of the density on the scaled columns.
+
+        """
+        size = len(keys)
+        norms, vector, gram = np.empty(size), np.empty(size), np.empty((size, size))
+        position = {} if self._gram is None else self._gram[0]
+        index = np.array([position.get(key, -1) for key in keys], dtype=int)
+        old, new = np.nonzero(index >= 0)[0], np.nonzero(index < 0)[0]
+        if old.size != 0:
+            _, parent_columns, parent_norms, parent_gram, parent_vector = self._gram
+            norms[old], vector[old] = parent_norms[index[old]], parent_vector[index[old]]
+            gram[np.ix_(old, old)] = parent_gram[np.ix_(index[old], index[old])]
+        if new.size != 0:
+            columns = self._cofactor_columns([keys[i] for i in new])
+            norms[new] = np.linalg.norm(columns, axis=0)
+            norms[new[norms[new] == 0.]] = 1.
+            columns = columns / norms[new]
+            vector[new] = np.dot(np.ravel(self.density).astype(float), columns)
+            if old.size != 0:
+                # inner products with all columns of the parent, without gathering them
+                gram[np.ix_(new, old)] = np.dot(columns.T, parent_columns)[:, index[old]]
+                gram[np.ix_(old, new)] = gram[np.ix_(new, old)].T
+            gram[np.ix_(new, new)] = np.dot(columns.T, columns)
+        return norms, gram, vector
+
+    def _update_parent(self, params):
+        r"""Solve the coefficients of the parent of the next initial guesses with NNLS."""
+        keys = self._cofactor_keys(params[len(params) // 2:])
+        self._gram = None
+        norms, gram, vector = self._normal_equations(keys)
+        self._gram = ({key: i for i, key in enumerate(keys)},
+                      self._cofactor_columns(keys) / norms, norms, gram, vector)
+        self._parent = self._solve_nnls(params[len(params) // 2:])[1]
+
+    @functools.wraps(GreedyStrategy.run)
+    def run(self, *args, **kwargs):
+        # the Gaussian columns of the exponents of the parent & the initial guesses are reused
+        # by their NNLS & the first evaluations of their optimizations
+        with self.model._cache_columns(_COLUMNS_CACHE_SIZE):
+            return super().run(*args, **kwargs)
 
     @staticmethod
     def optimize_using_nnls(true_dens, cofactor_matrix):
-        r"""Solve for the coefficients using non-linear least squares."""
-        b_vector = np.copy(true_dens)
-        b_vector = np.ravel(b_vector)
-        row_nnls_coefficients = nnls(cofactor_matrix, b_vector)
-        return row_nnls_coefficients[0]
+        r"""
+        Solve for the coefficients using non-negative least squares.
+
+        This solves :math:`\min_{c \geq 0} \|A c - f\|^2` for the cofactor matrix :math:`A`
+        with the same active-set method on the normal equations (with columns scaled to unit
+        norm) as the NNLS step of the greedy algorithm (see `_solve_nnls`).
+        """
+        b_vector = np.ravel(true_dens).astype(float)
+        cofactor_matrix = np.asarray(cofactor_matrix, dtype=float)
+        norms = np.linalg.norm(cofactor_matrix, axis=0)
+        norms[norms == 0.] = 1.
+        cofactor_matrix = cofactor_matrix / norms
+        coeffs = _gram_nnls(np.dot(cofactor_matrix.T, cofactor_matrix),
+                            np.dot(b_vector, cofactor_matrix))[0]
+        return coeffs / norms
+
+    def _run_local_choice(self, params, maxiter, resume=False):
+        r"""Optimize least-squares for at most `maxiter` iterations of scipy.optimize."""
+        coeffs, exps = params[:len(params)//2], params[len(params)//2:]
+        if not resume:
+            coeffs = self._solve_nnls(exps, self._parent)[0]
+        with warnings.catch_warnings():
+            # optimizations stopped by the iteration limit are resumed later
+            warnings.filterwarnings("ignore", message="Failed Optimization: Iteration limit")
+            results = self.fitting_obj.run(
+                coeffs, exps, tol=self.local_tol, maxiter=maxiter,
+                with_constraint=self.with_constraint
+            )
+        # an optimization which failed for another reason would not progress if resumed
+        converged = results["success"] or results["niter"] is None or results["niter"] < maxiter
+        return np.hstack((results["coeffs"], results["exps"])), converged
 
     # pylint: disable=arguments-differ
     def get_optimization_routine(self, params, local=False):
         r"""Optimize least-squares using nnls and scipy.optimize from ScipyFit."""
-        # First solves the optimal coefficients (while exponents are fixed) using NNLS.
+        # First solves the optimal coefficients (while exponents are fixed) using NNLS on the
+        # normal equations of the cofactor matrix.
         # Then it optimizes both coefficients and exponents using scipy.optimize.
         exps = params[len(params)//2:]
-        cofac_matrix = self._create_cofactor_matrix(exps)
-        coeffs = self.optimize_using_nnls(self.density, cofac_matrix)
+        # NNLS of size M x M, reusing the factorization of the parent of the initial guesses
+        coeffs = self._solve_nnls(exps, self._parent)[0]
         if local:
             results = self.fitting_obj.run(
                 coeffs, exps, tol=self.local_tol, maxiter=self.l_maxiter,
@@ -826,6 +1476,9 @@ class GreedyLeastSquares(GreedyStrategy):
 class GreedyKLFPI(GreedyStrategy):
     r"""Optimize Kullback-Leibler using the Greedy method and fixed point iteration method."""
 
+    # each fixed-point iteration only depends on the current coefficients and exponents
+    _exact_resume = True
+
     def __init__(
         self, grid, density, choice="pick-one", g_eps_coeff=1e-4, g_eps_exp=1e-5,
             g_eps_obj=1e-10, l_eps_coeff=1e-2, l_eps_exp=1e-3, l_eps_obj=1e-8,
@@ -948,6 +1601,16 @@ class GreedyKLFPI(GreedyStrategy):
         exps = 3. * self.integral_dens / (2. * 4. * np.pi * denom)
         return np.array([self.integral_dens, exps])
 
+    def _run_local_choice(self, params, maxiter, resume=False):
+        r"""Optimize KL using KL-FPI method for at most `maxiter` iterations."""
+        coeffs, exps = params[:len(params)//2], params[len(params)//2:]
+        result = self.fitting_obj.run(
+            coeffs, exps, opt_coeffs=True, opt_expons=True, maxiter=maxiter,
+            c_threshold=self.l_threshold_coeff, e_threshold=self.l_threshold_exp,
+            d_threshold=self.l_threshold_obj, disp=False
+        )
+        return np.hstack((result["coeffs"], result["exps"])), result["niter"] < maxiter
+
     # pylint: disable=arguments-differ
     def get_optimization_routine(self, params, local=False):
         r"""Optimize KL using KL-FPI method."""
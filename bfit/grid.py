@@ -24,31 +24,73 @@ r"""Grid module for integration."""
 
 import numpy as np
 
+from bfit.precision import Precision
+
 __all__ = ["ClenshawRadialGrid", "UniformRadialGrid", "CubicGrid"]
 
 
 class _BaseRadialGrid:
     r"""Radial Grid Base Class."""
 
-    def __init__(self, points):
+    def __init__(self, points, precision=None):
         """
         Construct BaseRadialGrid object.
 
         Parameters
         ----------
         points : ndarray(N,)
-            The radial grid points.
+            The radial grid points. Points which aren't float32, float64 or longdouble
+            (e.g. integers) are converted to float64.
+        precision : Precision, optional
+            The precision policy. The points & weights are computed in the data type of
+            `points`, then converted to the data type of the policy. If None, the data type
+            of `points` is used with plain summation.
 
         """
         if not isinstance(points, np.ndarray) or points.ndim != 1:
             raise TypeError("Argument points should be a 1D numpy array.")
+        # integer (or half-precision) points are integrated in float64, like np.trapz does
+        if points.dtype not in (np.float32, np.float64, np.longdouble):
+            points = points.astype(np.result_type(points, float))
+        if precision is None:
+            precision = Precision(points.dtype)
+        elif not isinstance(precision, Precision):
+            raise TypeError(f"Argument precision {type(precision)} should be a Precision.")
+        self._precision = precision
         self._points = np.ravel(points)
+        # trapezoidal weights, so that integration is a dot product
+        spacing = np.diff(self._points)
+        self._weights = np.zeros_like(self._points)
+        self._weights[:-1] += 0.5 * spacing
+        self._weights[1:] += 0.5 * spacing
+        self._points = precision.asarray(self._points)
+        self._weights = precision.asarray(self._weights)
 
     @property
     def points(self):
         """Radial grid points."""
         return self._points
 
+    @property
+    def weights(self):
+        r"""Trapezoidal weights :math:`w_i` such that :math:`\int f(r) dr = \sum_i w_i f(r_i)`."""
+        return self._weights
+
+    @property
+    def precision(self):
+        r"""Precision policy of the grid points, weights & integration."""
+        return self._precision
+
+    @property
+    def spherical_weights(self):
+        r"""
+        Trapezoidal weights including the spherical Jacobian :math:`4 \pi r^2`.
+
+        These are the weights :math:`4 \pi r_i^2 w_i` such that
+        :math:`\int_0^\infty f(r) 4 \pi r^2 dr = \sum_i 4 \pi r_i^2 w_i f(r_i)`.
+        """
+        return 4.0 * np.pi * self._points**2.0 * self._weights
+
     def __len__(self):
         """Return number of grid points."""
         return self._points.shape[0]
@@ -74,7 +116,28 @@ class _BaseRadialGrid:
             raise ValueError(
                 f"The argument arr should have {self.points.shape} shape!"
             )
-        return np.trapz(y=arr, x=self.points)
+        return self._precision.integrate(self._weights, arr)
+
+    def integrate_many(self, arr):
+        r"""
+        Compute trapezoidal integration of several functions evaluated on the radial grid points.
+
+        Parameters
+        ----------
+        arr : ndarray(N, K)
+            The :math:`K` integrands evaluated on the :math:`N` radial grid points (as columns).
+
+        Returns
+        -------
+        ndarray(K,) :
+            The value of the integral of each column.
+
+        """
+        if arr.ndim != 2 or arr.shape[0] != self.points.shape[0]:
+            raise ValueError(
+                f"The argument arr should have ({self.points.shape[0]}, K) shape!"
+            )
+        return np.dot(self._weights, arr)
 
 
 class UniformRadialGrid(_BaseRadialGrid):
@@ -85,7 +148,8 @@ class UniformRadialGrid(_BaseRadialGrid):
     on the grid.
     """
 
-    def __init__(self, num_pts, min_radii=0., max_radii=100., dtype=np.longdouble):
+    def __init__(self, num_pts, min_radii=0., max_radii=100., dtype=np.longdouble,
+                 precision=None):
         """
         Construct the UniformRadialGrid object.
 
@@ -98,7 +162,10 @@ class UniformRadialGrid(_BaseRadialGrid):
         max_radii : float, optional
             The largest radial grid point.
         dtype : data-type, optional
-            The desired NumPy data-type.
+            The desired NumPy data-type. Only used if `precision` is None.
+        precision : Precision, optional
+            The precision policy. If provided, the points are computed in extended precision
+            and converted to its data type, and the integrals use its summation.
 
         """
         if not isinstance(num_pts, int) or num_pts <= 0:
@@ -115,8 +182,10 @@ class UniformRadialGrid(_BaseRadialGrid):
             raise ValueError("The max_radii should be greater than the min_radii.")
 
         # compute points
+        if precision is not None:
+            dtype = np.longdouble
         points = np.linspace(start=min_radii, stop=max_radii, num=num_pts, dtype=dtype)
-        super().__init__(points)
+        super().__init__(points, precision)
 
 
 class ClenshawRadialGrid(_BaseRadialGrid):
@@ -138,7 +207,7 @@ class ClenshawRadialGrid(_BaseRadialGrid):
     """
 
     def __init__(self, atomic_number, num_core_pts, num_diffuse_pts, extra_pts=None,
-                 include_origin=True, dtype=np.longdouble):
+                 include_origin=True, dtype=np.longdouble, precision=None):
         r"""
         Construct ClenshawRadialGrid grid object.
 
@@ -155,7 +224,10 @@ class ClenshawRadialGrid(_BaseRadialGrid):
         include_origin : bool
             If true, then include the origin :math:`r=0`.
         dtype : data-type, optional
-            The desired NumPy data-type.
+            The desired NumPy data-type. Only used if `precision` is None.
+        precision : Precision, optional
+            The precision policy. If provided, the points are computed in extended precision
+            and converted to its data type, and the integrals use its summation.
 
         """
         if not isinstance(atomic_number, int) or atomic_number <= 0:
@@ -170,6 +242,8 @@ class ClenshawRadialGrid(_BaseRadialGrid):
             )
 
         self._atomic_number = atomic_number
+        if precision is not None:
+            dtype = np.longdouble
 
         # compute core and diffuse points
         core_points = self._get_points(
@@ -186,7 +260,7 @@ class ClenshawRadialGrid(_BaseRadialGrid):
         else:
             points = np.concatenate((core_points, diff_points))
 
-        super().__init__(np.sort(points))
+        super().__init__(np.sort(points), precision)
 
     @property
     def atomic_number(self):
@@ -249,7 +323,7 @@ class ClenshawRadialGrid(_BaseRadialGrid):
 class CubicGrid:
     r"""Equally-Spaced 3D Cubic Grid Class."""
 
-    def __init__(self, origin, axes, shape):
+    def __init__(self, origin, axes, shape, precision=None):
         """
         Construct the CubicGrid object.
 
@@ -261,8 +335,16 @@ class CubicGrid:
             The axes that point to the direction of the grid.
         shape : (int, int, int)
             The number of points in each axes.
+        precision : Precision, optional
+            The precision policy of the points, weights & integration. If None, the points are
+            float64 and integrals use plain summation.
 
         """
+        if precision is None:
+            precision = Precision(np.float64)
+        elif not isinstance(precision, Precision):
+            raise TypeError(f"Argument precision {type(precision)} should be a Precision.")
+        self._precision = precision
         # TODO: Add raise error for Type and Values here for origin, axes.
         self._axes = axes
         self._origin = origin
@@ -279,14 +361,19 @@ class CubicGrid:
         points = coords.T.dot(self._axes) + origin
         # assign the weights
         weights = self._choose_weight_scheme(shape)
-        self._weights = weights
-        self._points = np.array(points)
+        self._weights = precision.asarray(weights)
+        self._points = precision.asarray(points)
 
     @property
     def axes(self):
         r"""Return the axes/three-directions of the cubic grid."""
         return self._axes
 
+    @property
+    def precision(self):
+        r"""Precision policy of the grid points, weights & integration."""
+        return self._precision
+
     @classmethod
     def from_molecule(
             cls,
@@ -295,6 +382,7 @@ class CubicGrid:
             spacing=0.2,
             extension=5.0,
             rotate=True,
+            precision=None,
     ):
         r"""
         Construct a uniform grid given the molecular pseudo-numbers and coordinates.
@@ -314,6 +402,8 @@ class CubicGrid:
             aligned with the principle axes of rotation of the molecule.
             If False, generates axes based on the x,y,z-axis and the spacing parameter, and
             the origin is defined by the maximum/minimum of the atomic coordinates.
+        precision : Precision, optional
+            The precision policy of the grid. See `CubicGrid`.
         """
         # calculate center of mass of the nuclear charges:
         totz = np.sum(atcorenums)
@@ -350,7 +440,7 @@ class CubicGrid:
         # Compute origin by taking the center of mass then subtracting the half of the number
         #    of points in the direction of the axes.
         origin = com - np.dot((0.5 * shape), axes)
-        return cls(origin, axes, shape)
+        return cls(origin, axes, shape, precision)
 
     def _calculate_volume(self, shape):
         r"""Return the volume of the Uniform Grid."""
@@ -381,6 +471,11 @@ class CubicGrid:
         """Return cubic grid points."""
         return self._points
 
+    @property
+    def weights(self):
+        """Return the weights of the cubic grid points."""
+        return self._weights
+
     def __len__(self):
         """Return the number of grid points."""
         return self._points.shape[0]
@@ -409,5 +504,26 @@ class CubicGrid:
             raise ValueError(
                 f"Argument arr should have ({len(self)},) shape."
             )
-        value = np.sum(self._weights * arr)
+        value = self._precision.integrate(self._weights, arr)
+        return value
+
+    def integrate_many(self, arr):
+        r"""Compute the integral of several functions evaluated on the grid points.
+
+        Parameters
+        ----------
+        arr : ndarray(N, K)
+            The :math:`K` integrands evaluated on the :math:`N` grid points (as columns).
+
+        Returns
+        -------
+        value : ndarray(K,)
+            The value of the integral of each column.
+
+        """
+        if arr.ndim != 2 or arr.shape[0] != len(self):
+            raise ValueError(
+                f"Argument arr should have ({len(self)}, K) shape."
+            )
+        value = np.dot(self._weights, arr)
         return value
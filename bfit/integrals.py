@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# BFit is a Python library for fitting a convex sum of Gaussian
+# functions to any probability distribution
+#
+# Copyright (C) 2020- The QC-Devs Community
+#
+# This file is part of BFit.
+#
+# BFit is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# BFit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+# ---
+r"""Closed-form integrals of s-type and p-type Gaussian functions over the whole space."""
+
+import numpy as np
+from scipy.special import gammaln
+
+__all__ = ["gaussian_moments", "gaussian_overlaps"]
+
+
+def _check_angular(expons, angular):
+    r"""Return the angular numbers as an integer array, checking they match the exponents."""
+    angular = np.asarray(angular)
+    if angular.shape != np.shape(expons):
+        raise ValueError(
+            f"Arguments expons {np.shape(expons)} & angular {angular.shape} should have the "
+            f"same shape."
+        )
+    if np.any((angular != 0) & (angular != 1)):
+        raise ValueError("Argument angular should be 0 (s-type) or 1 (p-type).")
+    return angular.astype(int)
+
+
+def gaussian_moments(expons, angular, order=0, dim=3):
+    r"""
+    Compute the radial moments of s-type and p-type Gaussian functions.
+
+    The moment of order :math:`k` of the Gaussian function :math:`r^{2l} e^{-\alpha r^2}` in
+    :math:`D` dimensions is
+
+    .. math::
+        \int r^k r^{2l} e^{-\alpha r^2} d^D x = \frac{\pi^{D/2} \Gamma(l + (k + D) / 2)}
+                                                   {\Gamma(D / 2) \alpha^{l + (k + D) / 2}},
+
+    where :math:`l=0` for s-type and :math:`l=1` for p-type Gaussian functions and :math:`r` is
+    the distance from the center of the Gaussian function.
+
+    Parameters
+    ----------
+    expons : ndarray, (M,)
+        The exponents :math:`\alpha` of the Gaussian functions.
+    angular : ndarray, (M,)
+        The angular number :math:`l` of each Gaussian function, 0 for s-type and 1 for p-type.
+    order : float, optional
+        The order :math:`k` of the moment, which should be larger than :math:`-D`.
+        Default is zero, i.e. the integral of the Gaussian functions.
+    dim : int, optional
+        The number of dimensions :math:`D` of the space.
+
+    Returns
+    -------
+    ndarray, (M,) :
+        The moments of the Gaussian functions.
+
+    """
+    angular = _check_angular(expons, angular)
+    if dim < 1:
+        raise ValueError(f"Argument dim {dim} should be a positive integer.")
+    if order <= -dim:
+        raise ValueError(f"Argument order {order} should be larger than -dim={-dim}.")
+    power = angular + (order + dim) / 2.
+    const = np.exp(dim / 2. * np.log(np.pi) + gammaln(power) - gammaln(dim / 2.))
+    return const / expons**power
+
+
+def gaussian_overlaps(expons1, angular1, expons2, angular2, dist_sq=0., dim=3):
+    r"""
+    Compute the overlaps of two sets of s-type and p-type Gaussian functions.
+
+    The overlap of two s-type Gaussian functions with exponents :math:`\alpha, \beta` whose
+    centers are separated by the distance :math:`R` is
+
+    .. math::
+        S(\alpha, \beta) = \int e^{-\alpha r_A^2} e^{-\beta r_B^2} d^D x
+                         = \bigg(\frac{\pi}{p}\bigg)^{D/2} e^{-\alpha \beta R^2 / p},
+
+    where :math:`p = \alpha + \beta`. The overlaps with p-type Gaussian functions
+    :math:`r_A^2 e^{-\alpha r_A^2}` are the (negative) derivatives :math:`-\partial S /
+    \partial \alpha`, :math:`-\partial S / \partial \beta` and
+    :math:`\partial^2 S / \partial \alpha \partial \beta`.
+
+    Parameters
+    ----------
+    expons1 : ndarray, (M1,)
+        The exponents of the first set of Gaussian functions.
+    angular1 : ndarray, (M1,)
+        The angular number of each Gaussian function of the first set, 0 for s-type and 1 for
+        p-type.
+    expons2 : ndarray, (M2,)
+        The exponents of the second set of Gaussian functions.
+    angular2 : ndarray, (M2,)
+        The angular number of each Gaussian function of the second set.
+    dist_sq : float, optional
+        The squared distance :math:`R^2` between the centers of the two sets of Gaussian
+        functions. Default is zero, i.e. the same center.
+    dim : int, optional
+        The number of dimensions :math:`D` of the space.
+
+    Returns
+    -------
+    ndarray, (M1, M2) :
+        The overlaps :math:`\int g_i(x) h_j(x) d^D x` of each pair of Gaussian functions.
+
+    """
+    angular1, angular2 = _check_angular(expons1, angular1), _check_angular(expons2, angular2)
+    if dim < 1:
+        raise ValueError(f"Argument dim {dim} should be a positive integer.")
+    alpha, beta = expons1[:, None], expons2[None, :]
+    total = alpha + beta
+    overlap = (np.pi / total)**(dim / 2.) * np.exp(-alpha * beta * dist_sq / total)
+    # minus the logarithmic derivatives of the s-type overlap w.r.t. each exponent
+    d_alpha = dim / (2. * total) + dist_sq * beta**2 / total**2
+    d_beta = dim / (2. * total) + dist_sq * alpha**2 / total**2
+    p_p = d_alpha * d_beta + dim / (2. * total**2) - 2. * dist_sq * alpha * beta / total**3
+    factor = np.where(angular1[:, None] == 1, np.where(angular2[None, :] == 1, p_p, d_alpha),
+                      np.where(angular2[None, :] == 1, d_beta, 1.))
+    return overlap * factor
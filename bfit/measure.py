@@ -26,12 +26,65 @@ from abc import ABC, abstractmethod
 
 import numpy as np
 
+from bfit.profiling import _profiled
+
 __all__ = ["SquaredDifference", "KLDivergence", "TsallisDivergence"]
 
 
+def _masked_ratio(density, model, mask_value, fill_value, out=None, mask=None):
+    r"""
+    Compute the ratio of density over model with the masked values replaced by `fill_value`.
+
+    This is equivalent to `np.ma.filled(density / np.ma.masked_less_equal(model, mask_value),
+    fill_value)` without creating masked arrays, i.e. the ratio is masked where the model is less
+    than or equal to `mask_value`, where the ratio isn't finite, or where the model is negligible
+    compared to density (the domain of `np.ma.divide`).
+
+    Parameters
+    ----------
+    density : ndarray(N,)
+        The exact density evaluated on the grid points.
+    model : ndarray(N,)
+        The model density evaluated on the grid points.
+    mask_value : float
+        The model values less than or equal to this number are masked.
+    fill_value : float
+        The value of the ratio at the masked points.
+    out : ndarray(N,), optional
+        The array where the ratio is written. If None, a new array is created.
+    mask : ndarray(N,), optional
+        The boolean array where the mask is written. If None, a new array is created.
+
+    Returns
+    -------
+    ndarray(N,) :
+        The ratio of density over model.
+
+    """
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        ratio = np.divide(density, model, out=out)
+    mask = np.less_equal(model, mask_value, out=mask)
+    # the ratio isn't finite or the model is negligible, |model| <= tiny * |density|, only where
+    # the ratio is huge (or nan), so the exact check is only done on these few points. The bound
+    # is 0.25 / tiny, since the rounding of the (subnormal) product is at most a factor of two.
+    tiny = np.finfo(float).tiny
+    with np.errstate(invalid="ignore"):
+        suspicious = np.flatnonzero(~(np.abs(ratio) < 0.25 / tiny))
+    if suspicious.size != 0:
+        with np.errstate(invalid="ignore"):
+            mask[suspicious] |= ~np.isfinite(ratio[suspicious]) | (
+                np.abs(density[suspicious]) * tiny >= np.abs(model[suspicious])
+            )
+    np.copyto(ratio, fill_value, where=mask)
+    return ratio
+
+
 class Measure(ABC):
     r"""Abstract base class for the measures."""
 
+    # profile of the evaluations, only enabled by the runs of the fitting algorithms
+    _profile = None
+
     @abstractmethod
     def evaluate(self, density, model, deriv=False):
         r"""
@@ -59,10 +112,33 @@ class Measure(ABC):
         """
         raise NotImplementedError("Evaluate function should be implemented.")
 
+    def second_derivative(self, density, model):
+        r"""
+        Evaluate the second derivative of the measure w.r.t. model on the grid points.
+
+        Parameters
+        ----------
+        density : ndarray(N,)
+            The exact density evaluated on the grid points.
+        model : ndarray(N,)
+            The model evaluated on the same :math:`N` points that `density` is
+            evaluated on.
+
+        Returns
+        -------
+        d2m : ndarray(N,)
+            The second derivative of measure w.r.t. model evaluated on the grid points.
+
+        """
+        raise NotImplementedError(
+            f"Second derivative of {type(self).__name__} measure is not implemented."
+        )
+
 
 class SquaredDifference(Measure):
     r"""Squared Difference Class for performing the Least-Squared method."""
 
+    @_profiled("measure.evaluate", deriv=2)
     def evaluate(self, density, model, deriv=False):
         r"""
         Evaluate squared difference b/w density & model on the grid points.
@@ -116,6 +192,31 @@ class SquaredDifference(Measure):
             return value, -2 * residual
         return value
 
+    def second_derivative(self, density, model):
+        r"""
+        Evaluate the second derivative of squared difference w.r.t. model density.
+
+        This is :math:`\frac{\partial^2 (f(x) - g(x))^2}{\partial g(x)^2} = 2`.
+
+        Parameters
+        ----------
+        density : ndarray(N,)
+            The exact density evaluated on the grid points.
+        model : ndarray(N,)
+            The model density evaluated on the grid points.
+
+        Returns
+        -------
+        d2m : ndarray(N,)
+            The second derivative of squared difference w.r.t. model density evaluated on the
+            grid points.
+
+        """
+        if model.shape != density.shape:
+            raise ValueError(f"Model shape {model.shape} should be the same as density"
+                             f" {density.shape}.")
+        return np.full(model.shape, 2.0)
+
 
 class KLDivergence(Measure):
     r"""Kullback-Leibler Divergence Class."""
@@ -149,6 +250,7 @@ class KLDivergence(Measure):
         r"""Value that gets returned if the model density is negative."""
         return self._negative_val
 
+    @_profiled("measure.evaluate", deriv=2)
     def evaluate(self, density, model, deriv=False):
         r"""
         Evaluate the integrand of Kullback-Leibler divergence b/w true & model.
@@ -207,26 +309,55 @@ class KLDivergence(Measure):
                              f" {density.shape}.")
         if not isinstance(deriv, bool):
             raise TypeError(f"Deriv {type(deriv)} should be Boolean type.")
-        if np.any(model < 0.):
+        if model.size != 0 and np.min(model) < 0.:
             if deriv:
                 # Add an incredibly large derivative
-                return np.array([self.negative_val] * model.shape[0]), \
-                       np.array([self.negative_val] * model.shape[0])
-            return np.array([self.negative_val] * model.shape[0])
+                return np.full(model.shape[0], self.negative_val), \
+                       np.full(model.shape[0], self.negative_val)
+            return np.full(model.shape[0], self.negative_val)
 
         # compute ratio & replace masked values by 1.0
-        ratio = density / np.ma.masked_less_equal(model, self.mask_value)
-        ratio = np.ma.filled(ratio, fill_value=1.0)
+        ratio = _masked_ratio(density, model, self.mask_value, 1.0)
 
         # compute KL divergence
         # Add ignoring division by zero and multiplying by np.nan
         with np.errstate(divide='ignore', invalid="ignore"):
-            value = density * np.log(ratio)
-        # compute derivative
+            value = np.log(ratio)
+            value *= density
+        # compute derivative (ratio isn't needed anymore, so it is negated in-place)
         if deriv:
-            return value, -ratio
+            return value, np.negative(ratio, out=ratio)
         return value
 
+    def second_derivative(self, density, model):
+        r"""
+        Evaluate the second derivative of Kullback-Leibler integrand w.r.t. model density.
+
+        This is :math:`\frac{f(x)}{g(x)^2}`, and zero where the model density is masked
+        (i.e. the integrand is constant) or negative.
+
+        Parameters
+        ----------
+        density : ndarray(N,)
+            The exact density evaluated on the grid points.
+        model : ndarray(N,)
+            The model density evaluated on the grid points.
+
+        Returns
+        -------
+        d2m : ndarray(N,)
+            The second derivative of divergence w.r.t. model density evaluated on the grid
+            points.
+
+        """
+        if model.shape != density.shape:
+            raise ValueError(f"Model shape {model.shape} should be the same as density"
+                             f" {density.shape}.")
+        if model.size != 0 and np.min(model) < 0.:
+            return np.zeros(model.shape)
+        ratio = _masked_ratio(density, model, self.mask_value, 0.0)
+        return np.divide(ratio, model, out=np.zeros_like(ratio), where=ratio != 0.)
+
 
 class TsallisDivergence(Measure):
     r"""Tsallis Divergence Class."""
@@ -271,6 +402,7 @@ class TsallisDivergence(Measure):
         r"""Return masking value used when evaluating the measure."""
         return self._mask_value
 
+    @_profiled("measure.evaluate", deriv=2)
     def evaluate(self, density, model, deriv=False):
         r"""
         Evaluate the integrand of Tsallis divergence ([1]_, [2]_) on grid points.
@@ -339,11 +471,43 @@ class TsallisDivergence(Measure):
         if not isinstance(deriv, bool):
             raise TypeError(f"Deriv {type(deriv)} should be Boolean type.")
 
-        # compute ratio & replace masked values by 1.0
-        ratio = density / np.ma.masked_less_equal(model, self.mask_value)
-        ratio = np.ma.filled(ratio, fill_value=0.0)
-        value = density * (np.power(ratio, self.alpha - 1.0) - 1.0)
-        integrand = value / (self.alpha - 1.0)
+        # compute ratio & replace masked values by 0.0
+        ratio = _masked_ratio(density, model, self.mask_value, 0.0)
+        integrand = np.power(ratio, self.alpha - 1.0)
+        integrand -= 1.0
+        integrand *= density
+        integrand /= self.alpha - 1.0
         if deriv:
-            return integrand, -np.power(ratio, self.alpha)
+            # ratio isn't needed anymore, so its power is computed in-place
+            ratio = np.power(ratio, self.alpha, out=ratio)
+            return integrand, np.negative(ratio, out=ratio)
         return integrand
+
+    def second_derivative(self, density, model):
+        r"""
+        Evaluate the second derivative of Tsallis integrand w.r.t. model density.
+
+        This is :math:`\frac{\alpha}{g(x)} \bigg(\frac{f(x)}{g(x)}\bigg)^\alpha`, and zero
+        where the model density is masked.
+
+        Parameters
+        ----------
+        density : ndarray(N,)
+            The exact density evaluated on the grid points.
+        model : ndarray(N,)
+            The model density evaluated on the grid points.
+
+        Returns
+        -------
+        d2m : ndarray(N,)
+            The second derivative of divergence w.r.t. model density evaluated on the grid
+            points.
+
+        """
+        if model.shape != density.shape:
+            raise ValueError(f"Model shape {model.shape} should be the same as density"
+                             f" {density.shape}.")
+        ratio = _masked_ratio(density, model, self.mask_value, 0.0)
+        ratio = np.power(ratio, self.alpha, out=ratio)
+        ratio *= self.alpha
+        return np.divide(ratio, model, out=np.zeros_like(ratio), where=ratio != 0.)
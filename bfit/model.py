@@ -22,10 +22,16 @@
 # ---
 r"""Models used for fitting."""
 
-from numbers import Integral
+from collections import OrderedDict
+from contextlib import contextmanager, ExitStack
+from numbers import Integral, Real
 
 import numpy as np
 
+from bfit.integrals import gaussian_moments, gaussian_overlaps
+from bfit.precision import Precision
+from bfit.profiling import _profiled
+
 __all__ = ["AtomicGaussianDensity", "MolecularGaussianDensity"]
 
 
@@ -47,7 +53,13 @@ class AtomicGaussianDensity:
 
     """
 
-    def __init__(self, points, center=None, num_s=1, num_p=0, normalize=False):
+    # profile of the evaluations, only enabled by the runs of the fitting algorithms
+    _profile = None
+
+    def __init__(
+        self, points, center=None, num_s=1, num_p=0, normalize=False, cache_size=0,
+        screen_tol=None, precision=None,
+    ):
         r"""
         Construct class representing atomic density modeled as Gaussian functions.
 
@@ -64,6 +76,23 @@ class AtomicGaussianDensity:
              Number of p-type Gaussian basis functions.
         normalize : bool, optional
             Whether to normalize Gaussian basis functions.
+        cache_size : int, optional
+            Maximum number of Gaussian columns :math:`e^{-\alpha r^2}` (one per exponent) kept
+            in memory and reused when the model is evaluated again with the same exponents.
+            The cache only pays off when the exponents are fixed (e.g. coefficient-only fits),
+            since optimizing the exponents changes them at every evaluation. If zero (default),
+            no columns are cached.
+        screen_tol : float, optional
+            If provided, each Gaussian basis function (without its coefficient) is only evaluated
+            on the grid points where its value is larger than this tolerance. These points are
+            found from the distances of grid points sorted once at construction, and only the
+            grid points within the cutoff radius of the most diffuse Gaussian are evaluated.
+            Points outside this radius are zero. Screened evaluations don't use the cache.
+        precision : Precision, optional
+            The precision policy, usually the one of the grid. If provided, the distances of the
+            grid points, the parameters and every array on the grid points (e.g. the Gaussian
+            basis matrix & its derivatives) have its data type. If None, the data type follows
+            the grid points (and derivatives are float64).
 
         """
         if not isinstance(points, np.ndarray):
@@ -74,6 +103,12 @@ class AtomicGaussianDensity:
             raise TypeError("Argument num_p should be a positive integer.")
         if num_s + num_p == 0:
             raise ValueError("Arguments num_s & num_p cannot both be zero!")
+        if not isinstance(cache_size, Integral) or cache_size < 0:
+            raise TypeError("Argument cache_size should be a non-negative integer.")
+        if screen_tol is not None and (not isinstance(screen_tol, Real) or screen_tol <= 0.):
+            raise ValueError("Argument screen_tol should be a positive number.")
+        if precision is not None and not isinstance(precision, Precision):
+            raise TypeError(f"Argument precision {type(precision)} should be a Precision.")
 
         # check & assign coordinates.
         if center is not None:
@@ -93,6 +128,25 @@ class AtomicGaussianDensity:
         else:
             radii = np.abs(points - self.coord)
         self._radii = np.ravel(radii)
+        # squared radii are needed by every evaluation, so compute them once
+        self._radii_sq = self._radii ** 2
+        self._precision = precision
+        if precision is not None:
+            self._radii = precision.asarray(self._radii)
+            self._radii_sq = precision.asarray(self._radii_sq)
+        # data type of the derivatives on the grid points
+        self._deriv_dtype = np.float64 if precision is None else precision.dtype
+        # cache of exp(-a * r**2) evaluated on the grid, keyed by exponent a
+        self._cache_size = cache_size
+        self._columns = OrderedDict()
+        # columns of a parent basis reused regardless of the cache, see `_set_parent_columns`
+        self._parent_columns = None
+        # grid points sorted by their distance from center, so the points within any cutoff
+        # radius are the first ones of this order
+        self._screen_tol = screen_tol
+        if screen_tol is not None:
+            self._order = np.argsort(self._radii_sq, kind="stable")
+            self._sorted_radii_sq = self._radii_sq[self._order]
 
         self._points = points
         self.ns = num_s
@@ -129,6 +183,26 @@ class AtomicGaussianDensity:
         """Return the number of basis functions centers."""
         return 1
 
+    @property
+    def dim(self):
+        r"""Return the dimension of the space of the analytic integrals.
+
+        This is the number of columns of the grid points, or three if the grid points are
+        one-dimensional (i.e. distances from the center of a spherical density).
+        """
+        return self._points.shape[1] if self._points.ndim > 1 else 3
+
+    @property
+    def precision(self):
+        """Return the precision policy of the model (None if it follows the grid points)."""
+        return self._precision
+
+    def _cast(self, *arrays):
+        r"""Return the arrays with the data type of the precision policy (if any)."""
+        if self._precision is None:
+            return arrays
+        return tuple(self._precision.asarray(array) for array in arrays)
+
     @property
     def prefactor(self):
         r"""Obtain list of exponents for the prefactors."""
@@ -153,6 +227,428 @@ class AtomicGaussianDensity:
         self.ns = new_s
         self.np = new_p
 
+    def clear_cache(self):
+        r"""Remove all the cached Gaussian columns."""
+        self._columns.clear()
+
+    @contextmanager
+    def _cache_columns(self, cache_size):
+        r"""
+        Return a context in which at least `cache_size` Gaussian columns are cached.
+
+        This enables the cache for the evaluations with fixed exponents (e.g. coefficient-only
+        fits), regardless of the size of the cache of the model. When the context exits, the
+        previous size of the cache is restored and the least recently used columns beyond it
+        are removed.
+
+        Parameters
+        ----------
+        cache_size : int
+            The minimum number of Gaussian columns kept in the cache within the context.
+
+        """
+        previous = self._cache_size
+        self._cache_size = max(previous, cache_size)
+        try:
+            yield self
+        finally:
+            self._cache_size = previous
+            while len(self._columns) > previous:
+                self._columns.popitem(last=False)
+
+    def _gaussian_matrix(self, expons):
+        r"""
+        Evaluate :math:`e^{-\alpha_i r^2}` on the grid points for each exponent.
+
+        Columns of previously seen exponents are taken from the cache, and only the
+        missing ones are computed (and then stored in the cache).
+
+        Parameters
+        ----------
+        expons : ndarray, (M,)
+            The exponents of Gaussian basis functions.
+
+        Returns
+        -------
+        matrix : ndarray, (N, M)
+            The Gaussian functions evaluated on the grid points for each exponent.
+
+        """
+        if self._cache_size == 0 and self._parent_columns is None:
+            return np.exp(-expons[None, :] * self._radii_sq[:, None])
+        # store columns as rows of a C-ordered array, so each one is contiguous in memory
+        dtype = np.result_type(expons, self._radii_sq)
+        matrix = np.empty((expons.size, self._radii_sq.size), dtype=dtype)
+        keys = expons.tolist()
+        parent = self._parent_index(expons)
+        missing = []
+        for i, key in enumerate(keys):
+            if parent[i] >= 0:
+                matrix[i] = self._parent_columns[1][:, parent[i]]
+                continue
+            column = self._columns.get(key)
+            if column is None:
+                missing.append(i)
+            else:
+                self._columns.move_to_end(key)
+                matrix[i] = column
+        if missing:
+            matrix[missing] = np.exp(-expons[missing, None] * self._radii_sq[None, :])
+            self._store_columns(expons[missing], matrix[missing].T)
+        return matrix.T
+
+    def _store_columns(self, expons, matrix):
+        r"""
+        Store the Gaussian columns of the exponents in the cache, as the most recently used.
+
+        Parameters
+        ----------
+        expons : ndarray, (M,)
+            The exponents of Gaussian basis functions.
+        matrix : ndarray, (N, M)
+            The Gaussian functions evaluated on the grid points for each exponent, as returned
+            by `_gaussian_matrix`.
+
+        """
+        if self._cache_size == 0:
+            return
+        for i, key in enumerate(expons.tolist()):
+            if key in self._columns:
+                self._columns.move_to_end(key)
+            else:
+                self._columns[key] = matrix[:, i].copy()
+        while len(self._columns) > self._cache_size:
+            self._columns.popitem(last=False)
+
+    def _set_parent_columns(self, expons, matrix=None):
+        r"""
+        Set the Gaussian columns of a parent basis, reused until they are unset.
+
+        The initial guesses of the greedy algorithms are obtained by inserting exponents into
+        the exponents of a parent basis (see `bfit.greedy.CandidateDelta`). While the columns
+        of the parent basis are set, every evaluation of the model takes the columns of the
+        exponents of the parent basis from `matrix` and only computes the other ones,
+        regardless of the size of the cache. This includes `evaluate_basis`.
+
+        Parameters
+        ----------
+        expons : ndarray, (P,) or None
+            The exponents of the parent basis. If None, the columns are unset.
+        matrix : ndarray, (N, P), optional
+            The Gaussian functions :math:`e^{-\alpha_i r^2}` evaluated on the grid points for
+            each exponent, as returned by `_gaussian_matrix`. If None, they are computed.
+
+        """
+        if expons is None:
+            self._parent_columns = None
+            return
+        if matrix is None:
+            matrix = np.exp(-expons[None, :] * self._radii_sq[:, None])
+        if matrix.shape != (self._radii_sq.size, expons.size):
+            raise ValueError(f"Argument matrix should have shape ({self._radii_sq.size}, "
+                             f"{expons.size}).")
+        self._parent_columns = (np.asarray(expons), matrix)
+
+    def _parent_index(self, expons):
+        r"""Return the index of each exponent in the parent basis, or -1 if it isn't in it."""
+        index = np.full(expons.size, -1)
+        if self._parent_columns is None or self._parent_columns[0].size == 0:
+            return index
+        parent = self._parent_columns[0]
+        order = np.argsort(parent, kind="stable")
+        position = np.minimum(np.searchsorted(parent, expons, sorter=order), parent.size - 1)
+        found = parent[order[position]] == expons
+        index[found] = order[position[found]]
+        return index
+
+    def __getstate__(self):
+        r"""Return the state of the model without its cached columns, for copying & pickling."""
+        state = self.__dict__.copy()
+        state["_columns"] = OrderedDict()
+        return state
+
+    def _normalization(self, expons):
+        r"""
+        Return the normalization constants of Gaussian basis functions & their derivatives.
+
+        The normalization constants are :math:`(\alpha / \pi)^{3/2}` for s-type and
+        :math:`2 \alpha^{5/2} / (3 \pi^{3/2})` for p-type Gaussian functions if the model is
+        normalized, and one otherwise.
+
+        Parameters
+        ----------
+        expons : ndarray, (M,)
+            The exponents of Gaussian basis functions.
+
+        Returns
+        -------
+        norm, d_norm : ndarray, (M,)
+            The normalization constants & their derivatives w.r.t. exponents.
+
+        """
+        if not self.normalized:
+            return np.ones(self.nbasis), np.zeros(self.nbasis)
+        norm = np.concatenate((
+            (expons[:self.ns] / np.pi) ** 1.5,
+            expons[self.ns:]**2.5 / (1.5 * np.pi**1.5)
+        ))
+        d_norm = np.concatenate((
+            1.5 * expons[:self.ns]**0.5 / np.pi**1.5,
+            5 * expons[self.ns:]**1.5 / (3 * np.pi**1.5)
+        ))
+        return norm, d_norm
+
+    @_profiled("model.evaluate_basis")
+    def evaluate_basis(self, expons, out=None, index=None):
+        r"""
+        Evaluate each (normalized) Gaussian basis function on the grid points.
+
+        The linear combination of the basis functions with the coefficients is the model density,
+        and they are the derivatives of the model density w.r.t. the coefficients.
+        The basis functions are evaluated on all grid points (without screening or caching,
+        except for the columns of a parent basis, see `_set_parent_columns`), and are written
+        into `out` without any temporary array of the same size.
+
+        Parameters
+        ----------
+        expons : ndarray, (M,)
+            The exponents of `num_s` s-type Gaussian basis functions followed by the
+            exponents of `num_p` p-type Gaussian basis functions.
+        out : ndarray, (N, M) or (N, K), optional
+            The array where the basis functions are written. If None, a new array is created.
+        index : ndarray, (K,), optional
+            The indices of the basis functions to evaluate. If None, all basis functions are
+            evaluated.
+
+        Returns
+        -------
+        out : ndarray, (N, M) or (N, K)
+            The Gaussian basis functions evaluated on the grid points.
+
+        """
+        if expons.ndim != 1 or expons.size != self.nbasis:
+            raise ValueError(f"Argument expons should be a 1D array of size {self.nbasis}.")
+        expons, = self._cast(expons)
+        norm = self._normalization(expons)[0] if self.normalized else None
+        # columns of p-type functions, which are the last ones unless an index is given
+        p_type = slice(self.ns, None) if self.np != 0 else None
+        if index is not None:
+            index = np.asarray(index, dtype=int)
+            if index.ndim != 1 or np.any(index < 0) or np.any(index >= self.nbasis):
+                raise ValueError(f"Argument index should be 1D array of indices < {self.nbasis}.")
+            p_type = index >= self.ns if np.any(index >= self.ns) else None
+            expons = expons[index]
+            norm = None if norm is None else norm[index]
+        shape = (self._radii_sq.size, expons.size)
+        if out is None:
+            out = np.empty(shape, dtype=np.result_type(self._radii_sq, expons))
+        elif out.shape != shape:
+            raise ValueError(f"Argument out should have shape {shape}.")
+        parent = self._parent_index(expons)
+        if np.any(parent >= 0):
+            # columns of the parent basis are copied, only the other ones are computed
+            found = parent >= 0
+            out[:, found] = self._parent_columns[1][:, parent[found]]
+            out[:, ~found] = np.exp(-expons[~found][None, :] * self._radii_sq[:, None])
+        else:
+            # the (M,) arrays are cast to the type of out, so numpy doesn't cast a broadcast copy
+            np.multiply(self._radii_sq[:, None], (-expons).astype(out.dtype)[None, :], out=out)
+            np.exp(out, out=out)
+        if p_type is not None:
+            out[:, p_type] *= self._radii_sq[:, None]
+        if norm is not None:
+            out *= norm.astype(out.dtype)[None, :]
+        return out
+
+    def moments(self, expons, order=0, deriv=0):
+        r"""
+        Compute the radial moments of each (normalized) Gaussian basis function analytically.
+
+        The moments are :math:`\int |x - c|^k g_i(x) dx` over the whole space of dimension
+        `dim`, see `bfit.integrals.gaussian_moments`. Each moment is a power of the exponent
+        :math:`C_i \alpha_i^{p_i}`, so its derivatives w.r.t. the exponent are known.
+
+        Parameters
+        ----------
+        expons : ndarray, (M,)
+            The exponents of Gaussian basis functions.
+        order : float, optional
+            The order :math:`k` of the moments. Default is zero, i.e. the integrals of the
+            basis functions.
+        deriv : int, optional
+            The number of derivatives of the moments w.r.t. exponents to compute.
+
+        Returns
+        -------
+        ndarray, (M,) or (deriv + 1, M) :
+            The moments of the basis functions, and their derivatives w.r.t. exponents
+            (only if `deriv` is positive).
+
+        """
+        if not isinstance(deriv, Integral) or deriv < 0:
+            raise TypeError(f"Argument deriv {deriv} should be a non-negative integer.")
+        angular = np.array([0] * self.ns + [1] * self.np)
+        moments = gaussian_moments(expons, angular, order, self.dim)
+        power = -(angular + (order + self.dim) / 2.)
+        if self.normalized:
+            moments *= self._normalization(expons)[0]
+            power += self.prefactor
+        if deriv == 0:
+            return moments
+        result = [moments]
+        for i in range(deriv):
+            result.append(result[-1] * (power - i) / expons)
+        return np.array(result)
+
+    def integral(self, coeffs, expons):
+        r"""
+        Compute the integral of the model density analytically.
+
+        Parameters
+        ----------
+        coeffs : ndarray, (M,)
+            The coefficients of Gaussian basis functions.
+        expons : ndarray, (M,)
+            The exponents of Gaussian basis functions.
+
+        Returns
+        -------
+        float :
+            The integral :math:`\int f(x) dx` over the whole space of dimension `dim`.
+
+        """
+        return np.dot(coeffs, self.moments(expons))
+
+    def overlaps(self, expons):
+        r"""
+        Compute the overlaps of each pair of (normalized) Gaussian basis functions analytically.
+
+        Parameters
+        ----------
+        expons : ndarray, (M,)
+            The exponents of Gaussian basis functions.
+
+        Returns
+        -------
+        ndarray, (M, M) :
+            The overlaps :math:`\int g_i(x) g_j(x) dx` over the whole space of dimension `dim`.
+
+        """
+        angular = np.array([0] * self.ns + [1] * self.np)
+        overlaps = gaussian_overlaps(expons, angular, expons, angular, dim=self.dim)
+        if self.normalized:
+            norm, _ = self._normalization(expons)
+            overlaps *= norm[:, None] * norm[None, :]
+        return overlaps
+
+    @property
+    def screen_tol(self):
+        r"""Return the tolerance for screening the Gaussian basis functions, or None."""
+        return self._screen_tol
+
+    def screened_points(self, expons):
+        r"""
+        Return the indices of grid points on which the screened Gaussian basis is evaluated.
+
+        These are the grid points inside the largest cutoff radius :math:`r_i`, for which the
+        (normalized) Gaussian basis function is equal to `screen_tol`, i.e.
+        :math:`n_i r_i^{2l} e^{-\alpha_i r_i^2} = \text{screen_tol}` with :math:`l=0` for s-type
+        and :math:`l=1` for p-type Gaussian functions. Each basis function is only evaluated on
+        the first points of these, i.e. the ones inside its own cutoff radius (see
+        `_screened_counts`).
+
+        Parameters
+        ----------
+        expons : ndarray, (M,)
+            The exponents of Gaussian basis functions.
+
+        Returns
+        -------
+        ndarray :
+            The indices of grid points sorted by their distance from the center. If screening
+            isn't used, all grid points are returned.
+
+        """
+        if self._screen_tol is None:
+            return np.arange(self._radii_sq.size)
+        return self._order[:np.max(self._screened_counts(expons), initial=0)]
+
+    def _screened_counts(self, expons):
+        r"""
+        Return the number of grid points inside the cutoff radius of each basis function.
+
+        The grid points inside the cutoff radius of the :math:`i`-th basis function (see
+        `screened_points`) are the first `counts[i]` points of the grid points sorted by their
+        distance from the center.
+
+        Parameters
+        ----------
+        expons : ndarray, (M,)
+            The exponents of Gaussian basis functions.
+
+        Returns
+        -------
+        counts : ndarray, (M,)
+            The number of grid points inside the cutoff radius of each basis function.
+
+        """
+        # logarithm of the normalization constant over the tolerance
+        norm, _ = self._normalization(expons)
+        log_ratio = np.log(norm / self._screen_tol)
+        # solve a t = log_ratio + l * log(t) for squared cutoff radius t, by fixed point
+        # iteration which converges quickly (and from below) since a t is large.
+        cutoff = np.maximum(log_ratio, 0.) / expons
+        power = np.array([0] * self.ns + [1] * self.np)
+        if self.np != 0:
+            for _ in range(10):
+                cutoff = np.maximum(log_ratio + power * np.log(np.maximum(cutoff, 1.)), 0.)
+                cutoff /= expons
+        return np.searchsorted(self._sorted_radii_sq, cutoff, side="right")
+
+    def _evaluate_screened(self, coeffs, expons, deriv):
+        r"""
+        Compute the screened Gaussian basis & its derivatives on the screened points.
+
+        Each basis function (and its derivatives) is only evaluated on the grid points inside
+        its own cutoff radius, which are a prefix of the screened points, and is zero on the
+        other points.
+
+        Returns
+        -------
+        indices : ndarray, (K,)
+            The indices of the screened points, see `screened_points`.
+        g : ndarray, (K,)
+            The linear combination of Gaussian basis functions on the screened points.
+        dg : ndarray, (K, 2 * `nbasis`)
+            The derivative of the linear combination w.r.t. coefficients & exponents on the
+            screened points. Only returned if `deriv=True`.
+
+        """
+        counts = self._screened_counts(expons)
+        size = np.max(counts, initial=0)
+        radii_sq = self._sorted_radii_sq[:size]
+        norm, d_norm = self._normalization(expons)
+        norm, d_norm = norm.astype(radii_sq.dtype), d_norm.astype(radii_sq.dtype)
+        g = np.zeros(size, dtype=np.result_type(radii_sq, coeffs))
+        if deriv:
+            dg = np.zeros((size, 2 * self.nbasis), dtype=self._deriv_dtype)
+        for i, count in enumerate(counts):
+            # r**(2l) exp(-a r**2) on the points inside the cutoff radius of the function
+            column = np.exp(-expons[i] * radii_sq[:count])
+            if i >= self.ns:
+                column *= radii_sq[:count]
+            g[:count] += coeffs[i] * norm[i] * column
+            if deriv:
+                dg[:count, i] = norm[i] * column
+                dg[:count, self.nbasis + i] = coeffs[i] * column * (
+                    d_norm[i] - norm[i] * radii_sq[:count]
+                )
+        indices = self._order[:size]
+        if deriv:
+            return indices, g, dg
+        return indices, g
+
+    @_profiled("model.evaluate", deriv=2)
     def evaluate(self, coeffs, expons, deriv=False):
         r"""
         Compute linear combination of Gaussian basis & its derivatives on the grid points.
@@ -193,21 +689,49 @@ class AtomicGaussianDensity:
             raise ValueError("Arguments coeffs and expons should have the same length.")
         if coeffs.size != self.nbasis:
             raise ValueError(f"Argument coeffs should have size {self.nbasis}.")
+        coeffs, expons = self._cast(coeffs, expons)
+
+        if self._screen_tol is not None:
+            # evaluate on the screened points only, the other points are zero
+            indices, *output = self._evaluate_screened(coeffs, expons, deriv)
+            g = np.zeros(self._radii_sq.size, dtype=np.result_type(self._radii_sq, coeffs))
+            g[indices] = output[0]
+            if deriv:
+                dg = np.zeros((self._radii_sq.size, 2 * self.nbasis), dtype=self._deriv_dtype)
+                dg[indices] = output[1]
+                return g, dg
+            return g
+        return self._evaluate_points(coeffs, expons, deriv)
 
+    def _evaluate_points(self, coeffs, expons, deriv, radii_sq=None):
+        r"""
+        Compute Gaussian basis & its derivatives on points with squared radii `radii_sq`.
+
+        If `radii_sq` is None, the Gaussian basis is evaluated on all grid points using the
+        cached Gaussian columns.
+        """
         # evaluate all Gaussian basis on the grid, i.e., exp(-a * r**2)
-        matrix = np.exp(-expons[None, :] * np.power(self.radii, 2)[:, None])
+        if radii_sq is None:
+            radii_sq = self._radii_sq
+            matrix = self._gaussian_matrix(expons)
+        else:
+            matrix = np.exp(-expons[None, :] * radii_sq[:, None])
 
         # compute linear combination of Gaussian basis
         if self.np == 0:
             # only s-type Gaussian basis functions
-            return self._eval_s(matrix, coeffs, expons, deriv)
+            return self._eval_s(matrix, coeffs, expons, deriv, radii_sq)
         elif self.ns == 0:
             # only p-type Gaussian basis functions
-            return self._eval_p(matrix, coeffs, expons, deriv)
+            return self._eval_p(matrix, coeffs, expons, deriv, radii_sq)
         else:
             # both s-type & p-type Gaussian basis functions
-            gs = self._eval_s(matrix[:, :self.ns], coeffs[:self.ns], expons[:self.ns], deriv)
-            gp = self._eval_p(matrix[:, self.ns:], coeffs[self.ns:], expons[self.ns:], deriv)
+            gs = self._eval_s(
+                matrix[:, :self.ns], coeffs[:self.ns], expons[:self.ns], deriv, radii_sq
+            )
+            gp = self._eval_p(
+                matrix[:, self.ns:], coeffs[self.ns:], expons[self.ns:], deriv, radii_sq
+            )
             if deriv:
                 # split derivatives w.r.t. coeffs & expons
                 d_coeffs = np.concatenate((gs[1][:, :self.ns], gp[1][:, :self.np]), axis=1)
@@ -215,7 +739,147 @@ class AtomicGaussianDensity:
                 return gs[0] + gp[0], np.concatenate((d_coeffs, d_expons), axis=1)
             return gs + gp
 
-    def _eval_s(self, matrix, coeffs, expons, deriv):
+    @_profiled("model.vjp")
+    def vjp(self, coeffs, expons, vector, chunk_size=10000):
+        r"""
+        Compute the vector-Jacobian product of the Gaussian basis w.r.t. coefficients & exponents.
+
+        This is :math:`\sum_k v_k \frac{\partial f(x_k)}{\partial \theta_j}` for each coefficient
+        and exponent :math:`\theta_j`, i.e. the product `dg.T @ vector` of the derivative `dg`
+        returned by `evaluate`, without computing the :math:`(N, 2M)` array `dg`.
+        The Gaussian basis is evaluated on chunks of `chunk_size` grid points, so only an array
+        of shape (`chunk_size`, M) is stored at a time. The cached Gaussian columns are not used.
+
+        Parameters
+        ----------
+        coeffs : ndarray(`nbasis`,)
+            The coefficients of `num_s` s-type Gaussian basis functions followed by the
+            coefficients of `num_p` p-type Gaussian basis functions.
+        expons : ndarray(`nbasis`,)
+            The exponents of `num_s` s-type Gaussian basis functions followed by the
+            exponents of `num_p` p-type Gaussian basis functions.
+        vector : ndarray(N,)
+            The vector :math:`v` evaluated on the grid points, e.g., the integration weights
+            times the derivative of the measure.
+        chunk_size : int, optional
+            The number of grid points on which the Gaussian basis is evaluated at a time.
+
+        Returns
+        -------
+        ndarray(2 * `nbasis`,) :
+            The vector-Jacobian product w.r.t. coefficients & exponents, respectively.
+
+        """
+        if coeffs.ndim != 1 or expons.ndim != 1:
+            raise ValueError("Arguments coeffs and expons should be 1D arrays.")
+        if coeffs.size != expons.size:
+            raise ValueError("Arguments coeffs and expons should have the same length.")
+        if coeffs.size != self.nbasis:
+            raise ValueError(f"Argument coeffs should have size {self.nbasis}.")
+        if vector.shape != self._radii_sq.shape:
+            raise ValueError(f"Argument vector should have shape {self._radii_sq.shape}.")
+        if not isinstance(chunk_size, int) or chunk_size <= 0:
+            raise TypeError("Argument chunk_size should be a positive integer.")
+        coeffs, expons, vector = self._cast(coeffs, expons, vector)
+
+        # compute products[k, i] = sum_j exp(-a_i * r_j**2) * r_j**(2k) * v_j for k = 0, 1, 2
+        products = np.zeros((3, self.nbasis), dtype=np.result_type(self._radii_sq, vector))
+        if self._screen_tol is not None:
+            # each basis function is only evaluated on the (sorted) points inside its cutoff
+            counts = self._screened_counts(expons)
+            radii_sq = self._sorted_radii_sq[:np.max(counts, initial=0)]
+            vector = vector[self._order[:radii_sq.size]]
+            for i, count in enumerate(counts):
+                column = np.exp(-expons[i] * radii_sq[:count])
+                weights = vector[:count]
+                products[0, i] = np.dot(weights, column)
+                weights = weights * radii_sq[:count]
+                products[1, i] = np.dot(weights, column)
+                products[2, i] = np.dot(weights * radii_sq[:count], column)
+        else:
+            for start in range(0, self._radii_sq.size, chunk_size):
+                radii_sq = self._radii_sq[start: start + chunk_size]
+                matrix = np.exp(-expons[None, :] * radii_sq[:, None])
+                weights = vector[start: start + chunk_size]
+                products[0] += np.dot(weights, matrix)
+                weights = weights * radii_sq
+                products[1] += np.dot(weights, matrix)
+                products[2] += np.dot(weights * radii_sq, matrix)
+
+        # s-type basis is exp(-a r**2) and p-type basis is r**2 exp(-a r**2) times the
+        # normalization constant n(a), so their derivatives w.r.t. exponents are
+        # c (n'(a) r**(2l) - n(a) r**(2l + 2)) exp(-a r**2) with l=0 (s-type) or l=1 (p-type)
+        power = np.array([0] * self.ns + [1] * self.np)
+        index = np.arange(self.nbasis)
+        norm, d_norm = self._normalization(expons)
+        result = np.zeros(2 * self.nbasis)
+        result[:self.nbasis] = norm * products[power, index]
+        result[self.nbasis:] = coeffs * (
+            d_norm * products[power, index] - norm * products[power + 1, index]
+        )
+        return result
+
+    def second_derivative(self, coeffs, expons):
+        r"""
+        Compute the second derivatives of the Gaussian basis w.r.t. coefficients & exponents.
+
+        The second derivatives are block-diagonal, i.e. each basis function only depends on its
+        coefficient & exponent, and the second derivative w.r.t. two coefficients is zero.
+        The only non-zero second derivatives of :math:`f(x) = \sum_i c_i b_i(x, \alpha_i)` are
+
+        .. math::
+            \frac{\partial^2 f}{\partial c_i \partial \alpha_i} =
+            \frac{\partial b_i}{\partial \alpha_i} \quad \text{and} \quad
+            \frac{\partial^2 f}{\partial \alpha_i^2} = c_i \frac{\partial^2 b_i}
+            {\partial \alpha_i^2}.
+
+        The second derivatives are evaluated on all grid points (without screening or caching).
+
+        Parameters
+        ----------
+        coeffs : ndarray(`nbasis`,)
+            The coefficients of `num_s` s-type Gaussian basis functions followed by the
+            coefficients of `num_p` p-type Gaussian basis functions.
+        expons : ndarray(`nbasis`,)
+            The exponents of `num_s` s-type Gaussian basis functions followed by the
+            exponents of `num_p` p-type Gaussian basis functions.
+
+        Returns
+        -------
+        d2g_ce : ndarray, (N, `nbasis`)
+            The second derivative w.r.t. the coefficient & exponent of each basis function.
+        d2g_ee : ndarray, (N, `nbasis`)
+            The second derivative w.r.t. the exponent of each basis function.
+
+        """
+        if coeffs.ndim != 1 or expons.ndim != 1:
+            raise ValueError("Arguments coeffs and expons should be 1D arrays.")
+        if coeffs.size != expons.size:
+            raise ValueError("Arguments coeffs and expons should have the same length.")
+        if coeffs.size != self.nbasis:
+            raise ValueError(f"Argument coeffs should have size {self.nbasis}.")
+        coeffs, expons = self._cast(coeffs, expons)
+        norm, d_norm = self._normalization(expons)
+        if self.normalized:
+            d2_norm = np.concatenate((
+                0.75 * expons[:self.ns]**-0.5 / np.pi**1.5,
+                2.5 * expons[self.ns:]**0.5 / np.pi**1.5
+            ))
+        else:
+            d2_norm = np.zeros(self.nbasis)
+        # basis is n(a) r**(2l) exp(-a r**2), so its derivatives w.r.t. exponent are
+        # (n'(a) - n(a) r**2) r**(2l) exp(-a r**2) & (n''(a) - 2 n'(a) r**2 + n(a) r**4) ...
+        radii_sq = self._radii_sq[:, None]
+        matrix = np.exp(-expons[None, :] * radii_sq)
+        if self.np != 0:
+            matrix[:, self.ns:] *= radii_sq
+        d2g_ce = matrix * (d_norm[None, :] - norm[None, :] * radii_sq)
+        d2g_ee = matrix * (d2_norm[None, :] - 2 * d_norm[None, :] * radii_sq +
+                           norm[None, :] * radii_sq**2)
+        d2g_ee *= coeffs[None, :]
+        return d2g_ce, d2g_ee
+
+    def _eval_s(self, matrix, coeffs, expons, deriv, radii_sq):
         r"""
         Compute linear combination of s-type Gaussian basis & its derivative on the grid points.
 
@@ -230,6 +894,8 @@ class AtomicGaussianDensity:
         deriv : bool, optional
             Whether to compute derivative of Gaussian basis functions w.r.t. coefficients &
             exponents.
+        radii_sq : ndarray, (N,)
+            The squared distance of the points from the center.
 
         Returns
         -------
@@ -242,25 +908,25 @@ class AtomicGaussianDensity:
 
         """
         # normalize Gaussian basis
+        basis = matrix
         if self.normalized:
-            matrix = matrix * (expons[None, :] / np.pi) ** 1.5
+            basis = matrix * (expons[None, :] / np.pi) ** 1.5
         # make linear combination of Gaussian basis on the grid
-        g = np.dot(matrix, coeffs)
+        g = np.dot(basis, coeffs)
 
         # compute derivatives
         if deriv:
-            dg = np.zeros((len(self.radii), 2 * coeffs.size))
+            dg = np.zeros((len(radii_sq), 2 * coeffs.size), dtype=self._deriv_dtype)
             # derivative w.r.t. coefficients
-            dg[:, :coeffs.size] = matrix
+            dg[:, :coeffs.size] = basis
             # derivative w.r.t. exponents
-            dg[:, coeffs.size:] = - matrix * np.power(self.radii, 2)[:, None] * coeffs[None, :]
+            dg[:, coeffs.size:] = - basis * radii_sq[:, None] * coeffs[None, :]
             if self.normalized:
-                matrix = np.exp(-expons[None, :] * np.power(self.radii, 2)[:, None])
                 dg[:, coeffs.size:] += 1.5 * matrix * (coeffs * expons**0.5)[None, :] / np.pi**1.5
             return g, dg
         return g
 
-    def _eval_p(self, matrix, coeffs, expons, deriv):
+    def _eval_p(self, matrix, coeffs, expons, deriv, radii_sq):
         """Compute linear combination of p-type Gaussian basis & its derivative on the grid points.
 
         Parameters
@@ -274,6 +940,8 @@ class AtomicGaussianDensity:
         deriv : bool, optional
             Whether to compute derivative of Gaussian basis functions w.r.t. coefficients &
             exponents.
+        radii_sq : ndarray, (N,)
+            The squared distance of the points from the center.
 
         Returns
         -------
@@ -286,24 +954,22 @@ class AtomicGaussianDensity:
 
         """
         # multiply r**2 with the evaluated Gaussian basis, i.e., r**2 * exp(-a * r**2)
-        matrix = matrix * np.power(self.radii, 2)[:, None]
+        matrix = matrix * radii_sq[:, None]
 
         if not self.normalized:
             # linear combination of p-basis is the same as s-basis with an extra r**2
-            return self._eval_s(matrix, coeffs, expons, deriv)
+            return self._eval_s(matrix, coeffs, expons, deriv, radii_sq)
 
         # normalize Gaussian basis
-        matrix = matrix * (expons[None, :]**2.5 / np.pi**1.5) / 1.5
+        basis = matrix * (expons[None, :]**2.5 / np.pi**1.5) / 1.5
         # make linear combination of Gaussian basis on the grid
-        g = np.dot(matrix, coeffs)
+        g = np.dot(basis, coeffs)
         if deriv:
-            dg = np.zeros((len(self.radii), 2 * coeffs.size))
+            dg = np.zeros((len(radii_sq), 2 * coeffs.size), dtype=self._deriv_dtype)
             # derivative w.r.t. coefficients
-            dg[:, :coeffs.size] = matrix
+            dg[:, :coeffs.size] = basis
             # derivative w.r.t. exponents
-            dg[:, coeffs.size:] = - matrix * np.power(self.radii, 2)[:, None] * coeffs[None, :]
-            matrix = np.exp(-expons[None, :] * np.power(self.radii, 2)[:, None])
-            matrix = matrix * np.power(self.radii, 2)[:, None]
+            dg[:, coeffs.size:] = - basis * radii_sq[:, None] * coeffs[None, :]
             dg[:, coeffs.size:] += 5 * matrix * (coeffs * expons**1.5)[None, :] / (3 * np.pi**1.5)
             return g, dg
         return g
@@ -329,7 +995,11 @@ class MolecularGaussianDensity:
     :math:`x` is the real coordinates of the point. It can be of any dimension.
     """
 
-    def __init__(self, points, coords, basis, normalize=False):
+    # profile of the evaluations, only enabled by the runs of the fitting algorithms
+    _profile = None
+
+    def __init__(self, points, coords, basis, normalize=False, cache_size=0, screen_tol=None,
+                 precision=None):
         """
         Construct the MolecularGaussianDensity class.
 
@@ -343,6 +1013,15 @@ class MolecularGaussianDensity:
             The number of S-type & P-type Gaussian basis functions placed on each center.
         normalize : bool, optional
             Whether to normalize Gaussian basis functions.
+        cache_size : int, optional
+            Maximum number of Gaussian columns cached by each center. See `AtomicGaussianDensity`.
+        screen_tol : float, optional
+            If provided, the Gaussian basis functions of each center are only evaluated on the
+            grid points close enough to that center for their values to be larger than this
+            tolerance, so the cost grows with the number of grid points near each center rather
+            than the total number of grid points. See `AtomicGaussianDensity`.
+        precision : Precision, optional
+            The precision policy of every center. See `AtomicGaussianDensity`.
 
         """
         # check arguments
@@ -362,7 +1041,11 @@ class MolecularGaussianDensity:
         self._radii = []
         for i, b in enumerate(basis):
             # get the center of Gaussian basis functions
-            self.center.append(AtomicGaussianDensity(points, coords[i], b[0], b[1], normalize))
+            self.center.append(
+                AtomicGaussianDensity(
+                    points, coords[i], b[0], b[1], normalize, cache_size, screen_tol, precision
+                )
+            )
             self._radii.append(self.center[-1].radii)
         self._radii = np.array(self._radii)
 
@@ -386,6 +1069,11 @@ class MolecularGaussianDensity:
         """Get number of basis functions centers."""
         return len(self._basis)
 
+    @property
+    def dim(self):
+        """Get the dimension of the space of the analytic integrals."""
+        return self.center[0].dim
+
     @property
     def prefactor(self):
         """
@@ -400,23 +1088,41 @@ class MolecularGaussianDensity:
 
         Parameters
         ----------
-        index : int
-            The index of Gaussian basis function.
+        index : int or ndarray of int
+            The index (or indices) of Gaussian basis function.
 
         Returns
         -------
-        index : int
-            The index of atomic center.
+        index : int or ndarray of int
+            The index (or indices) of atomic center.
 
         """
-        if index >= self.nbasis:
+        if np.any(np.asarray(index) >= self.nbasis):
             raise ValueError(f"The {index} is invalid for {self.nbasis} basis.")
         # compute the number of basis on each center
         nbasis = np.sum(self._basis, axis=1)
         # get the center to which the basis function belongs
-        index = np.where(np.cumsum(nbasis) >= index + 1)[0][0]
+        index = np.searchsorted(np.cumsum(nbasis), index, side="right")
         return index
 
+    def clear_cache(self):
+        r"""Remove all the cached Gaussian columns of every center."""
+        for center in self.center:
+            center.clear_cache()
+
+    @contextmanager
+    def _cache_columns(self, cache_size):
+        r"""
+        Return a context in which every center caches at least `cache_size` Gaussian columns.
+
+        See `AtomicGaussianDensity._cache_columns`.
+        """
+        with ExitStack() as stack:
+            for center in self.center:
+                stack.enter_context(center._cache_columns(cache_size))
+            yield self
+
+    @_profiled("model.evaluate", deriv=2)
     def evaluate(self, coeffs, expons, deriv=False):
         r"""
         Compute linear combination of Gaussian basis & its derivatives on the grid points.
@@ -464,29 +1170,267 @@ class MolecularGaussianDensity:
             raise ValueError(f"Arguments coeffs & expons shape != ({self.nbasis},)")
 
         # assign arrays
-        total_g = np.zeros(len(self.points))
+        dtype = self.center[0]._deriv_dtype
+        total_g = np.zeros(len(self.points), dtype=dtype)
         if deriv:
-            total_dg = np.zeros((len(self.points), 2 * self.nbasis))
+            total_dg = np.zeros((len(self.points), 2 * self.nbasis), dtype=dtype)
         # compute contribution of each center
         count = 0
         for center in self.center:
             # get coeffs & expons of center
             cs = coeffs[count: count + center.nbasis]
             es = expons[count: count + center.nbasis]
+            # points where the Gaussian basis of center are evaluated (all points if not screened)
+            if center.screen_tol is not None:
+                points, *output = center._evaluate_screened(cs, es, deriv)
+                output = output if deriv else output[0]
+            else:
+                points = slice(None)
+                output = center.evaluate(cs, es, deriv)
             if deriv:
                 # compute linear combination of gaussian placed on center & its derivatives
-                g, dg = center.evaluate(cs, es, deriv)
+                g, dg = output
                 # split derivatives w.r.t. coeffs & expons
                 dg_c = dg[:, :center.nbasis]
                 dg_e = dg[:, center.nbasis:]
                 # add contributions to the total array
-                total_g += g
-                total_dg[:, count: count + center.nbasis] = dg_c
-                total_dg[:, self.nbasis + count: self.nbasis + count + center.nbasis] = dg_e
+                total_g[points] += g
+                total_dg[points, count: count + center.nbasis] = dg_c
+                total_dg[points, self.nbasis + count: self.nbasis + count + center.nbasis] = dg_e
             else:
                 # compute linear combination of gaussian placed on center
-                total_g += center.evaluate(cs, es, deriv)
+                total_g[points] += output
             count += center.nbasis
         if deriv:
             return total_g, total_dg
         return total_g
+
+    @_profiled("model.evaluate_basis")
+    def evaluate_basis(self, expons, out=None, index=None):
+        r"""
+        Evaluate each (normalized) Gaussian basis function of every center on the grid points.
+
+        See `AtomicGaussianDensity.evaluate_basis` for more information.
+
+        Parameters
+        ----------
+        expons : ndarray, (`nbasis`,)
+            The exponents of `num_s` s-type Gaussian basis functions followed by the
+            exponents of `num_p` p-type Gaussian basis functions for an atom, then repeat
+            for the next atom.
+        out : ndarray, (N, `nbasis`) or (N, K), optional
+            The array where the basis functions are written. If None, a new array is created.
+        index : ndarray, (K,), optional
+            The indices of the basis functions to evaluate. If None, all basis functions are
+            evaluated.
+
+        Returns
+        -------
+        out : ndarray, (N, `nbasis`) or (N, K)
+            The Gaussian basis functions evaluated on the grid points.
+
+        """
+        if expons.ndim != 1 or expons.size != self.nbasis:
+            raise ValueError(f"Arguments expons shape != ({self.nbasis},)")
+        if index is not None:
+            index = np.asarray(index, dtype=int)
+            if index.ndim != 1 or np.any(index < 0) or np.any(index >= self.nbasis):
+                raise ValueError(f"Argument index should be 1D array of indices < {self.nbasis}.")
+        shape = (len(self.points), self.nbasis if index is None else index.size)
+        if out is None:
+            out = np.empty(shape, dtype=np.result_type(self._radii, *self.center[0]._cast(expons)))
+        elif out.shape != shape:
+            raise ValueError(f"Argument out should have shape {shape}.")
+        count = 0
+        for center in self.center:
+            i, j = count, count + center.nbasis
+            if index is None:
+                center.evaluate_basis(expons[i:j], out=out[:, i:j])
+            else:
+                # columns of out of the selected basis functions of this center
+                columns = np.nonzero((index >= i) & (index < j))[0]
+                if columns.size != 0:
+                    out[:, columns] = center.evaluate_basis(expons[i:j], index=index[columns] - i)
+            count = j
+        return out
+
+    def moments(self, expons, order=0, deriv=0):
+        r"""
+        Compute the radial moments of each Gaussian basis function about its own center.
+
+        See `AtomicGaussianDensity.moments` for more information.
+
+        Parameters
+        ----------
+        expons : ndarray, (`nbasis`,)
+            The exponents of `num_s` s-type Gaussian basis functions followed by the
+            exponents of `num_p` p-type Gaussian basis functions for an atom, then repeat
+            for the next atom.
+        order : float, optional
+            The order of the moments. Default is zero, i.e. the integrals of the basis functions.
+        deriv : int, optional
+            The number of derivatives of the moments w.r.t. exponents to compute.
+
+        Returns
+        -------
+        ndarray, (`nbasis`,) or (deriv + 1, `nbasis`) :
+            The moments of the basis functions, and their derivatives w.r.t. exponents
+            (only if `deriv` is positive).
+
+        """
+        if expons.shape != (self.nbasis,):
+            raise ValueError(f"Arguments expons shape != ({self.nbasis},)")
+        bounds = np.cumsum([center.nbasis for center in self.center])[:-1]
+        return np.concatenate(
+            [center.moments(e, order, deriv) for center, e in zip(self.center,
+                                                                np.split(expons, bounds))],
+            axis=-1
+        )
+
+    def integral(self, coeffs, expons):
+        r"""
+        Compute the integral of the molecular model density analytically.
+
+        Parameters
+        ----------
+        coeffs : ndarray, (`nbasis`,)
+            The coefficients of Gaussian basis functions of every center.
+        expons : ndarray, (`nbasis`,)
+            The exponents of Gaussian basis functions of every center.
+
+        Returns
+        -------
+        float :
+            The integral :math:`\int f(x) dx` over the whole space of dimension `dim`.
+
+        """
+        return np.dot(coeffs, self.moments(expons))
+
+    def overlaps(self, expons):
+        r"""
+        Compute the overlaps of each pair of Gaussian basis functions analytically.
+
+        The overlaps of basis functions on different centers depend on the distance between
+        the centers, see `bfit.integrals.gaussian_overlaps`.
+
+        Parameters
+        ----------
+        expons : ndarray, (`nbasis`,)
+            The exponents of Gaussian basis functions of every center.
+
+        Returns
+        -------
+        ndarray, (`nbasis`, `nbasis`) :
+            The overlaps :math:`\int g_i(x) g_j(x) dx` over the whole space of dimension `dim`.
+
+        """
+        if expons.shape != (self.nbasis,):
+            raise ValueError(f"Arguments expons shape != ({self.nbasis},)")
+        bounds = np.cumsum([center.nbasis for center in self.center])[:-1]
+        blocks = []
+        for center, e in zip(self.center, np.split(expons, bounds)):
+            angular = np.array([0] * center.num_s + [1] * center.num_p)
+            # normalization constants are one if the basis functions aren't normalized
+            blocks.append((center, e, angular, center._normalization(e)[0]))
+        overlaps = np.zeros((self.nbasis, self.nbasis), dtype=np.result_type(expons, float))
+        start1 = 0
+        for center1, e1, angular1, norm1 in blocks:
+            start2 = 0
+            end1 = start1 + center1.nbasis
+            for center2, e2, angular2, norm2 in blocks:
+                end2 = start2 + center2.nbasis
+                dist_sq = np.sum((center1.coord - center2.coord)**2)
+                block = gaussian_overlaps(e1, angular1, e2, angular2, dist_sq, self.dim)
+                overlaps[start1:end1, start2:end2] = block * norm1[:, None] * norm2[None, :]
+                start2 = end2
+            start1 = end1
+        return overlaps
+
+    def second_derivative(self, coeffs, expons):
+        r"""
+        Compute the second derivatives of the Gaussian basis w.r.t. coefficients & exponents.
+
+        See `AtomicGaussianDensity.second_derivative` for more information.
+
+        Parameters
+        ----------
+        coeffs : ndarray(`nbasis`,)
+            The coefficients of `num_s` s-type Gaussian basis functions followed by the
+            coefficients of `num_p` p-type Gaussian basis functions for an atom, then repeat
+            for the next atom.
+        expons : ndarray(`nbasis`,)
+            The exponents of `num_s` s-type Gaussian basis functions followed by the
+            exponents of `num_p` p-type Gaussian basis functions for an atom, then repeat
+            for the next atom.
+
+        Returns
+        -------
+        d2g_ce : ndarray, (N, `nbasis`)
+            The second derivative w.r.t. the coefficient & exponent of each basis function.
+        d2g_ee : ndarray, (N, `nbasis`)
+            The second derivative w.r.t. the exponent of each basis function.
+
+        """
+        if coeffs.ndim != 1 or expons.ndim != 1:
+            raise ValueError("Arguments coeffs and expons should be 1D arrays.")
+        if coeffs.shape != (self.nbasis,):
+            raise ValueError(f"Arguments coeffs shape != ({self.nbasis},)")
+        if expons.shape != (self.nbasis,):
+            raise ValueError(f"Arguments expons shape != ({self.nbasis},)")
+        d2g_ce = np.zeros((len(self.points), self.nbasis))
+        d2g_ee = np.zeros((len(self.points), self.nbasis))
+        count = 0
+        for center in self.center:
+            i, j = count, count + center.nbasis
+            d2g_ce[:, i:j], d2g_ee[:, i:j] = center.second_derivative(coeffs[i:j], expons[i:j])
+            count += center.nbasis
+        return d2g_ce, d2g_ee
+
+    @_profiled("model.vjp")
+    def vjp(self, coeffs, expons, vector, chunk_size=10000):
+        r"""
+        Compute the vector-Jacobian product of the Gaussian basis w.r.t. coefficients & exponents.
+
+        This is the product `dg.T @ vector` of the derivative `dg` returned by `evaluate`,
+        computed center by center without storing the :math:`(N, 2M)` array `dg`.
+        See `AtomicGaussianDensity.vjp` for more information.
+
+        Parameters
+        ----------
+        coeffs : ndarray, (`nbasis`,)
+            The coefficients of `num_s` s-type Gaussian basis functions followed by the
+            coefficients of `num_p` p-type Gaussian basis functions for an atom, then repeat
+            for the next atom.
+        expons : ndarray, (`nbasis`,)
+            The exponents of `num_s` s-type Gaussian basis functions followed by the
+            exponents of `num_p` p-type Gaussian basis functions for an atom, then repeat
+            for the next atom.
+        vector : ndarray(N,)
+            The vector :math:`v` evaluated on the grid points.
+        chunk_size : int, optional
+            The number of grid points on which the Gaussian basis is evaluated at a time.
+
+        Returns
+        -------
+        ndarray(2 * `nbasis`,) :
+            The vector-Jacobian product w.r.t. coefficients & exponents, respectively.
+
+        """
+        if coeffs.ndim != 1 or expons.ndim != 1:
+            raise ValueError("Arguments coeffs & expons should be 1D arrays.")
+        if coeffs.size != self.nbasis or expons.size != self.nbasis:
+            raise ValueError(f"Arguments coeffs & expons shape != ({self.nbasis},)")
+
+        result = np.zeros(2 * self.nbasis)
+        count = 0
+        for center in self.center:
+            # get coeffs & expons of center
+            cs = coeffs[count: count + center.nbasis]
+            es = expons[count: count + center.nbasis]
+            product = center.vjp(cs, es, vector, chunk_size)
+            # split products w.r.t. coeffs & expons
+            result[count: count + center.nbasis] = product[:center.nbasis]
+            result[self.nbasis + count: self.nbasis + count + center.nbasis] = \
+                product[center.nbasis:]
+            count += center.nbasis
+        return result
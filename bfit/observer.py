@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+# BFit is a Python library for fitting a convex sum of Gaussian
+# functions to any probability distribution
+#
+# Copyright (C) 2020- The QC-Devs Community
+#
+# This file is part of BFit.
+#
+# BFit is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# BFit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+# ---
+r"""Observers receiving a record of each iteration of the fitting algorithms."""
+
+from abc import ABC, abstractmethod
+from collections import deque
+import json
+import os
+
+import numpy as np
+
+__all__ = ["Observer", "NullObserver", "RingBufferObserver", "JSONLinesObserver"]
+
+
+class Observer(ABC):
+    r"""
+    Abstract base class for the observers of the fitting algorithms.
+
+    The `run` methods of `KLDivergenceFPI`, `ScipyFit` and `GreedyStrategy` accept an `observer`
+    whose `update` method is called with a record (dictionary) after each iteration, instead of
+    printing it. Every record has the keys:
+
+    "algorithm" : str
+        The name of the class of the fitting algorithm.
+    "iteration" : int
+        The number of iterations done so far.
+    "time" : float
+        The time in seconds since the start of the run.
+    "fun" : float or None
+        The latest computed value of the objective function, or None if not computed yet.
+    "nevals" : int
+        The number of model density evaluations since the start of the run.
+
+    and the additional keys documented by each algorithm. The values are Python scalars (or
+    lists of them), so the records can be serialized as they are. An observer can be used for
+    several runs; it is never closed by the fitting algorithms.
+
+    """
+
+    @abstractmethod
+    def update(self, record):
+        r"""
+        Receive the record of an iteration.
+
+        Parameters
+        ----------
+        record : dict
+            The record of the iteration, see `Observer`.
+
+        """
+        raise NotImplementedError("Update function should be implemented.")
+
+    def close(self):
+        r"""Release the resources held by the observer."""
+
+    def __enter__(self):
+        r"""Return the observer, which is closed when leaving the context."""
+        return self
+
+    def __exit__(self, *exc_info):
+        r"""Close the observer."""
+        self.close()
+
+
+class NullObserver(Observer):
+    r"""Observer discarding all the records."""
+
+    def update(self, record):
+        r"""Discard the record of an iteration."""
+
+
+class RingBufferObserver(Observer):
+    r"""Observer keeping the records of the last iterations in memory."""
+
+    def __init__(self, maxlen=1000):
+        r"""
+        Construct the RingBufferObserver class.
+
+        Parameters
+        ----------
+        maxlen : int or None, optional
+            The maximum number of records kept; once reached, the oldest record is dropped
+            whenever a new one is received. If None, all the records are kept.
+
+        """
+        if maxlen is not None and (not isinstance(maxlen, (int, np.integer)) or maxlen < 1):
+            raise ValueError(f"Argument maxlen {maxlen} should be a positive integer or None.")
+        self._records = deque(maxlen=maxlen)
+
+    @property
+    def maxlen(self):
+        r"""Return the maximum number of records kept."""
+        return self._records.maxlen
+
+    @property
+    def records(self):
+        r"""Return the list of the records kept, from the oldest to the newest."""
+        return list(self._records)
+
+    def __len__(self):
+        r"""Return the number of records kept."""
+        return len(self._records)
+
+    def update(self, record):
+        r"""Store the record of an iteration, dropping the oldest one if the buffer is full."""
+        self._records.append(record)
+
+    def clear(self):
+        r"""Remove all the records."""
+        self._records.clear()
+
+
+class JSONLinesObserver(Observer):
+    r"""
+    Observer writing each record as a line of JSON to a file.
+
+    The non-finite floats are written as `NaN`, `Infinity` and `-Infinity`, which are read back
+    by `json.loads`.
+
+    """
+
+    def __init__(self, file, mode="w", flush=True):
+        r"""
+        Construct the JSONLinesObserver class.
+
+        Parameters
+        ----------
+        file : str, path-like or file object
+            The path of the file, or a file object opened in text mode. A file object isn't
+            closed by the observer.
+        mode : str, optional
+            The mode used to open the file from its path, "w" (default) to overwrite it or "a" to
+            append to it.
+        flush : bool, optional
+            Whether the file is flushed after each record, so that it can be followed while
+            the algorithm runs. Default is True.
+
+        """
+        if mode not in ("w", "a"):
+            raise ValueError(f"Argument mode {mode} should be 'w' or 'a'.")
+        if isinstance(file, (str, bytes, os.PathLike)):
+            self._file = open(file, mode, encoding="utf-8")
+            self._owner = True
+        elif hasattr(file, "write"):
+            self._file = file
+            self._owner = False
+        else:
+            raise TypeError(f"Argument file {type(file)} should be a path or a file object.")
+        self._flush = flush
+
+    def update(self, record):
+        r"""Write the record of an iteration as a line of JSON."""
+        self._file.write(json.dumps(record, default=_to_json) + "\n")
+        if self._flush:
+            self._file.flush()
+
+    def close(self):
+        r"""Close the file, if it was opened by the observer, or else flush it."""
+        if self._owner:
+            self._file.close()
+        elif not self._file.closed:
+            self._file.flush()
+
+
+def _to_json(value):
+    r"""Convert the NumPy scalars & arrays which aren't serializable by `json`."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable.")
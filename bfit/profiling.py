@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# BFit is a Python library for fitting a convex sum of Gaussian
+# functions to any probability distribution
+#
+# Copyright (C) 2020- The QC-Devs Community
+#
+# This file is part of BFit.
+#
+# BFit is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# BFit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+# ---
+r"""Profiling counters & timers of the fitting algorithms."""
+
+import functools
+import inspect
+import threading
+from timeit import default_timer as timer
+
+__all__ = ["Profile"]
+
+
+class Profile:
+    r"""
+    Number of calls & time spent in the instrumented methods of the fitting algorithms.
+
+    The instrumented methods are the evaluations of the model (`model.evaluate`,
+    `model.evaluate_basis` & `model.vjp`) and of the measure (`measure.evaluate`), the
+    integrations over the grid (`fit.integrate` & `fit.integrate_many`), the functions called
+    back by `scipy.optimize.minimize` in `ScipyFit` (`fit.func`, `fit.const_norm`, ...), the
+    fixed-point updates of `KLDivergenceFPI` (`fit.update_params`), the optimization of each
+    initial guess of the greedy algorithms (`greedy.candidate`) and their NNLS steps
+    (`greedy.solve_nnls`), as well as the `run` methods themselves. The evaluations with
+    derivatives are recorded separately, with a "(deriv)" suffix.
+
+    The times are inclusive, e.g. the time of `fit.func` contains the time of the model & measure
+    evaluations it made, so the times of different methods shouldn't be summed up.
+
+    Profiling is enabled by the `profile` argument of the `run` methods, which is either true, so
+    that a new profile is returned, or a `Profile` object, so that the calls of several runs
+    are accumulated. Otherwise, the instrumented methods only check that no profile is
+    enabled. The copies of the fitting objects made by the greedy algorithms for concurrent
+    workers share the profile, except when they are sent to other processes.
+
+    """
+
+    def __init__(self):
+        r"""Construct an empty profile."""
+        self._calls = {}
+        self._times = {}
+        self._lock = threading.Lock()
+
+    def add(self, key, time):
+        r"""
+        Record one call of an instrumented method.
+
+        Parameters
+        ----------
+        key : str
+            The name of the instrumented method.
+        time : float
+            The time in seconds spent in the call.
+
+        """
+        with self._lock:
+            self._calls[key] = self._calls.get(key, 0) + 1
+            self._times[key] = self._times.get(key, 0.) + time
+
+    def totals(self):
+        r"""
+        Return the number of calls & time spent in each instrumented method.
+
+        Returns
+        -------
+        dict :
+            Dictionary whose keys are the names of the called methods (sorted) and whose values
+            are dictionaries with keys "calls", the number of calls, and "time", the total time
+            in seconds spent in these calls.
+
+        """
+        with self._lock:
+            return {key: {"calls": self._calls[key], "time": self._times[key]}
+                    for key in sorted(self._calls)}
+
+    def reset(self):
+        r"""Remove all the recorded calls."""
+        with self._lock:
+            self._calls.clear()
+            self._times.clear()
+
+    def __deepcopy__(self, memo):
+        r"""Return the profile itself, so that it is shared by copies of the fitting objects."""
+        return self
+
+    def __getstate__(self):
+        r"""Return the state of the profile without its lock, for pickling."""
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        r"""Restore the state of a pickled profile."""
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def _profiled(key, deriv=None):
+    r"""
+    Return a decorator recording the calls of a method in the profile of its object, if any.
+
+    The object of the method should have a `_profile` attribute, which is None unless profiling
+    is enabled, so the overhead of a disabled profile is a single attribute check.
+
+    Parameters
+    ----------
+    key : str
+        The name under which the calls are recorded.
+    deriv : int, optional
+        The position (after `self`) of the `deriv` argument of the method. If provided, the
+        calls with a true `deriv` argument are recorded under `key` followed by "(deriv)".
+
+    """
+    deriv_key = key + "(deriv)"
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profile = self._profile
+            if profile is None:
+                return method(self, *args, **kwargs)
+            name = key
+            if deriv is not None and kwargs.get("deriv", len(args) > deriv and args[deriv]):
+                name = deriv_key
+            start = timer()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                profile.add(name, timer() - start)
+        return wrapper
+    return decorator
+
+
+def _profiled_run(key):
+    r"""
+    Return a decorator adding the keyword argument `profile` to a `run` method.
+
+    If `profile` is true or a `Profile` object, the profile is enabled on the objects returned
+    by the `_profiled_objects` method of the object during the run, and its totals are added to
+    the results of the run under the "profile" key. The calls of the run are recorded under
+    `key` in the profile of the object, if any (e.g. in the runs made by a greedy algorithm).
+
+    """
+    def decorator(run):
+        timed = _profiled(key)(run)
+
+        @functools.wraps(run)
+        def wrapper(self, *args, profile=False, **kwargs):
+            if profile is False or profile is None:
+                return timed(self, *args, **kwargs)
+            if profile is True:
+                profile = Profile()
+            elif not isinstance(profile, Profile):
+                raise TypeError(f"Argument profile {type(profile)} should be a bool or Profile.")
+            objects = self._profiled_objects()
+            previous = [obj._profile for obj in objects]
+            for obj in objects:
+                obj._profile = profile
+            try:
+                results = timed(self, *args, **kwargs)
+            finally:
+                for obj, value in zip(objects, previous):
+                    obj._profile = value
+            results["profile"] = profile.totals()
+            return results
+
+        signature = inspect.signature(run)
+        wrapper.__signature__ = signature.replace(parameters=list(signature.parameters.values()) + [
+            inspect.Parameter("profile", inspect.Parameter.KEYWORD_ONLY, default=False)
+        ])
+        return wrapper
+    return decorator
+
+
+def _profiled_function(profile, key, function):
+    r"""Return the function recording its calls under `key` in the profile."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = timer()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.add(key, timer() - start)
+    return wrapper
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# BFit is a Python library for fitting a convex sum of Gaussian
+# functions to any probability distribution
+#
+# Copyright (C) 2020- The QC-Devs Community
+#
+# This file is part of BFit.
+#
+# BFit is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# BFit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+# ---
+r"""Test bfit.batch module."""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import tempfile
+
+import numpy as np
+from numpy.testing import assert_almost_equal, assert_equal, assert_raises
+
+from bfit.batch import fit_atom, load_batch_results, run_batch
+from bfit.density import SlaterAtoms
+from bfit.fit import KLDivergenceFPI
+from bfit.grid import ClenshawRadialGrid
+from bfit.model import AtomicGaussianDensity
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    r"""Thread pool counting the submitted calls."""
+
+    submitted = 0
+
+    def submit(self, *args, **kwargs):
+        r"""Submit a call & count it."""
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+def test_fit_atom_against_kl_fpi():
+    r"""Test fitting an atom from a job specification against KLDivergenceFPI."""
+    grid_spec = {"num_core_pts": 100, "num_diffuse_pts": 100}
+    job = {"element": "He", "grid": grid_spec,
+           "model": {"coeffs": [1., 1.], "exps": [1., 5.], "num_s": 2, "num_p": 0},
+           "fitter": {"options": {"maxiter": 50}}}
+    result = fit_atom(job)
+
+    grid = ClenshawRadialGrid(2, **grid_spec)
+    density = SlaterAtoms("he").atomic_density(grid.points)
+    model = AtomicGaussianDensity(grid.points, num_s=2, num_p=0, normalize=True)
+    fit = KLDivergenceFPI(grid, density, model, mask_value=1e-18, integral_dens=2,
+                          spherical=True)
+    desired = fit.run(np.array([1., 1.]), np.array([1., 5.]), maxiter=50)
+    assert_equal(result["name"], "he")
+    assert_equal((result["num_s"], result["num_p"]), (2, 0))
+    assert_almost_equal(result["coeffs"], desired["coeffs"], decimal=8)
+    assert_almost_equal(result["exps"], desired["exps"], decimal=8)
+    assert_almost_equal(result["fun"], desired["fun"], decimal=8)
+    # check errors
+    assert_raises(ValueError, fit_atom, {"element": "xx"})
+    assert_raises(ValueError, fit_atom, {"element": "he", "charge": 2})
+
+
+def test_run_batch_streams_results():
+    r"""Test running a batch of jobs saves each result and skips completed jobs."""
+    grid_spec = {"num_core_pts": 100, "num_diffuse_pts": 100}
+    jobs = [
+        {"element": element, "charge": charge, "grid": grid_spec,
+         "model": {"coeffs": [1.], "exps": [1.], "num_s": 1, "num_p": 0},
+         "fitter": {"options": {"maxiter": 20}}}
+        for element, charge in [("h", 0), ("he", 0), ("c", 1)]
+    ]
+    # job whose atomic density doesn't exist (no cation of H) fails without stopping the others
+    jobs.append(dict(jobs[0], charge=1))
+    with tempfile.TemporaryDirectory() as output_dir:
+        result = run_batch(jobs, output_dir, max_workers=2)
+        assert_equal(sorted(result["failed"].keys()), ["h_cation"])
+        assert_equal(sorted(os.listdir(output_dir)), ["c_cation.npz", "h.npz", "he.npz"])
+        for name, job in zip(["h", "he", "c_cation"], jobs):
+            desired = fit_atom(job)
+            with np.load(os.path.join(output_dir, name + ".npz")) as saved:
+                assert_equal(str(saved["name"]), name)
+                assert_almost_equal(saved["coeffs"], desired["coeffs"])
+                assert_almost_equal(saved["exps"], desired["exps"])
+
+        # check table has the same keys as the KL-FPI results
+        table = load_batch_results(output_dir)
+        assert_equal(sorted(table.keys()), sorted(
+            name + key for name in ["c_cation", "h", "he"]
+            for key in ["_coeffs", "_exps", "_num_s", "_num_p"]
+        ))
+
+        # completed jobs are skipped when the batch is run again, i.e. they aren't submitted
+        # to the executor & their output files aren't written again
+        mtimes = {name: os.stat(os.path.join(output_dir, name)).st_mtime_ns
+                  for name in os.listdir(output_dir)}
+        with CountingExecutor(max_workers=2) as executor:
+            result = run_batch(jobs[:3], output_dir, executor=executor)
+        assert_equal(len(result["completed"]), 3)
+        assert_equal(result["failed"], {})
+        assert_equal(executor.submitted, 0)
+        assert_equal({name: os.stat(os.path.join(output_dir, name)).st_mtime_ns
+                      for name in os.listdir(output_dir)}, mtimes)
+        # unless they're overwritten
+        with CountingExecutor(max_workers=2) as executor:
+            result = run_batch(jobs[:3], output_dir, executor=executor, overwrite=True)
+        assert_equal(len(result["completed"]), 3)
+        assert_equal(executor.submitted, 3)
+    assert_raises(ValueError, run_batch, [jobs[0], jobs[0]], "dir")
+    assert_raises(TypeError, run_batch, jobs, "dir", executor="process")
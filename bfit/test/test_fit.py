@@ -22,13 +22,21 @@
 # ---
 r"""Test bfit.fit module."""
 
+import os
+import tempfile
+import tracemalloc
+
 import numpy as np
 from numpy.testing import assert_almost_equal, assert_equal, assert_raises
+from scipy.optimize import nnls
 
-from bfit.fit import KLDivergenceFPI, ScipyFit
+from bfit.fit import _gram_nnls, _gram_nnls_keys, GramLeastSquares, KLDivergenceFPI, ScipyFit
 from bfit.grid import CubicGrid, UniformRadialGrid
 from bfit.measure import KLDivergence, SquaredDifference
 from bfit.model import AtomicGaussianDensity, MolecularGaussianDensity
+from bfit.observer import RingBufferObserver
+from bfit.profiling import Profile
+from bfit.precision import Precision
 
 
 def test_lagrange_multiplier():
@@ -52,6 +60,32 @@ def test_goodness_of_fit():
     assert_almost_equal(expected, gf, decimal=1)
 
 
+def test_integrate_many():
+    r"""Test integrating several integrands at once with & without grid weights."""
+    g = UniformRadialGrid(500, 0.0, 10.0)
+    e = np.exp(-g.points)
+    m = AtomicGaussianDensity(g.points, num_s=1, num_p=0, normalize=False)
+    integrands = np.column_stack((e, g.points * e, np.exp(-g.points**2)))
+    factor = np.cos(g.points)
+
+    # grid class without quadrature weights only provides an integrate method
+    class GridNoWeights:
+        def __init__(self):
+            self.points = g.points
+
+        def integrate(self, arr):
+            return g.integrate(arr)
+
+    for spherical in [True, False]:
+        kl = KLDivergenceFPI(g, e, m, spherical=spherical)
+        kl_no_weights = KLDivergenceFPI(GridNoWeights(), e, m, spherical=spherical)
+        expected = [kl_no_weights.integrate(factor * column) for column in integrands.T]
+        assert_almost_equal(kl.integrate_many(integrands, factor), expected, decimal=10)
+        assert_almost_equal(kl_no_weights.integrate_many(integrands, factor), expected, decimal=10)
+        expected = [kl.integrate(column) for column in integrands.T]
+        assert_almost_equal(kl.integrate_many(integrands), expected, decimal=10)
+
+
 def test_assertion_raises():
     r"""Test assertion raises of all fitting methods."""
     g = UniformRadialGrid(1000, 0.0, 10.0)
@@ -132,6 +166,204 @@ def test_run_normalized_s_gaussian():
     assert_almost_equal(0., res["fun"][-1], decimal=8)
 
 
+def test_run_record_performance():
+    r"""Test KL-FPI recording performance measures lazily gives the same divergences."""
+    g = UniformRadialGrid(200, 0.0, 15.0)
+    e = np.exp(-g.points) / (8 * np.pi)
+    model = AtomicGaussianDensity(g.points, num_s=3, num_p=0, normalize=True)
+    kl = KLDivergenceFPI(g, e, model, mask_value=1e-12, spherical=True)
+    c0, e0 = np.array([0.3, 0.3, 0.4]), np.array([0.1, 1., 10.])
+    # fixed number of iterations, so every policy does the same updates
+    expected = kl.run(c0, e0, maxiter=20, d_threshold=0., record=1)
+    assert_equal(expected["performance"].shape, (20, 5))
+    for record, nrows in [(3, 7), (20, 1), ("final", 1), ("kl", 0)]:
+        res = kl.run(c0, e0, maxiter=20, d_threshold=0., record=record)
+        assert_almost_equal(res["coeffs"], expected["coeffs"], decimal=10)
+        assert_almost_equal(res["exps"], expected["exps"], decimal=10)
+        assert_almost_equal(res["fun"], expected["fun"], decimal=10)
+        assert_equal(len(res["performance"]), nrows)
+        if nrows != 0:
+            assert_almost_equal(res["performance"][-1], expected["performance"][-1], decimal=10)
+    assert_almost_equal(kl.run(c0, e0, maxiter=20, d_threshold=0., record=3)["performance"][0],
+                        expected["performance"][2], decimal=10)
+    # converged results only differ by the extra iteration of the lagged divergence
+    expected = kl.run(c0, e0, maxiter=500)
+    res = kl.run(c0, e0, maxiter=500, record="final")
+    assert res["success"]
+    assert len(res["fun"]) in (len(expected["fun"]), len(expected["fun"]) + 1)
+    assert_almost_equal(res["fun"][-1], expected["fun"][-1], decimal=6)
+    assert_raises(ValueError, kl.run, c0, e0, record=0)
+    assert_raises(ValueError, kl.run, c0, e0, record="all")
+    assert_raises(TypeError, kl.run, c0, e0, record=1.5)
+
+
+def test_run_anderson_acceleration():
+    r"""Test KL-FPI with Anderson mixing converges to the same fit in fewer iterations."""
+    g = UniformRadialGrid(300, 0.0, 15.0)
+    e = np.exp(-g.points) / (8 * np.pi)
+    model = AtomicGaussianDensity(g.points, num_s=3, num_p=0, normalize=True)
+    kl = KLDivergenceFPI(g, e, model, mask_value=1e-12, spherical=True)
+    c0, e0 = np.array([0.3, 0.3, 0.4]), np.array([0.1, 1., 10.])
+    options = {"maxiter": 5000, "c_threshold": 1e-8, "e_threshold": 1e-8, "d_threshold": 1e-14}
+    expected = kl.run(c0, e0, **options)
+    assert expected["success"]
+    assert_equal(expected["naccel"], 0)
+    for anderson in [2, 5]:
+        res = kl.run(c0, e0, anderson=anderson, **options)
+        assert res["success"]
+        assert 0 < res["naccel"] < res["niter"] < expected["niter"] / 10
+        assert_equal(len(res["fun"]), res["niter"])
+        assert_almost_equal(res["fun"][-1], expected["fun"][-1], decimal=10)
+        assert_almost_equal(res["coeffs"], expected["coeffs"], decimal=4)
+        assert_almost_equal(res["exps"], expected["exps"], decimal=4)
+        assert_almost_equal(np.sum(res["coeffs"]), np.sum(expected["coeffs"]), decimal=8)
+    assert_raises(ValueError, kl.run, c0, e0, anderson=-1)
+
+
+def test_run_precision():
+    r"""Test KL-FPI with float64 and float32 precision policies against extended precision."""
+    c0, e0 = np.array([0.5, 0.5]), np.array([1., 3.])
+    results = {}
+    for dtype, summation in [(np.longdouble, "extended"), (np.float64, "compensated"),
+                             (np.float32, "compensated")]:
+        precision = Precision(dtype, summation)
+        g = UniformRadialGrid(300, 0.0, 15.0, precision=precision)
+        assert_equal(g.points.dtype, dtype)
+        assert_equal(g.weights.dtype, dtype)
+        # normalized sum of two s-type Gaussians
+        e = 0.4 * (0.5 / np.pi)**1.5 * np.exp(-0.5 * g.points**2)
+        e += 0.6 * (5. / np.pi)**1.5 * np.exp(-5. * g.points**2)
+        model = AtomicGaussianDensity(g.points, num_s=2, num_p=0, normalize=True,
+                                      precision=precision)
+        assert_equal(model.evaluate(c0, e0).dtype, dtype)
+        kl = KLDivergenceFPI(g, e, model, mask_value=1e-12, spherical=True)
+        results[dtype] = kl.run(c0, e0, maxiter=100, c_threshold=0., e_threshold=0.,
+                                d_threshold=0.)
+    expected = results[np.longdouble]
+    assert_almost_equal(expected["coeffs"], [0.4, 0.6], decimal=12)
+    assert_almost_equal(expected["exps"], [0.5, 5.], decimal=12)
+    res = results[np.float64]
+    assert_almost_equal(res["coeffs"], expected["coeffs"], decimal=12)
+    assert_almost_equal(res["exps"], expected["exps"], decimal=12)
+    assert_almost_equal(res["fun"][-1], expected["fun"][-1], decimal=14)
+    res = results[np.float32]
+    assert_almost_equal(res["coeffs"], expected["coeffs"], decimal=6)
+    assert_almost_equal(res["exps"], expected["exps"], decimal=5)
+    assert_almost_equal(res["fun"][-1], expected["fun"][-1], decimal=6)
+
+
+def test_run_checkpoint():
+    r"""Test KLDivergenceFPI resumed from a checkpoint gives the same result as without stop."""
+    grid = UniformRadialGrid(300, 0.0, 15.)
+    dens = (np.exp(-2. * grid.points) + 0.1 * np.exp(-0.5 * grid.points)) / (8. * np.pi)
+    model = AtomicGaussianDensity(grid.points, num_s=3, num_p=1, normalize=True)
+    kl = KLDivergenceFPI(grid, dens, model, spherical=True)
+    c0, e0 = np.ones(4), np.array([0.1, 1., 10., 0.5])
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "fpi.npz")
+        for kwargs in [{}, {"anderson": 3, "record": 3}]:
+            expected = kl.run(c0, e0, maxiter=30, d_threshold=1e-14, **kwargs)
+            # stop after 10 iterations, the last checkpoint being the state at iteration 8
+            kl.run(c0, e0, maxiter=10, d_threshold=1e-14, checkpoint=path, checkpoint_every=4,
+                   **kwargs)
+            # each checkpoint only saves the values of the iterations since the previous one
+            for index in range(2):
+                with np.load(f"{path}.history{index}") as history:
+                    assert len(history["fun"]) <= 4 and len(history["performance"]) <= 4
+            result = kl.run(c0, e0, maxiter=30, d_threshold=1e-14, resume=path, **kwargs)
+            for key in ["coeffs", "exps", "fun", "performance", "niter", "naccel"]:
+                assert_equal(result[key], expected[key])
+        # checkpoint of a model with a different number of basis functions
+        model = AtomicGaussianDensity(grid.points, num_s=3, num_p=0, normalize=True)
+        other = KLDivergenceFPI(grid, dens, model, spherical=True)
+        assert_raises(ValueError, other.run, c0[:3], e0[:3], resume=path)
+        assert_raises(ValueError, kl.run, c0, e0, checkpoint=path, checkpoint_every=0)
+        np.savez(path, kind="ScipyFit")
+        assert_raises(ValueError, kl.run, c0, e0, resume=path)
+
+
+def test_run_observer():
+    r"""Test the records of KLDivergenceFPI & ScipyFit iterations received by an observer."""
+    grid = UniformRadialGrid(300, 0.0, 15.)
+    dens = (np.exp(-2. * grid.points) + 0.1 * np.exp(-0.5 * grid.points)) / (8. * np.pi)
+    model = AtomicGaussianDensity(grid.points, num_s=3, num_p=1, normalize=True)
+    c0, e0 = np.ones(4), np.array([0.1, 1., 10., 0.5])
+    kl = KLDivergenceFPI(grid, dens, model, spherical=True)
+    assert_raises(TypeError, kl.run, c0, e0, observer=print)
+    observer = RingBufferObserver(maxlen=None)
+    expected = kl.run(c0, e0, maxiter=20)
+    result = kl.run(c0, e0, maxiter=20, observer=observer)
+    records = observer.records
+    assert_equal([record["iteration"] for record in records], np.arange(1, 21))
+    assert_equal([record["fun"] for record in records], expected["fun"].astype(float))
+    assert_equal([record["performance"] for record in records],
+                 expected["performance"].astype(float))
+    # the history isn't accumulated when the iterations are sent to an observer
+    assert_equal(result["fun"], expected["fun"][-1:])
+    assert_equal(result["performance"], expected["performance"][-1:])
+    assert_equal(result["coeffs"], expected["coeffs"])
+    assert all(record["delta_coeffs"] > 0. and record["delta_exps"] > 0. for record in records)
+    # one evaluation for the update & one for the performance measures per iteration
+    assert_equal([record["nevals"] for record in records], np.arange(2, 42, 2))
+    assert all(record["algorithm"] == "KLDivergenceFPI" for record in records)
+    assert all(np.diff([record["time"] for record in records]) >= 0.)
+    # lazy divergence of the previous iteration, performance measures only when recorded
+    observer.clear()
+    expected = kl.run(c0, e0, maxiter=20, record=5)
+    result = kl.run(c0, e0, maxiter=20, record=5, observer=observer)
+    records = observer.records
+    assert records[0]["fun"] is None
+    assert_equal([record["fun"] for record in records[1:]], expected["fun"][:-1].astype(float))
+    assert_equal(result["fun"], expected["fun"][-1:])
+    assert_equal(result["performance"], expected["performance"][-1:])
+    assert_equal([record["performance"] is not None for record in records],
+                 [i % 5 == 0 for i in range(1, 21)])
+
+    for method, fixed in [("slsqp", "delta_coeffs"), ("trust-constr", "delta_exps")]:
+        fit = ScipyFit(grid, dens, model, measure=SquaredDifference(), method=method,
+                       spherical=True)
+        observer = RingBufferObserver(maxlen=None)
+        result = fit.run(c0, e0, opt_coeffs=fixed == "delta_exps",
+                         opt_expons=fixed == "delta_coeffs", maxiter=100, observer=observer)
+        records = observer.records
+        # SLSQP doesn't call back after its last iteration
+        assert 0 < len(records) <= result["niter"]
+        assert_equal([record["iteration"] for record in records], np.arange(1, len(records) + 1))
+        assert all(record[fixed] == 0. and record["nevals"] > 0 for record in records)
+        assert_almost_equal(records[-1]["fun"], result["fun"], decimal=8)
+
+
+def test_run_profile():
+    r"""Test the profile of the calls made by KLDivergenceFPI & ScipyFit runs."""
+    grid = UniformRadialGrid(300, 0.0, 15.)
+    dens = (np.exp(-2. * grid.points) + 0.1 * np.exp(-0.5 * grid.points)) / (8. * np.pi)
+    model = AtomicGaussianDensity(grid.points, num_s=3, num_p=1, normalize=True)
+    c0, e0 = np.ones(4), np.array([0.1, 1., 10., 0.5])
+    kl = KLDivergenceFPI(grid, dens, model, spherical=True)
+    assert "profile" not in kl.run(c0, e0, maxiter=5)
+    result = kl.run(c0, e0, maxiter=5, profile=True)
+    calls = {key: value["calls"] for key, value in result["profile"].items()}
+    assert_equal(calls["fit.run"], 1)
+    assert_equal(calls["fit.update_params"], 5)
+    assert_equal(calls["fit.goodness_of_fit"], 5)
+    assert all(value["time"] >= 0. for value in result["profile"].values())
+    # the profile is only enabled during the run
+    assert kl._profile is None and model._profile is None and kl.measure._profile is None
+    assert_raises(TypeError, kl.run, c0, e0, profile="yes")
+
+    fit = ScipyFit(grid, dens, model, measure=SquaredDifference(), spherical=True)
+    profile = Profile()
+    observer = RingBufferObserver(maxlen=None)
+    fit.run(c0, e0, maxiter=5, profile=profile)
+    result = fit.run(c0, e0, maxiter=5, profile=profile, observer=observer)
+    calls = {key: value["calls"] for key, value in result["profile"].items()}
+    assert_equal(calls["fit.run"], 2)
+    assert_equal(calls["fit.callback"], len(observer))
+    for key in ["fit.func", "fit.const_norm", "model.evaluate", "model.evaluate(deriv)",
+                "measure.evaluate(deriv)"]:
+        assert calls[key] > 0
+
+
 def test_kl_scf_update_coeffs_2s_gaussian():
     r"""Test KL-SCF method for updating coefficients of two s-type Gaussians."""
     # actual density is a 1s Slater function
@@ -258,6 +490,57 @@ def test_kl_scf_update_params_3d_molecular_dens_1s_1s_gaussian():
     assert_almost_equal(expons, expected_expons, decimal=6)
 
 
+def test_kl_scf_update_params_3d_molecular_dens_three_centers():
+    r"""Test KL-SCF update of three-center Gaussian model against integrating each basis."""
+    axes = np.array([[0.2, 0.0, 0.0], [0.0, 0.2, 0.0], [0.0, 0.0, 0.2]])
+    grid = CubicGrid(np.array([-2.0, -2.0, -2.0]), axes, (20, 20, 20))
+    dens = np.exp(-np.sum(grid.points ** 2., axis=1))
+    coord = np.array([[0., 0., 0.], [0., 0., 1.], [1., 0., 0.]])
+    basis = np.array([[2, 1], [0, 1], [1, 0]])
+    c = np.array([1., 2., 0.5, 1.5, 0.1])
+    e = np.array([3., 4., 1., 0.5, 2.])
+    model = MolecularGaussianDensity(grid.points, coord, basis, True)
+    kl = KLDivergenceFPI(grid, dens, model)
+    # compute expected averages by integrating one basis function at a time
+    m, dm = model.evaluate(c, e, deriv=True)
+    dk = kl.measure.evaluate(dens, m, deriv=True)[1]
+    avrg1, avrg2 = np.zeros(5), np.zeros(5)
+    for index in range(5):
+        radii = model.radii[model.assign_basis_to_center(index)]
+        avrg1[index] = grid.integrate(-dk * dm[:, index])
+        avrg2[index] = grid.integrate(-dk * dm[:, index] * radii**2)
+    coeffs, expons = kl._update_params(c, e, update_coeffs=True, update_expons=True)
+    assert_almost_equal(coeffs, c * avrg1 / kl.lagrange_multiplier, decimal=8)
+    assert_almost_equal(expons, model.prefactor * avrg1 / avrg2, decimal=8)
+
+
+def test_kl_scf_update_params_workspace():
+    r"""Test KL-FPI updates in the workspace match the updates with fresh arrays."""
+    g = UniformRadialGrid(20000, 0.0, 10.0)
+    e = np.exp(-g.points) + 0.1 * np.exp(-0.1 * g.points**2)
+    m = AtomicGaussianDensity(g.points, num_s=4, num_p=2, normalize=True)
+    kl = KLDivergenceFPI(g, e, m, mask_value=1e-12, spherical=True)
+    cs, es = np.array([1., 2., 3., 4., 5., 6.]), np.array([0.1, 0.5, 1., 2., 0.3, 0.8])
+    # updates with fresh arrays are computed when the fitting object has no workspace
+    expected_params = kl._update_params(cs, es, True, True)
+    expected_gf = kl.goodness_of_fit(cs, es)
+    kl._workspace, workspace = None, kl._workspace
+    assert_almost_equal(kl._update_params(cs, es, True, True), expected_params, decimal=12)
+    assert_almost_equal(kl.goodness_of_fit(cs, es), expected_gf, decimal=12)
+    kl._workspace = workspace
+    # an iteration doesn't allocate arrays of the size of the grid (only small numpy buffers)
+    tracemalloc.start()
+    kl._update_params(cs, es, True, True)
+    kl.goodness_of_fit(cs, es)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < kl._workspace.basis.nbytes / 4
+    # the workspace is resized when the number of basis functions changes
+    kl._model = AtomicGaussianDensity(g.points, num_s=2, num_p=0, normalize=True)
+    kl._update_params(cs[:2], es[:2], True, True)
+    assert_equal(kl._workspace.basis.shape, (20000, 2))
+
+
 def test_kl_scf_run_3d_molecular_dens_1s_1p_gaussian():
     r"""Test KL-SCF on 3D Gaussian example with 1 s-type and 1 p-type Gaussians."""
     # make cubic grid
@@ -635,6 +918,281 @@ def test_kl_fit_unnormalized_1d_molecular_dens_unnormalized_1s_1p_gaussian():
     assert_almost_equal(0., result["fun"], decimal=8)
 
 
+def test_scipy_fit_shares_model_evaluation():
+    r"""Test objective & constraint of ScipyFit share the model evaluation at the same point."""
+    grid = UniformRadialGrid(200, 0.0, 15.0)
+    dens = 1.57 * (0.51 / np.pi)**1.5 * np.exp(-0.51 * grid.points**2.)
+    model = AtomicGaussianDensity(grid.points, num_s=2, num_p=1, normalize=True)
+    kl = ScipyFit(grid, dens, model, measure=KLDivergence(), spherical=True)
+    calls = []
+    evaluate = model.evaluate
+
+    def counted_evaluate(*args, **kwargs):
+        calls.append(1)
+        return evaluate(*args, **kwargs)
+    model.evaluate = counted_evaluate
+
+    x = np.array([0.5, 1.0, 0.2, 0.3, 2.0, 1.0])
+    obj, d_obj = kl.func(x)
+    cons = kl.const_norm(x)
+    d_cons = kl.const_norm_jac(x)
+    assert_equal(len(calls), 1)
+    # constraint only needs the model value, its derivative is computed when needed
+    kl.const_norm(x * 2.)
+    assert_equal(len(calls), 2)
+    kl.func(x * 2.)
+    kl.func(x * 2.)
+    assert_equal(len(calls), 3)
+    # finite-difference probes of the constraint don't evict the current parameters
+    for index in range(len(x)):
+        kl.const_norm(x * 2. + 1e-8 * np.eye(len(x))[index])
+    assert_equal(len(calls), 3 + len(x))
+    kl.const_norm(x * 2.)
+    kl.func(x * 2.)
+    assert_equal(len(calls), 3 + len(x))
+    # check against evaluating from scratch
+    kl._memo = None
+    assert_almost_equal(kl.func(x)[0], obj, decimal=10)
+    assert_almost_equal(kl.const_norm(x), cons, decimal=10)
+    assert_almost_equal(d_cons, -kl.integrate_many(kl.evaluate_model(x)[1]), decimal=10)
+    # check derivative of the constraint against finite difference
+    cases = [((), x), (("fixed_expons", x[3:]), x[:3]), (("fixed_coeffs", x[:3]), x[3:])]
+    for args, x_opt in cases:
+        d_cons = kl.const_norm_jac(x_opt, *args)
+        for index in range(len(x_opt)):
+            step = np.zeros(len(x_opt))
+            step[index] = 1e-6
+            finite = kl.const_norm(x_opt + step, *args) - kl.const_norm(x_opt - step, *args)
+            finite /= 2e-6
+            assert_almost_equal(d_cons[index], finite, decimal=5)
+        assert_equal(d_obj.shape, (6,))
+
+
+def test_scipy_fit_fixed_expons_cache_columns():
+    r"""Test ScipyFit with fixed exponents evaluates the Gaussian columns only once."""
+    grid = UniformRadialGrid(200, 0.0, 15.0)
+    dens = 1.57 * (0.51 / np.pi)**1.5 * np.exp(-0.51 * grid.points**2.)
+    model = AtomicGaussianDensity(grid.points, num_s=2, num_p=1, normalize=True)
+    fit = ScipyFit(grid, dens, model, measure=SquaredDifference(), spherical=True)
+    c0, e0 = np.array([1., 0.5, 0.1]), np.array([0.3, 1.0, 2.0])
+    computed = []
+    store_columns = model._store_columns
+
+    def counted_store_columns(expons, matrix):
+        computed.append(expons.size)
+        return store_columns(expons, matrix)
+    model._store_columns = counted_store_columns
+
+    result = fit.run(c0, e0, opt_coeffs=True, opt_expons=False, maxiter=100)
+    assert_equal(computed, [3])
+    # the previous (disabled) cache is restored after the run
+    assert_equal(model._cache_size, 0)
+    assert_equal(len(model._columns), 0)
+    model._store_columns = store_columns
+    expected = ScipyFit(
+        grid, dens, AtomicGaussianDensity(grid.points, num_s=2, num_p=1, normalize=True),
+        measure=SquaredDifference(), spherical=True
+    ).run(c0, e0, opt_coeffs=True, opt_expons=False, maxiter=100)
+    assert_almost_equal(result["coeffs"], expected["coeffs"], decimal=10)
+    # the cache isn't enabled when the exponents are optimized
+    computed.clear()
+    model._store_columns = counted_store_columns
+    fit.run(c0, e0, maxiter=5)
+    assert_equal(computed, [])
+
+
+def test_scipy_fit_vjp():
+    r"""Test ScipyFit with vector-Jacobian products against using the model derivatives."""
+    axes = np.array([[0.4, 0.0, 0.0], [0.0, 0.4, 0.0], [0.0, 0.0, 0.4]])
+    grid = CubicGrid(np.array([-3.0, -3.0, -3.0]), axes, (16, 16, 16))
+    dens = (2. / np.pi)**1.5 * np.exp(-2. * np.sum(grid.points**2., axis=1))
+    model = MolecularGaussianDensity(grid.points, np.array([[0., 0., 0.]]), np.array([[1, 1]]),
+                                     normalize=True)
+    x = np.array([0.5, 0.2, 1.5, 0.8])
+    for measure in [KLDivergence(), SquaredDifference()]:
+        dense = ScipyFit(grid, dens, model, measure=measure)
+        lean = ScipyFit(grid, dens, model, measure=measure, vjp=True)
+        for args, x_opt in [((), x), (("fixed_expons", x[2:]), x[:2]),
+                            (("fixed_coeffs", x[:2]), x[2:])]:
+            obj, d_obj = dense.func(x_opt, *args)
+            assert_almost_equal(lean.func(x_opt, *args)[0], obj, decimal=10)
+            assert_almost_equal(lean.func(x_opt, *args)[1], d_obj, decimal=10)
+            assert_almost_equal(lean.const_norm_jac(x_opt, *args),
+                                dense.const_norm_jac(x_opt, *args), decimal=10)
+    # optimize on a radial grid
+    grid = UniformRadialGrid(200, 0.0, 15.0)
+    dens = 1.57 * (0.51 / np.pi)**1.5 * np.exp(-0.51 * grid.points**2.)
+    model = AtomicGaussianDensity(grid.points, num_s=1, num_p=0, normalize=True)
+    kl = ScipyFit(grid, dens, model, measure=KLDivergence(), spherical=True, vjp=True)
+    result = kl.run(np.array([1.]), np.array([2.]), True, True)
+    assert_almost_equal(result["coeffs"], [1.57], decimal=5)
+    assert_almost_equal(result["exps"], [0.51], decimal=5)
+
+
+def test_scipy_fit_hessian():
+    r"""Test analytic Hessians of objective & constraint against finite differences."""
+    g = UniformRadialGrid(200, 0.0, 15.0)
+    e = np.exp(-g.points) / (8 * np.pi)
+    m = AtomicGaussianDensity(g.points, num_s=2, num_p=1, normalize=True)
+    x = np.array([0.3, 0.5, 0.2, 0.2, 1.1, 0.7])
+    cases = [((), x), (("fixed_expons", x[3:]), x[:3]), (("fixed_coeffs", x[:3]), x[3:])]
+    for measure in [SquaredDifference(), KLDivergence(mask_value=1e-12)]:
+        fit = ScipyFit(g, e, m, measure=measure, method="trust-constr", spherical=True)
+        for args, x_opt in cases:
+            steps = 1e-6 * np.eye(len(x_opt))
+            finite = [fit.func(x_opt + step, *args)[1] - fit.func(x_opt - step, *args)[1]
+                      for step in steps]
+            hessian = fit.hess(x_opt, *args)
+            assert_almost_equal(hessian, np.array(finite) / 2e-6, decimal=6)
+            vector = np.arange(1., len(x_opt) + 1.)
+            fit._memo = None
+            assert_almost_equal(fit.hessp(x_opt, vector, *args), hessian.dot(vector), decimal=10)
+            finite = [fit.const_norm_jac(x_opt + step, *args) -
+                      fit.const_norm_jac(x_opt - step, *args) for step in steps]
+            assert_almost_equal(fit.const_norm_hess(x_opt, *args), np.array(finite) / 2e-6,
+                                decimal=6)
+    # Newton steps with the Hessian converge where quasi-Newton doesn't within maxiter
+    c0, e0 = np.array([0.3, 0.5, 0.2]), np.array([0.2, 1.1, 0.7])
+    res = fit.run(c0, e0, maxiter=1000, tol=1e-12, hessian=True)
+    assert res["success"]
+    assert res["fun"] < fit.func(np.concatenate((c0, e0)))[0]
+    assert_almost_equal(fit.const_norm(np.concatenate((res["coeffs"], res["exps"]))), 0.,
+                        decimal=8)
+    fit = ScipyFit(g, e, m, measure=KLDivergence(mask_value=1e-12), spherical=True)
+    assert_raises(ValueError, fit.run, c0, e0, hessian=True)
+
+
+def test_fit_analytic_integrals():
+    r"""Test the fitting algorithms use the analytic integrals of the model."""
+    g = UniformRadialGrid(200, 0.0, 15.0)
+    e = np.exp(-g.points) / (8 * np.pi)
+    m = AtomicGaussianDensity(g.points, num_s=2, num_p=1, normalize=True)
+    c, x = np.array([0.3, 0.5, 0.2]), np.array([0.3, 0.5, 0.2, 0.2, 1.1, 0.7])
+    # integral of the normalized model is the sum of the coefficients
+    kl = KLDivergenceFPI(g, e, m, mask_value=1e-12, spherical=True)
+    assert_almost_equal(kl.goodness_of_fit(c, x[3:])[0], np.sum(c), decimal=14)
+    kl._workspace = None
+    assert_almost_equal(kl.goodness_of_fit(c, x[3:])[0], np.sum(c), decimal=14)
+    # half-line integrals of one-dimensional grids are computed numerically
+    kl = KLDivergenceFPI(g, e, m, mask_value=1e-12, spherical=False)
+    assert_almost_equal(kl.goodness_of_fit(c, x[3:])[0], g.integrate(m.evaluate(c, x[3:])))
+    assert_raises(ValueError, ScipyFit, g, e, m, KLDivergence(), analytic_norm=True)
+    # normalization constraint & its derivatives agree with the grid ones
+    fit = ScipyFit(g, e, m, KLDivergence(mask_value=1e-12), method="trust-constr",
+                   spherical=True, analytic_norm=True)
+    expected = ScipyFit(g, e, m, KLDivergence(mask_value=1e-12), method="trust-constr",
+                        spherical=True)
+    for args, x_opt in [((), x), (("fixed_expons", x[3:]), x[:3]), (("fixed_coeffs", x[:3]),
+                                                                    x[3:])]:
+        assert_almost_equal(fit.const_norm(x_opt, *args), expected.const_norm(x_opt, *args),
+                            decimal=8)
+        assert_almost_equal(fit.const_norm_jac(x_opt, *args),
+                            expected.const_norm_jac(x_opt, *args), decimal=8)
+        assert_almost_equal(fit.const_norm_hess(x_opt, *args),
+                            expected.const_norm_hess(x_opt, *args), decimal=8)
+    res = fit.run(c, x[3:], maxiter=1000, tol=1e-12, hessian=True)
+    assert res["success"]
+    assert_almost_equal(np.sum(res["coeffs"]), fit.integral_dens, decimal=8)
+
+
+def test_gram_least_squares():
+    r"""Test least-squares fit of coefficients with the Gram matrix against the grid."""
+    g = UniformRadialGrid(1000, 0.0, 15.0)
+    e = np.exp(-g.points) / (8 * np.pi)
+    m = AtomicGaussianDensity(g.points, num_s=3, num_p=1, normalize=True)
+    c, x = np.array([0.3, 0.5, 0.2, 0.1]), np.array([0.2, 1.1, 7.0, 0.7])
+    fit = GramLeastSquares(g, e, m, spherical=True)
+    weights = g.weights * 4. * np.pi * g.points**2
+    basis = m.evaluate_basis(x)
+    assert_almost_equal(fit.norm_sq, np.dot(weights, e**2), decimal=12)
+    assert_almost_equal(fit.projections(x), np.dot(weights * e, basis), decimal=12)
+    assert_almost_equal(fit.gram(x), np.dot(basis.T * weights, basis), decimal=6)
+    # objective function agrees with the least-squares integrated on the grid
+    expected = ScipyFit(g, e, m, measure=SquaredDifference(), spherical=True)
+    value, deriv = fit.func(c, x)
+    assert_almost_equal(value, expected.func(c, "fixed_expons", x)[0], decimal=6)
+    assert_almost_equal(deriv, expected.func(c, "fixed_expons", x)[1], decimal=6)
+    # the coefficients of a sum of Gaussians are recovered
+    e = 0.4 * (0.7 / np.pi)**1.5 * np.exp(-0.7 * g.points**2)
+    e += 0.6 * (7. / np.pi)**1.5 * np.exp(-7. * g.points**2)
+    m = AtomicGaussianDensity(g.points, num_s=3, num_p=0, normalize=True)
+    fit = GramLeastSquares(g, e, m, spherical=True)
+    x = np.array([0.7, 2.5, 7.])
+    assert_almost_equal(fit.solve(x), [0.4, 0., 0.6], decimal=6)
+    assert_almost_equal(fit.solve(x, nonneg=False), [0.4, 0., 0.6], decimal=6)
+    for with_constraint in [True, False]:
+        res = fit.run(x, with_constraint=with_constraint)
+        assert res["success"]
+        assert_almost_equal(res["coeffs"], [0.4, 0., 0.6], decimal=6)
+        assert_almost_equal(res["fun"], 0., decimal=8)
+        assert_almost_equal(res["performance"][0], 1., decimal=6)
+    # constrained & non-negative coefficients of a fit with fixed exponents
+    res = fit.run(np.array([0.5, 3., 10.]), c0=np.ones(3))
+    assert res["success"]
+    assert np.all(res["coeffs"] >= 0.)
+    assert_almost_equal(np.sum(res["coeffs"]), fit.integral_dens, decimal=8)
+    assert_raises(ValueError, GramLeastSquares, g, e, m, spherical=False)
+    assert_raises(ValueError, fit.run, np.array([0.5, 3.]))
+
+
+def test_gram_nnls():
+    r"""Test active-set NNLS with the Gram matrix against scipy.optimize.nnls."""
+    rng = np.random.default_rng(42)
+    for _ in range(10):
+        matrix, vector = rng.normal(size=(40, 8)), rng.normal(size=40)
+        expected = nnls(matrix, vector)[0]
+        coeffs, passive, factor = _gram_nnls(np.dot(matrix.T, matrix), np.dot(vector, matrix))
+        assert_almost_equal(coeffs, expected, decimal=10)
+        assert_equal(sorted(passive), np.nonzero(expected)[0])
+        assert_almost_equal(np.dot(factor, factor.T), np.dot(matrix[:, passive].T,
+                                                             matrix[:, passive]))
+        # warm start from the solver state of a basis with a different order & one less column
+        keys = list("abcdefgh")
+        state = _gram_nnls_keys(np.dot(matrix[:, 1:].T, matrix[:, 1:]),
+                                np.dot(vector, matrix[:, 1:]), keys[1:])[1]
+        order = rng.permutation(8)
+        result = _gram_nnls_keys(np.dot(matrix[:, order].T, matrix[:, order]),
+                                 np.dot(vector, matrix[:, order]), [keys[i] for i in order],
+                                 state)[0]
+        assert_almost_equal(result, expected[order], decimal=10)
+    # a dependent basis function is excluded from the passive set
+    matrix = np.column_stack((matrix, matrix[:, 0]))
+    coeffs = _gram_nnls(np.dot(matrix.T, matrix), np.dot(vector, matrix))[0]
+    expected = nnls(matrix, vector)[0]
+    assert_almost_equal(np.dot(matrix, coeffs), np.dot(matrix, expected), decimal=10)
+
+
+def test_gram_least_squares_solve_nnls():
+    r"""Test the NNLS solution of GramLeastSquares warm started from another basis."""
+    g = UniformRadialGrid(1000, 0.0, 15.0)
+    e = np.exp(-g.points) / (8 * np.pi)
+    m = AtomicGaussianDensity(g.points, num_s=6, num_p=0, normalize=True)
+    fit = GramLeastSquares(g, e, m, spherical=True)
+    x = np.array([0.1, 0.4, 1.6, 6.4, 25.6, 102.4])
+    coeffs, state = fit.solve_nnls(x)
+    assert_almost_equal(fit.solve(x), coeffs)
+    assert np.all(coeffs >= 0.)
+    # the optimality conditions of NNLS hold
+    gradient = np.dot(fit.gram(x), coeffs) - fit.projections(x)
+    assert np.all(gradient > -1e-10)
+    assert_almost_equal(gradient[coeffs > 0.], 0., decimal=10)
+    # inserting an exponent reuses the passive set of the parent
+    m.change_numb_s_and_numb_p(7, 0)
+    y = np.insert(x, 3, 3.2)
+    assert_almost_equal(fit.solve_nnls(y, state)[0], fit.solve_nnls(y)[0], decimal=10)
+
+
+def test_kl_fit_trust_constr_fixed_expons():
+    r"""Test ScipyFit with trust-constr & normalization constraint when exponents are fixed."""
+    grid = UniformRadialGrid(200, 0.0, 15.0)
+    dens = 1.57 * (0.51 / np.pi)**1.5 * np.exp(-0.51 * grid.points**2.)
+    model = AtomicGaussianDensity(grid.points, num_s=1, num_p=0, normalize=True)
+    kl = ScipyFit(grid, dens, model, measure=KLDivergence(), method="trust-constr", spherical=True)
+    result = kl.run(np.array([1.]), np.array([0.51]), True, False, tol=1e-12)
+    assert_almost_equal(np.array([1.57]), result["coeffs"], decimal=6)
+    assert_almost_equal(np.array([0.51]), result["exps"], decimal=8)
+
+
 def test_ls_fit_normalized_dens_normalized_1s_gaussian():
     r"""Test ScipyFit of least-squares against normalized Gaussian model."""
     # density is normalized 1s orbital with exponent=1.0
@@ -651,6 +1209,7 @@ def test_ls_fit_normalized_dens_normalized_1s_gaussian():
     assert_almost_equal(cs0, result["coeffs"], decimal=8)
     assert_almost_equal(es0, result["exps"], decimal=6)
     assert_almost_equal(0., result["fun"], decimal=8)
+    assert 1 <= result["niter"] < 1000
     # opt. coeffs
     result = ls.run(np.array([10.]), np.array([0.51]), True, False)
     assert_almost_equal(cs0, result["coeffs"], decimal=8)
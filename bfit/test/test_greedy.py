@@ -22,18 +22,34 @@
 # ---
 r"""Test file for 'bfit.greedy'."""
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import copy
+import os
+import pickle
+import tempfile
+
 import numpy as np
 import numpy.testing as npt
+from scipy.optimize import nnls
 
+from bfit.fit import ScipyFit
 from bfit.greedy import (
+    _unique_deltas,
+    CandidateDelta,
     get_next_choices,
+    get_next_deltas,
     get_two_next_choices,
+    get_two_next_deltas,
     GreedyKLFPI,
     GreedyLeastSquares,
     pick_two_lose_one,
+    pick_two_lose_one_deltas,
     remove_redundancies,
 )
-from bfit.grid import UniformRadialGrid
+from bfit.grid import ClenshawRadialGrid, UniformRadialGrid
+from bfit.measure import SquaredDifference
+from bfit.model import AtomicGaussianDensity
+from bfit.observer import RingBufferObserver
 
 
 def test_check_redundancies():
@@ -59,6 +75,27 @@ def test_check_redundancies():
     npt.assert_array_equal(true_answer[0], np.array([83, 10., 2]))
     npt.assert_array_equal(true_answer[1], np.array([3.0012, 2, 1]))
 
+    # chains of similar exponents are one group & the sum of coefficients is preserved
+    c = np.array([1., 2., 4., 8.])
+    exps = np.array([5., 1.0016, 1.0008, 1.])
+    true_answer = remove_redundancies(c, exps, 1e-3)
+    npt.assert_array_equal(true_answer[0], np.array([1., 14.]))
+    npt.assert_array_equal(true_answer[1], np.array([5., 1.0016]))
+
+    # relative threshold for exponents of different orders of magnitude
+    c = np.array([1., 2., 4., 8.])
+    exps = np.array([1e-2, 1.05e-2, 1e7, 1.0004e7])
+    true_answer = remove_redundancies(c, exps, 1e-3)
+    npt.assert_array_equal(true_answer[0], np.array([3., 4., 8.]))
+    true_answer = remove_redundancies(c, exps, 1e-3, relative=True)
+    npt.assert_array_equal(true_answer[0], np.array([1., 2., 12.]))
+    npt.assert_array_equal(true_answer[1], np.array([1e-2, 1.05e-2, 1e7]))
+    true_answer = remove_redundancies(c, exps, 0.1, relative=True)
+    npt.assert_array_equal(true_answer[0], np.array([3., 12.]))
+    npt.assert_array_equal(remove_redundancies(c[:0], exps[:0])[1], np.array([]))
+    npt.assert_raises(ValueError, remove_redundancies, c, exps[:3])
+    npt.assert_raises(ValueError, remove_redundancies, c, exps, -1.)
+
 
 def test_get_next_possible_coeffs_and_exps():
     r"""Testing 'bfit.greedy.greedy_utils.get_next_choices'."""
@@ -127,6 +164,34 @@ def test_pick_two_lose_one():
     npt.assert_array_equal(true_answer, desired_answer)
 
 
+def test_candidate_deltas():
+    r"""Test initial guesses given as differences from the parent basis."""
+    c = np.array([1., 2., 5.])
+    e = np.array([3., 4., 9.])
+    for deltas_func, choices_func in [(get_next_deltas, get_next_choices),
+                                      (get_two_next_deltas, get_two_next_choices),
+                                      (pick_two_lose_one_deltas, pick_two_lose_one)]:
+        deltas = deltas_func(2., e)
+        choices = choices_func(2., c, e, coeff_val=0.5)
+        assert len(deltas) == len(choices)
+        for delta, choice in zip(deltas, choices):
+            npt.assert_array_equal(delta.apply(c, e, coeff_val=0.5), choice)
+            npt.assert_array_equal(delta.exponents(e), choice[len(choice) // 2:])
+            # basis-functions of the parent are given by their index in the parent basis
+            indices = delta.indices(3)
+            npt.assert_array_equal(e[indices[indices < 3]], choice[len(choice) // 2:][indices < 3])
+    delta = CandidateDelta([(0, 1.5), (2, 3.5)], (1,))
+    assert delta.inserted == ((0, 1.5), (2, 3.5)) and delta.removed == (1,)
+    npt.assert_array_equal(delta.indices(3), [3, 4, 1, 2])
+    npt.assert_array_equal(delta.apply(c, e, 0.), [0., 0., 2., 5., 1.5, 3.5, 4., 9.])
+    # duplicate initial guesses are dropped, keeping the first one
+    deltas = pick_two_lose_one_deltas(2., e)
+    unique = _unique_deltas(deltas, e)
+    assert unique[0] is deltas[0]
+    exps = {tuple(delta.exponents(e)) for delta in deltas}
+    assert len(unique) == len(exps) < len(deltas)
+
+
 def test_greedy_kl_two_function():
     r"""Test Greedy Kullback-Leibler against two-function Gaussian combination."""
     def eval_density(points):
@@ -167,3 +232,261 @@ def test_greedy_ls_two_function():
     npt.assert_almost_equal(np.sort(result["coeffs"]), [0.25, 0.75], decimal=3)
     npt.assert_almost_equal(np.sort(result["exps"]), [5.0, 10.0], decimal=3)
     assert result["success"]
+    # the Gaussian columns are only cached during the run
+    assert greedy.model._cache_size == 0 and len(greedy.model._columns) == 0
+    worker = greedy._copy_for_worker()
+    assert worker.model is not greedy.model
+
+
+def test_greedy_ls_nnls():
+    r"""Test NNLS step of Greedy Least-Squares against scipy.optimize.nnls on the grid points."""
+    grid = UniformRadialGrid(500, 0.0, 15.)
+    density = np.exp(-grid.points) / (8. * np.pi)
+    coeffs, exps = np.ones(5), np.array([0.1, 0.5, 2.5, 12.5, 62.5])
+    for spherical in [True, False]:
+        greedy = GreedyLeastSquares(grid, density, spherical=spherical)
+        greedy.model.change_numb_s_and_numb_p(5, 0)
+        greedy._update_parent(np.hstack((coeffs, exps)))
+        greedy.model.change_numb_s_and_numb_p(6, 0)
+        for params in get_next_choices(2., coeffs, exps):
+            result = greedy._solve_nnls(params[6:], greedy._parent)[0]
+            assert np.all(result >= 0.)
+            # the unweighted least-squares on the grid points, whether spherical or not
+            basis = greedy._create_cofactor_matrix(params[6:])
+            expected = nnls(basis, density.astype(float))[0]
+            npt.assert_almost_equal(np.dot(basis, result), np.dot(basis, expected), decimal=6)
+            result = greedy.optimize_using_nnls(density, basis)
+            assert np.all(result >= 0.)
+            npt.assert_almost_equal(np.dot(basis, result), np.dot(basis, expected), decimal=6)
+            # normal equations extended from the ones of the parent
+            basis = basis / np.linalg.norm(basis, axis=0)
+            norms, gram, vector = greedy._normal_equations(greedy._cofactor_keys(params[6:]))
+            npt.assert_allclose(gram, np.dot(basis.T, basis), rtol=1e-12, atol=1e-14)
+            npt.assert_allclose(vector, np.dot(density, basis), rtol=1e-12)
+    # only the inner products of the inserted column are computed for an initial guess
+    requested = []
+    columns = greedy._cofactor_columns
+
+    def cofactor_columns(keys):
+        requested.append(keys)
+        return columns(keys)
+
+    greedy._cofactor_columns = cofactor_columns
+    params = get_next_choices(2., coeffs, exps)[2]
+    greedy._solve_nnls(params[6:], greedy._parent)
+    npt.assert_equal([len(keys) for keys in requested], [1])
+    assert (False, params[8]) in requested[0]
+    # same coefficients as scipy's NNLS, also for nearly collinear columns of very different norms
+    grid = ClenshawRadialGrid(10, 1000, 1000)
+    density = np.exp(-grid.points) / (8. * np.pi)
+    greedy = GreedyLeastSquares(grid, density, spherical=True)
+    for exps in [np.array([0.3, 1., 4.]), np.array([1e-3, 1., 1. + 1e-7, 1e4])]:
+        greedy.model.change_numb_s_and_numb_p(exps.size, 0)
+        basis = greedy._create_cofactor_matrix(exps)
+        expected = nnls(basis, density.astype(float))[0]
+        result = greedy._solve_nnls(exps)[0]
+        npt.assert_allclose(np.linalg.norm(np.dot(basis, result) - density),
+                            np.linalg.norm(np.dot(basis, expected) - density), rtol=1e-10)
+        if exps.size == 3:
+            npt.assert_allclose(result, expected, rtol=1e-8)
+    # columns of the cofactor matrix are taken from the cache of the model, as during a run
+    greedy = GreedyLeastSquares(grid, density, spherical=False)
+    with greedy.model._cache_columns(4):
+        greedy.model.change_numb_s_and_numb_p(2, 0)
+        matrix = greedy._create_cofactor_matrix(np.array([0.5, 2.5]))
+        column = greedy.model._columns[2.5]
+        greedy.model.change_numb_s_and_numb_p(2, 1)
+        result = greedy._create_cofactor_matrix(np.array([0.5, 1.5, 2.5]))
+        npt.assert_allclose(result[:, 1], np.exp(-1.5 * grid.points.astype(float) ** 2))
+        npt.assert_allclose(result[:, 2], matrix[:, 1] * grid.points.astype(float) ** 2)
+        assert greedy.model._columns[2.5] is column
+    assert len(greedy.model._columns) == 0
+
+
+def test_greedy_kl_with_executor():
+    r"""Test Greedy Kullback-Leibler gives the same result when guesses are run concurrently."""
+    def eval_density(points):
+        return 0.25 * np.exp(-10. * points**2.0) * (10.0 / np.pi)**1.5 + \
+                0.75 * np.exp(-5. * points**2.0) * (5.0 / np.pi)**1.5
+
+    grid = UniformRadialGrid(200, 0.0, 10.)
+    density = eval_density(grid.points)
+    results = []
+    for executor, max_workers in [(None, None), (ThreadPoolExecutor(max_workers=2), None),
+                                  (ProcessPoolExecutor(max_workers=2), 2)]:
+        greedy = GreedyKLFPI(grid, density, "pick-one", l_maxiter=200, g_maxiter=500,
+                             integral_dens=1.0, spherical=True)
+        # p-type guesses of the first iteration are random
+        np.random.seed(10)
+        results.append(greedy.run(2.5, max_numb_funcs=3, executor=executor,
+                                  max_workers=max_workers))
+        if executor is not None:
+            executor.shutdown()
+    for result in results[1:]:
+        npt.assert_equal(result["num_s"], results[0]["num_s"])
+        npt.assert_equal(result["num_p"], results[0]["num_p"])
+        npt.assert_equal(result["coeffs"], results[0]["coeffs"])
+        npt.assert_equal(result["exps"], results[0]["exps"])
+        npt.assert_equal(result["performance"], results[0]["performance"])
+    # check the model of greedy object is updated as in the serial algorithm
+    npt.assert_equal(greedy.model.num_s, results[0]["num_s"])
+    npt.assert_equal(greedy.model.num_p, results[0]["num_p"])
+    npt.assert_raises(TypeError, greedy.run, 2.5, executor="threads")
+    npt.assert_raises(ValueError, greedy.run, 2.5, max_workers=0)
+
+
+def test_greedy_worker_copies():
+    r"""Test concurrent guesses are optimized on one copy per worker without the caches."""
+    grid = UniformRadialGrid(200, 0.0, 10.)
+    density = np.exp(-5. * grid.points**2.0) * (5.0 / np.pi)**1.5
+    greedy = GreedyKLFPI(grid, density, "pick-one", l_maxiter=50, integral_dens=1.0,
+                         spherical=True)
+    greedy.fitting_obj.run(np.array([1.]), np.array([4.]), maxiter=5)
+    assert greedy.fitting_obj._workspace.basis.size == 200
+    worker = greedy._copy_for_worker()
+    assert worker.fitting_obj is not greedy.fitting_obj and worker.grid is greedy.grid
+    assert worker.fitting_obj._workspace.basis.size == 0
+    assert greedy.fitting_obj._workspace.basis.size == 200
+    # the memo of scipy & the columns of the model aren't copied either
+    model = AtomicGaussianDensity(grid.points, num_s=1, num_p=0, cache_size=4)
+    fit = ScipyFit(grid, density, model, SquaredDifference(), spherical=True)
+    fit.run(np.array([1.]), np.array([4.]), maxiter=100)
+    assert fit._memo is not None and len(model._columns) > 0
+    other = copy.deepcopy(fit)
+    assert other._memo is None and len(other.model._columns) == 0
+    assert len(pickle.loads(pickle.dumps(model))._columns) == 0
+    # one copy per worker, the guesses being split between the workers
+    copies = []
+
+    def copy_for_worker():
+        copies.append(1)
+        return GreedyKLFPI._copy_for_worker(greedy)
+
+    greedy._copy_for_worker = copy_for_worker
+    greedy.num_s = 2
+    choices = get_next_choices(2.5, np.array([0.5, 0.5]), np.array([2., 8.]))
+    expected = greedy._find_best_lparams(choices, len(choices), 0)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        result = greedy._find_best_lparams(choices, len(choices), 0, executor, max_workers=2)
+        assert len(choices) > 2 and len(copies) == 2
+        npt.assert_equal(result[0], expected[0])
+        npt.assert_equal(result[1], expected[1])
+        # without the number of workers, each guess is optimized on its own copy
+        result = greedy._find_best_lparams(choices, len(choices), 0, executor)
+        assert len(copies) == 2 + len(choices)
+        npt.assert_equal(result[1], expected[1])
+    # the guesses reuse the columns of the parent basis, which are unset afterwards
+    result = greedy._find_best_lparams(choices, len(choices), 0, parent=np.array([2., 8.]))
+    npt.assert_almost_equal(result[0], expected[0], decimal=10)
+    npt.assert_almost_equal(result[1], expected[1], decimal=6)
+    assert greedy.model._parent_columns is None
+
+
+def test_greedy_racing():
+    r"""Test greedy algorithms racing the initial guesses by successive halving."""
+    def eval_density(points):
+        return 0.25 * np.exp(-10. * points**2.0) * (10.0 / np.pi)**1.5 + \
+                0.75 * np.exp(-5. * points**2.0) * (5.0 / np.pi)**1.5
+
+    grid = UniformRadialGrid(200, 0.0, 10.)
+    density = eval_density(grid.points)
+    for greedy in [GreedyKLFPI(grid, density, "pick-one", l_maxiter=200, g_maxiter=500,
+                               integral_dens=1.0, spherical=True),
+                   GreedyLeastSquares(grid, density, "pick-one", local_tol=1e-10, l_maxiter=200,
+                                      integral_dens=1.0, normalize=True, spherical=True)]:
+        # optimizations resumed from their last parameters until convergence are fully optimized
+        params = np.array([0.5, 0.5, 4., 12.])
+        greedy.model.change_numb_s_and_numb_p(2, 0)
+        full = greedy.get_optimization_routine(params, local=True)
+        racing, converged = greedy._run_local_choice(params, 3)
+        assert not converged
+        while not converged:
+            racing, converged = greedy._run_local_choice(racing, 20, resume=True)
+        npt.assert_almost_equal(greedy.eval_obj_function(racing), greedy.eval_obj_function(full),
+                                decimal=6)
+        # the best initial guess is the same as when every guess is fully optimized
+        greedy.num_s, greedy.num_p = 1, 0
+        greedy.model.change_numb_s_and_numb_p(1, 0)
+        choices = get_next_choices(2.5, np.array([1.]), np.array([6.]))
+        expected = greedy._find_best_lparams(choices, len(choices), 0)
+        for executor in [None, ThreadPoolExecutor(max_workers=2)]:
+            result = greedy._find_best_lparams(choices, len(choices), 0, executor, racing=2)
+            npt.assert_almost_equal(result[0], expected[0], decimal=6)
+            npt.assert_almost_equal(result[1], expected[1], decimal=3)
+        # greedy run with racing finds a two-function fit as good as without racing
+        results = []
+        for racing in [None, 5]:
+            greedy.num_s, greedy.num_p = 1, 0
+            greedy.model.change_numb_s_and_numb_p(1, 0)
+            np.random.seed(10)
+            results.append(greedy.run(2.5, max_numb_funcs=2, racing=racing))
+        assert results[1]["success"]
+        npt.assert_almost_equal(results[1]["fun"], 0., decimal=4)
+        npt.assert_almost_equal(results[1]["fun"], results[0]["fun"], decimal=4)
+        npt.assert_raises(ValueError, greedy.run, 2.5, racing=0)
+
+
+def test_greedy_checkpoint():
+    r"""Test greedy algorithms resumed from a checkpoint give the same result as without stop."""
+    grid = UniformRadialGrid(300, 0.0, 15.)
+    density = (np.exp(-2. * grid.points) + 0.1 * np.exp(-0.5 * grid.points)) / (8. * np.pi)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "greedy.npz")
+        for greedy_class in [GreedyKLFPI, GreedyLeastSquares]:
+            def make():
+                return greedy_class(grid, density, "pick-one", spherical=True, l_maxiter=100,
+                                    g_maxiter=200)
+            np.random.seed(3)
+            expected = make().run(2., max_numb_funcs=4)
+            # stop after three basis-functions & resume with another random state
+            np.random.seed(3)
+            make().run(2., max_numb_funcs=3, checkpoint=path)
+            # each checkpoint only saves the parameters & errors of its iteration
+            with np.load(f"{path}.history1") as history:
+                assert len(history["sizes"]) <= 1 and len(history["err_arr"]) <= 1
+            np.random.seed(10)
+            result = make().run(2., max_numb_funcs=4, resume=path)
+            for key in ["coeffs", "exps", "num_s", "num_p", "performance", "exit_information"]:
+                npt.assert_equal(result[key], expected[key])
+            for params, params_expected in zip(result["parameters_iteration"],
+                                               expected["parameters_iteration"]):
+                npt.assert_equal(params, params_expected)
+        # checkpoint of another greedy algorithm
+        npt.assert_raises(ValueError, GreedyKLFPI(grid, density).run, 2., resume=path)
+
+
+def test_greedy_observer():
+    r"""Test the records of the greedy iterations received by an observer."""
+    grid = UniformRadialGrid(300, 0.0, 15.)
+    density = (np.exp(-2. * grid.points) + 0.1 * np.exp(-0.5 * grid.points)) / (8. * np.pi)
+    greedy = GreedyKLFPI(grid, density, "pick-one", spherical=True, l_maxiter=50, g_maxiter=100)
+    npt.assert_raises(TypeError, greedy.run, 2., observer=print)
+    observer = RingBufferObserver(maxlen=None)
+    result = greedy.run(2., max_numb_funcs=4, observer=observer)
+    records = observer.records
+    npt.assert_equal([record["iteration"] for record in records], np.arange(1, len(records) + 1))
+    accepted = [record for record in records if record["accepted"]]
+    # the performance measures of each accepted iteration, after the one-function solution
+    npt.assert_equal(len(accepted), len(result["parameters_iteration"]) - 1)
+    npt.assert_equal([record["performance"] for record in accepted],
+                     result["performance"][1:].astype(float))
+    npt.assert_equal(records[-1]["num_s"] + records[-1]["num_p"], result["coeffs"].size)
+    assert all(record["algorithm"] == "GreedyKLFPI" for record in records)
+    assert np.all(np.diff([record["nevals"] for record in records]) > 0)
+
+
+def test_greedy_profile():
+    r"""Test the profile of the calls made by greedy runs."""
+    grid = UniformRadialGrid(300, 0.0, 15.)
+    density = (np.exp(-2. * grid.points) + 0.1 * np.exp(-0.5 * grid.points)) / (8. * np.pi)
+    greedy = GreedyLeastSquares(grid, density, "pick-one", spherical=True, l_maxiter=50,
+                                g_maxiter=100)
+    result = greedy.run(2., max_numb_funcs=3, profile=True)
+    profile = result["profile"]
+    npt.assert_equal(profile["greedy.run"]["calls"], 1)
+    # one-function solution, then local & global optimizations of each iteration
+    assert profile["fit.run"]["calls"] > profile["greedy.candidate"]["calls"] > 0
+    for key in ["greedy.solve_nnls", "greedy.eval_obj_function", "model.evaluate(deriv)"]:
+        assert profile[key]["calls"] > 0
+    assert greedy._profile is None and greedy.fitting_obj._profile is None
+    assert greedy.model._profile is None
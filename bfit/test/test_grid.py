@@ -23,9 +23,10 @@
 r"""Test bfit.grid module."""
 
 import numpy as np
-from numpy.testing import assert_almost_equal, assert_raises
+from numpy.testing import assert_almost_equal, assert_equal, assert_raises
 
 from bfit.grid import _BaseRadialGrid, ClenshawRadialGrid, CubicGrid, UniformRadialGrid
+from bfit.precision import Precision
 
 
 def test_raises_base():
@@ -50,6 +51,45 @@ def test_integration_base():
     assert_almost_equal(value, 2. * 2., decimal=5)
 
 
+def test_integer_points_base():
+    r"""Test _BaseRadialGrid of integer & half-precision points integrates in float64."""
+    expected = np.trapz(np.arange(10.)**2, np.arange(10.))
+    for points in [np.arange(10), np.arange(10, dtype=np.float16)]:
+        grid = _BaseRadialGrid(points)
+        assert_equal(grid.points.dtype, np.float64)
+        assert_equal(grid.precision.dtype, np.float64)
+        assert_almost_equal(grid.integrate(np.arange(10.)**2), expected, decimal=12)
+        assert_almost_equal(np.sum(grid.weights), 9., decimal=12)
+
+
+def test_weights_base():
+    r"""Test trapezoidal weights of _BaseRadialGrid against the trapezoidal rule."""
+    grid = _BaseRadialGrid(np.array([0., 0.1, 0.3, 0.7, 1.5, 3.1]))
+    values = np.exp(-grid.points) * np.sin(grid.points)
+    expected = np.sum(0.5 * np.diff(grid.points) * (values[1:] + values[:-1]))
+    assert_almost_equal(np.dot(grid.weights, values), expected, decimal=12)
+    assert_almost_equal(grid.integrate(values), expected, decimal=12)
+    assert_almost_equal(np.sum(grid.weights), 3.1, decimal=12)
+    # spherical weights include 4 pi r^2
+    assert_almost_equal(
+        grid.spherical_weights, 4. * np.pi * grid.points**2. * grid.weights, decimal=12
+    )
+    assert_almost_equal(
+        np.dot(grid.spherical_weights, values),
+        grid.integrate(4. * np.pi * grid.points**2. * values), decimal=12
+    )
+
+
+def test_integrate_many_base():
+    r"""Test integration of several functions at once with _BaseRadialGrid."""
+    grid = UniformRadialGrid(100, 0., 5.)
+    arr = np.column_stack((np.exp(-grid.points), grid.points, np.ones(len(grid))))
+    expected = [grid.integrate(column) for column in arr.T]
+    assert_almost_equal(grid.integrate_many(arr), expected, decimal=12)
+    assert_raises(ValueError, grid.integrate_many, arr[:-1])
+    assert_raises(ValueError, grid.integrate_many, arr[:, 0])
+
+
 def test_raises_integration():
     r"""Test integration over BaseRadialGrid returns an error if dimension aren't specified."""
     grid = _BaseRadialGrid(np.arange(0., 2., 0.000001))
@@ -269,6 +309,27 @@ def test_integration_clenshaw_gaussian():
     assert_almost_equal(value, 1.0 + 3.62 * 1.5 * (np.pi**1.5 / 0.85**2.5), decimal=6)
 
 
+def test_precision_grids():
+    r"""Test the grids cast their points & weights to the data type of the precision policy."""
+    expected = ClenshawRadialGrid(10, 1000, 1000)
+    assert_equal(expected.precision, Precision(np.longdouble))
+    value = np.pi**1.5
+    for dtype in [np.float32, np.float64]:
+        for summation in ["plain", "compensated", "extended"]:
+            grid = ClenshawRadialGrid(10, 1000, 1000, precision=Precision(dtype, summation))
+            assert_equal(grid.points.dtype, dtype)
+            assert_equal(grid.weights.dtype, dtype)
+            assert_almost_equal(grid.points, expected.points, decimal=6)
+            integrand = np.exp(-grid.points**2) * 4.0 * np.pi * grid.points**2
+            assert_almost_equal(grid.integrate(integrand), value, decimal=5)
+    grid = UniformRadialGrid(100, 0., 10., precision=Precision(np.float32))
+    assert_equal(grid.points.dtype, np.float32)
+    grid = CubicGrid(np.zeros(3), np.eye(3) * 0.1, (5, 5, 5), precision=Precision(np.float32))
+    assert_equal(grid.points.dtype, np.float32)
+    assert_equal(grid.weights.dtype, np.float32)
+    assert_raises(TypeError, _BaseRadialGrid, np.arange(5.), np.float32)
+
+
 def test_raises_cubic():
     r"""Test CubicGrid raises error."""
     assert_raises(AttributeError, CubicGrid, "blah", 2., 3.)
@@ -290,6 +351,12 @@ def test_integration_cubic():
     assert_almost_equal(value, 2 * 0.25**3, decimal=3)
     # return error if arr is not the same length.
     assert_raises(ValueError, grid.integrate, np.arange(0., 0.25, 0.1))
+    # check weights
+    assert_almost_equal(grid.weights, np.full(len(grid), 0.25**3 / 25**3), decimal=12)
+    # integrate several functions at once
+    arr = np.column_stack((np.ones(len(grid)), 2 * np.ones(len(grid))))
+    assert_almost_equal(grid.integrate_many(arr), [0.25**3, 2 * 0.25**3], decimal=3)
+    assert_raises(ValueError, grid.integrate_many, np.ones(len(grid)))
 
 
 def test_integration_cubic_gaussian():
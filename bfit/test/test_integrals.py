@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# BFit is a Python library for fitting a convex sum of Gaussian
+# functions to any probability distribution
+#
+# Copyright (C) 2020- The QC-Devs Community
+#
+# This file is part of BFit.
+#
+# BFit is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# BFit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+# ---
+r"""Test bfit.integrals module."""
+
+import numpy as np
+from numpy.testing import assert_almost_equal, assert_raises
+from scipy.integrate import quad
+from scipy.special import gamma
+
+from bfit.integrals import gaussian_moments, gaussian_overlaps
+
+
+def test_raises_integrals():
+    r"""Test raises errors of the analytic integrals."""
+    expons = np.array([1., 2.])
+    assert_raises(ValueError, gaussian_moments, expons, np.array([0]))
+    assert_raises(ValueError, gaussian_moments, expons, np.array([0, 2]))
+    assert_raises(ValueError, gaussian_moments, expons, np.array([0, 1]), -3)
+    assert_raises(ValueError, gaussian_moments, expons, np.array([0, 1]), 0, 0)
+    assert_raises(ValueError, gaussian_overlaps, expons, np.array([0, 1]), expons, [1])
+    assert_raises(ValueError, gaussian_overlaps, expons, [0, 1], expons, [0, 1], 0., 0)
+
+
+def test_gaussian_moments():
+    r"""Test the moments of Gaussian functions against numerical radial integration."""
+    expons = np.array([0.3, 1.7, 0.3, 2.9])
+    angular = np.array([0, 0, 1, 1])
+    for dim in [1, 2, 3]:
+        # surface area of the unit sphere in dim dimensions
+        area = 2. * np.pi**(dim / 2.) / gamma(dim / 2.)
+        for order in [0, 1, 2, -1]:
+            if order <= -dim:
+                continue
+            expected = [
+                area * quad(lambda r, a=a, l=l: r**(order + 2 * l + dim - 1) * np.exp(-a * r**2),
+                            0., np.inf)[0] for a, l in zip(expons, angular)
+            ]
+            assert_almost_equal(gaussian_moments(expons, angular, order, dim), expected,
+                                decimal=8)
+    # normalized s-type Gaussian in three dimensions
+    assert_almost_equal(gaussian_moments(np.array([2.]), [0]) * (2. / np.pi)**1.5, [1.])
+
+
+def test_gaussian_overlaps():
+    r"""Test the overlaps of Gaussian functions on different centers against quadrature."""
+    expons1, angular1 = np.array([0.8, 1.5, 0.6]), np.array([0, 1, 1])
+    expons2, angular2 = np.array([1.1, 0.4]), np.array([0, 1])
+    # one-dimensional centers at 0 and 0.7, the overlaps are integrals over the line
+    expected = np.array([[
+        quad(lambda x, a=a, b=b, la=la, lb=lb: x**(2 * la) * np.exp(-a * x**2) *
+             (x - 0.7)**(2 * lb) * np.exp(-b * (x - 0.7)**2), -np.inf, np.inf)[0]
+        for b, lb in zip(expons2, angular2)] for a, la in zip(expons1, angular1)
+    ])
+    overlaps = gaussian_overlaps(expons1, angular1, expons2, angular2, 0.7**2, dim=1)
+    assert_almost_equal(overlaps, expected, decimal=8)
+    # on the same center, the overlaps are the moments of the product of Gaussian functions
+    overlaps = gaussian_overlaps(expons1, angular1, expons1, angular1)
+    for i, (a, la) in enumerate(zip(expons1, angular1)):
+        expected = gaussian_moments(a + expons1, angular1, order=2 * la)
+        assert_almost_equal(overlaps[i], expected, decimal=10)
@@ -23,7 +23,7 @@
 r"""Test bfit.measure module."""
 
 import numpy as np
-from numpy.testing import assert_almost_equal, assert_raises
+from numpy.testing import assert_almost_equal, assert_equal, assert_raises
 
 from bfit.measure import KLDivergence, SquaredDifference, TsallisDivergence
 
@@ -211,3 +211,44 @@ def test_evaluating_tsallis_derivative_against_kullback_leibler():
     _, deriv_tsallis = measure.evaluate(dens, model, deriv=True)
     _, deriv_kl = measure_kl.evaluate(dens, model, deriv=True)
     assert_almost_equal(deriv_tsallis, deriv_kl, decimal=1)
+
+
+def test_second_derivative_against_finite_difference():
+    r"""Test second derivatives of the measures against finite difference of derivatives."""
+    eps = 1e-6
+    dens = np.linspace(0.1, 1., 100)
+    model = np.linspace(1., 0.2, 100)
+    for measure in [SquaredDifference(), KLDivergence(mask_value=0.),
+                    TsallisDivergence(alpha=1.5, mask_value=0.)]:
+        _, deriv_plus = measure.evaluate(dens, model + eps, deriv=True)
+        _, deriv_minus = measure.evaluate(dens, model - eps, deriv=True)
+        assert_almost_equal(measure.second_derivative(dens, model),
+                            (deriv_plus - deriv_minus) / (2 * eps), decimal=6)
+    # masked points have zero second derivative
+    model[:10] = 1e-14
+    assert_equal(KLDivergence(mask_value=1e-12).second_derivative(dens, model)[:10], 0.)
+    assert_equal(TsallisDivergence(1.5, 1e-12).second_derivative(dens, model)[:10], 0.)
+    assert_raises(ValueError, KLDivergence().second_derivative, dens, model[:-1])
+
+
+def test_evaluate_masking_against_masked_arrays():
+    r"""Test masking of Kullback-Leibler & Tsallis divergences against numpy masked arrays."""
+    dens = np.array([0.0, 0.0, 1e300, 1e-300, np.inf, 1.0, 1e-16, 1e308, 5.0, 0.3, 2.0])
+    model = np.array([0.0, 1e-13, 1e-10, 1e-300, 1.0, np.nan, 5e-324, 1e-5, 1e-12, 0.2, 1e-3])
+    for mask_value in [1e-12, 0.0]:
+        with np.errstate(all="ignore"):
+            ratio = dens / np.ma.masked_less_equal(model, mask_value)
+        # Kullback-Leibler fills masked values with one
+        measure = KLDivergence(mask_value=mask_value)
+        desired = np.ma.filled(ratio, fill_value=1.0)
+        with np.errstate(all="ignore"):
+            value, deriv = measure.evaluate(dens, model, deriv=True)
+            assert_equal(value, dens * np.log(desired))
+        assert_equal(deriv, -desired)
+        # Tsallis fills masked values with zero
+        measure = TsallisDivergence(alpha=1.5, mask_value=mask_value)
+        desired = np.ma.filled(ratio, fill_value=0.0)
+        with np.errstate(all="ignore"):
+            value, deriv = measure.evaluate(dens, model, deriv=True)
+            assert_equal(value, dens * (np.power(desired, 0.5) - 1.0) / 0.5)
+            assert_equal(deriv, -np.power(desired, 1.5))
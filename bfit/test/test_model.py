@@ -22,6 +22,8 @@
 # ---
 r"""Test bfit.model module."""
 
+import tracemalloc
+
 import numpy as np
 from numpy.testing import assert_almost_equal, assert_equal, assert_raises
 
@@ -1052,6 +1054,8 @@ def test_molecular_gaussian_model_sp_integrate_cubic():
     assert_equal(model.nbasis, 2)
     assert_equal(model.assign_basis_to_center(0), 0)
     assert_equal(model.assign_basis_to_center(1), 1)
+    assert_equal(model.assign_basis_to_center(np.array([1, 0, 1])), [1, 0, 1])
+    assert_raises(ValueError, model.assign_basis_to_center, np.array([0, 2]))
     # check integration
     value = model.evaluate(np.array([1., 1.]), np.array([1.25, 4.01]), deriv=False)
     value = grid.integrate(value)
@@ -1070,3 +1074,279 @@ def test_molecular_gaussian_model_sp_integrate_cubic():
     # check integration
     value = model.evaluate(coeffs, expons, deriv=False)
     assert_almost_equal(grid.integrate(value), np.sum(coeffs), decimal=6)
+
+
+def test_gaussian_model_analytic_integrals():
+    r"""Test the analytic moments, integrals & overlaps of Gaussian models against quadrature."""
+    grid = UniformRadialGrid(2000, 0.0, 20.0)
+    weights = grid.weights * 4. * np.pi * grid.points**2
+    coeffs, expons = np.array([1.2, 0.5, 2.1]), np.array([0.6, 2.5, 1.3])
+    for normalize in [True, False]:
+        model = AtomicGaussianDensity(grid.points, num_s=2, num_p=1, normalize=normalize)
+        assert_equal(model.dim, 3)
+        basis = model.evaluate_basis(expons)
+        assert_almost_equal(model.moments(expons), np.dot(weights, basis), decimal=8)
+        assert_almost_equal(model.moments(expons, order=2),
+                            np.dot(weights * grid.points**2, basis), decimal=8)
+        assert_almost_equal(model.integral(coeffs, expons),
+                            np.dot(weights, model.evaluate(coeffs, expons)), decimal=8)
+        assert_almost_equal(model.overlaps(expons), np.dot(basis.T * weights, basis), decimal=8)
+        # derivatives of the moments w.r.t. exponents against finite differences
+        moments = model.moments(expons, order=1, deriv=2)
+        assert_equal(moments.shape, (3, 3))
+        step = 1e-5
+        forward = model.moments(expons + step, order=1, deriv=1)
+        backward = model.moments(expons - step, order=1, deriv=1)
+        assert_almost_equal(moments[1], (forward[0] - backward[0]) / (2 * step), decimal=6)
+        assert_almost_equal(moments[2], (forward[1] - backward[1]) / (2 * step), decimal=6)
+        if normalize:
+            # normalized s-type Gaussians integrate to one for any exponent
+            assert_almost_equal(model.moments(expons, deriv=1)[:, :2], [[1., 1.], [0., 0.]])
+    assert_raises(TypeError, model.moments, expons, 0, -1)
+    # molecular model on a three-dimensional cubic grid
+    grid = CubicGrid(np.zeros(3) - 6., np.eye(3) * 0.15, (80, 80, 80))
+    coords = np.array([[0., 0., -0.5], [0.4, 0., 0.6]])
+    for normalize in [True, False]:
+        model = MolecularGaussianDensity(grid.points, coords, np.array([[1, 1], [1, 0]]),
+                                         normalize=normalize)
+        assert_equal(model.dim, 3)
+        basis = model.evaluate_basis(expons)
+        assert_almost_equal(model.moments(expons), np.dot(grid.weights, basis), decimal=8)
+        assert_almost_equal(model.integral(coeffs, expons),
+                            grid.integrate(model.evaluate(coeffs, expons)), decimal=8)
+        assert_almost_equal(model.overlaps(expons), np.dot(basis.T * grid.weights, basis),
+                            decimal=8)
+        assert_equal(model.moments(expons, deriv=2).shape, (3, 3))
+
+
+def test_gaussian_model_cached_columns():
+    r"""Test evaluation with cached Gaussian columns against evaluation without any cache."""
+    points = np.linspace(0., 5., 50)
+    coeffs = np.array([1.05, 3.62, 0.56, 2.01])
+    expons = np.array([0.50, 1.85, 0.16, 1.36])
+    for normalize in [True, False]:
+        cached = AtomicGaussianDensity(points, num_s=2, num_p=2, normalize=normalize, cache_size=6)
+        model = AtomicGaussianDensity(points, num_s=2, num_p=2, normalize=normalize, cache_size=0)
+        g, dg = model.evaluate(coeffs, expons, deriv=True)
+        # evaluate twice, so the second call uses the cached columns
+        for _ in range(2):
+            assert_almost_equal(cached.evaluate(coeffs, expons), g, decimal=12)
+            assert_almost_equal(cached.evaluate(coeffs, expons, deriv=True)[1], dg, decimal=12)
+        assert_equal(len(cached._columns), 4)
+        # change one exponent & check the least recently used columns are dropped from cache
+        new_expons = np.array([0.50, 1.85, 0.16, 7.5])
+        assert_almost_equal(
+            cached.evaluate(coeffs, new_expons), model.evaluate(coeffs, new_expons), decimal=12
+        )
+        cached.evaluate(coeffs, new_expons * 2.)
+        assert_equal(len(cached._columns), 6)
+        assert 7.5 in cached._columns and 1.36 not in cached._columns
+        # stored columns become the most recently used ones
+        cached._store_columns(expons[[3, 0]], model._gaussian_matrix(expons[[3, 0]]))
+        assert_equal(list(cached._columns)[-2:], [1.36, 0.50])
+        assert_equal(len(cached._columns), 6)
+        assert_almost_equal(cached.evaluate(coeffs, expons), g, decimal=12)
+        cached.clear_cache()
+        assert_equal(len(cached._columns), 0)
+    assert_raises(TypeError, AtomicGaussianDensity, points, None, 1, 0, False, -1)
+
+
+def test_gaussian_model_cache_columns_context():
+    r"""Test the cache of the models is enabled within the context & restored afterwards."""
+    points = np.linspace(0., 5., 50)
+    coeffs, expons = np.array([1.05, 3.62, 0.56, 2.01]), np.array([0.50, 1.85, 0.16, 1.36])
+    model = AtomicGaussianDensity(points, num_s=3, num_p=1)
+    molecular = MolecularGaussianDensity(points[:, None], np.array([[0.], [1.]]),
+                                         np.array([[2, 1], [1, 0]]))
+    for obj in [model, molecular]:
+        g = obj.evaluate(coeffs, expons)
+        with obj._cache_columns(4):
+            for _ in range(2):
+                assert_almost_equal(obj.evaluate(coeffs, expons), g, decimal=12)
+    assert_equal(len(model._columns), 0)
+    assert all(center._cache_size == 0 and len(center._columns) == 0
+               for center in [model] + molecular.center)
+    # a larger cache is kept, and only the columns beyond its size are dropped afterwards
+    model = AtomicGaussianDensity(points, num_s=3, num_p=1, cache_size=2)
+    with model._cache_columns(4):
+        model.evaluate(coeffs, expons)
+        assert_equal(len(model._columns), 4)
+        with model._cache_columns(1):
+            assert_equal(model._cache_size, 4)
+    assert_equal(model._cache_size, 2)
+    assert_equal(list(model._columns), [0.16, 1.36])
+
+
+def test_gaussian_model_cache_disabled_by_default():
+    r"""Test the default models don't cache columns, so their memory doesn't grow."""
+    points = np.linspace(0., 10., 100000)
+    coeffs, expons = np.array([1., 2.]), np.array([0.5, 2.])
+    model = AtomicGaussianDensity(points, num_s=1, num_p=1)
+    molecular = MolecularGaussianDensity(points[:, None], np.zeros((2, 1)),
+                                         np.array([[1, 0], [0, 1]]))
+    for obj in [model, molecular]:
+        obj.evaluate(coeffs, expons, deriv=True)
+        tracemalloc.start()
+        for i in range(50):
+            obj.evaluate(coeffs, expons * (1. + i / 10.), deriv=True)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # nothing is kept between evaluations (a single column takes 800 kB)
+        assert current < 100000
+    assert_equal(len(model._columns), 0)
+    assert all(len(center._columns) == 0 for center in molecular.center)
+
+
+def test_gaussian_model_parent_columns():
+    r"""Test evaluations reuse the columns of a parent basis & only compute the inserted ones."""
+    points = np.linspace(0., 5., 50)
+    coeffs = np.array([1.05, 3.62, 0.56, 2.01])
+    expons = np.array([0.50, 1.85, 0.16, 1.36])
+    parent = np.array([1.36, 0.16, 0.50])
+    model = AtomicGaussianDensity(points, num_s=2, num_p=2, normalize=True)
+    g, dg = model.evaluate(coeffs, expons, deriv=True)
+    basis = model.evaluate_basis(expons)
+    # the columns of the parent basis are reused even though the cache is disabled
+    model._set_parent_columns(parent, model._gaussian_matrix(parent))
+    assert_equal(model._parent_index(expons), [2, -1, 1, 0])
+    assert_almost_equal(model.evaluate(coeffs, expons, deriv=True)[1], dg, decimal=12)
+    assert_almost_equal(model.evaluate_basis(expons), basis, decimal=12)
+    assert_equal(len(model._columns), 0)
+    # only the inserted exponent is computed, the other columns are taken from the parent
+    model._set_parent_columns(parent, np.zeros((50, 3)))
+    assert_equal(np.nonzero(np.any(model.evaluate_basis(expons) != 0., axis=0))[0], [1])
+    assert_equal(np.nonzero(np.any(model._gaussian_matrix(expons) != 0., axis=0))[0], [1])
+    model._set_parent_columns(None)
+    assert_almost_equal(model.evaluate_basis(expons), basis, decimal=12)
+    assert_raises(ValueError, model._set_parent_columns, parent, np.zeros((50, 2)))
+
+
+def test_gaussian_model_evaluate_basis():
+    r"""Test basis functions of Gaussian models against the derivative of evaluate."""
+    points = np.linspace(0., 5., 50)
+    coeffs = np.array([1.05, 3.62, 0.56, 2.01])
+    expons = np.array([0.50, 1.85, 0.16, 1.36])
+    for num_s, num_p in [(4, 0), (0, 4), (1, 3)]:
+        for normalize in [True, False]:
+            model = AtomicGaussianDensity(points, num_s=num_s, num_p=num_p, normalize=normalize)
+            g, dg = model.evaluate(coeffs, expons, deriv=True)
+            out = np.empty((50, 4))
+            assert model.evaluate_basis(expons, out=out) is out
+            assert_almost_equal(out, dg[:, :4], decimal=10)
+            assert_almost_equal(out.dot(coeffs), g, decimal=10)
+            # subset of the basis functions
+            assert_almost_equal(model.evaluate_basis(expons, index=[0, 3]), out[:, [0, 3]])
+    assert_raises(ValueError, model.evaluate_basis, expons[:-1])
+    assert_raises(ValueError, model.evaluate_basis, expons, np.empty((50, 3)))
+    # molecular model on a cubic grid
+    axes = np.array([[0.5, 0.0, 0.0], [0.0, 0.5, 0.0], [0.0, 0.0, 0.5]])
+    grid = CubicGrid(np.array([-2.0, -2.0, -2.0]), axes, (9, 9, 9))
+    coord = np.array([[0., 0., 0.], [0., 0., 1.]])
+    model = MolecularGaussianDensity(grid.points, coord, np.array([[2, 1], [0, 1]]), True)
+    dg = model.evaluate(coeffs, expons, deriv=True)[1]
+    assert_almost_equal(model.evaluate_basis(expons), dg[:, :4], decimal=10)
+    assert_almost_equal(model.evaluate_basis(expons, index=[1, 2]), dg[:, [1, 2]], decimal=10)
+
+
+def test_gaussian_model_second_derivative():
+    r"""Test second derivatives of Gaussian models against finite difference of derivatives."""
+    points = np.linspace(0., 4., 50)
+    coeffs = np.array([1.05, 3.62, 0.56, 2.01])
+    expons = np.array([0.50, 1.85, 0.16, 1.36])
+    eps = 1e-6
+    for num_s, num_p in [(4, 0), (0, 4), (1, 3)]:
+        for normalize in [True, False]:
+            model = AtomicGaussianDensity(points, num_s=num_s, num_p=num_p, normalize=normalize)
+            d2g_ce, d2g_ee = model.second_derivative(coeffs, expons)
+            for index in range(4):
+                step = np.zeros(4)
+                step[index] = eps
+                dg_plus = model.evaluate(coeffs, expons + step, deriv=True)[1]
+                dg_minus = model.evaluate(coeffs, expons - step, deriv=True)[1]
+                finite = (dg_plus - dg_minus) / (2 * eps)
+                # only the derivatives of the same basis function change with its exponent
+                assert_almost_equal(d2g_ce[:, index], finite[:, index], decimal=6)
+                assert_almost_equal(d2g_ee[:, index], finite[:, 4 + index], decimal=5)
+                assert_almost_equal(np.delete(finite, [index, 4 + index], axis=1), 0., decimal=8)
+    # molecular model is made of the second derivatives of each center
+    coord = np.array([[0., 0., 0.], [0., 0., 1.]])
+    points = np.random.uniform(-1., 1., (20, 3))
+    model = MolecularGaussianDensity(points, coord, np.array([[2, 1], [0, 1]]), True)
+    d2g_ce, d2g_ee = model.second_derivative(coeffs, expons)
+    center = AtomicGaussianDensity(points, coord[1], num_s=0, num_p=1, normalize=True)
+    expected = center.second_derivative(coeffs[3:], expons[3:])
+    assert_almost_equal(d2g_ce[:, 3:], expected[0], decimal=10)
+    assert_almost_equal(d2g_ee[:, 3:], expected[1], decimal=10)
+
+
+def test_gaussian_model_vjp():
+    r"""Test vector-Jacobian product of Gaussian models against the derivative of evaluate."""
+    points = np.linspace(0., 5., 50)
+    vector = np.exp(-points) * np.sin(points)
+    coeffs = np.array([1.05, 3.62, 0.56, 2.01])
+    expons = np.array([0.50, 1.85, 0.16, 1.36])
+    for num_s, num_p in [(4, 0), (0, 4), (1, 3)]:
+        for normalize in [True, False]:
+            model = AtomicGaussianDensity(points, num_s=num_s, num_p=num_p, normalize=normalize)
+            dg = model.evaluate(coeffs, expons, deriv=True)[1]
+            for chunk_size in [7, 50, 100]:
+                assert_almost_equal(model.vjp(coeffs, expons, vector, chunk_size),
+                                    dg.T.dot(vector), decimal=10)
+    assert_raises(ValueError, model.vjp, coeffs, expons, vector[:-1])
+    assert_raises(TypeError, model.vjp, coeffs, expons, vector, 0)
+    # molecular model on a cubic grid
+    axes = np.array([[0.5, 0.0, 0.0], [0.0, 0.5, 0.0], [0.0, 0.0, 0.5]])
+    grid = CubicGrid(np.array([-2.0, -2.0, -2.0]), axes, (9, 9, 9))
+    coord = np.array([[0., 0., 0.], [0., 0., 1.]])
+    model = MolecularGaussianDensity(grid.points, coord, np.array([[2, 1], [0, 1]]), True)
+    vector = np.exp(-np.sum(grid.points**2, axis=1))
+    dg = model.evaluate(coeffs, expons, deriv=True)[1]
+    assert_almost_equal(model.vjp(coeffs, expons, vector, 100), dg.T.dot(vector), decimal=10)
+
+
+def test_gaussian_model_screened():
+    r"""Test screened evaluation of Gaussian models against evaluating on all points."""
+    axes = np.array([[0.25, 0.0, 0.0], [0.0, 0.25, 0.0], [0.0, 0.0, 0.25]])
+    grid = CubicGrid(np.array([-4.0, -4.0, -4.0]), axes, (33, 33, 33))
+    coord = np.array([[0., 0., 0.], [2., 0., 1.], [-2., 1., 0.]])
+    basis = np.array([[2, 1], [1, 0], [0, 2]])
+    coeffs = np.array([1.05, 3.62, 0.56, 2.01, 0.23, 1.5])
+    expons = np.array([5.50, 80.5, 7.16, 10.36, 20.2, 6.3])
+    for normalize in [True, False]:
+        model = MolecularGaussianDensity(grid.points, coord, basis, normalize)
+        screened = MolecularGaussianDensity(grid.points, coord, basis, normalize, screen_tol=1e-14)
+        g, dg = model.evaluate(coeffs, expons, deriv=True)
+        assert_almost_equal(screened.evaluate(coeffs, expons), g, decimal=12)
+        assert_almost_equal(screened.evaluate(coeffs, expons, deriv=True)[0], g, decimal=12)
+        assert_almost_equal(screened.evaluate(coeffs, expons, deriv=True)[1], dg, decimal=12)
+        vector = np.ones(len(g))
+        assert_almost_equal(screened.vjp(coeffs, expons, vector), dg.T.dot(vector), decimal=10)
+        # check only points close to each center are evaluated & they are the ones above tolerance
+        for center, es in zip(screened.center, [expons[:3], expons[3:4], expons[4:]]):
+            points = center.screened_points(es)
+            assert len(points) < len(grid.points) // 4
+            assert np.max(center.radii[points]) < 3.
+            assert np.min(center.radii[points]) == np.min(center.radii)
+            outside = np.setdiff1d(np.arange(len(grid.points)), points)
+            assert np.all(np.abs(center.evaluate(np.ones(len(es)), es)[outside]) < 1e-14 * len(es))
+    # atomic model on a radial grid
+    points = np.linspace(0., 10., 200)
+    model = AtomicGaussianDensity(points, num_s=2, num_p=2, normalize=True)
+    screened = AtomicGaussianDensity(points, num_s=2, num_p=2, normalize=True, screen_tol=1e-16)
+    assert_equal(screened.screen_tol, 1e-16)
+    g, dg = model.evaluate(coeffs[:4], expons[:4], deriv=True)
+    assert_almost_equal(screened.evaluate(coeffs[:4], expons[:4], deriv=True)[1], dg, decimal=12)
+    assert_equal(model.screened_points(expons[:4]), np.arange(200))
+    # each basis function is only evaluated inside its own (sorted) cutoff radius
+    expons = np.array([0.5, 80.5, 0.3, 50.])
+    g, dg = model.evaluate(coeffs[:4], expons, deriv=True)
+    sg, sdg = screened.evaluate(coeffs[:4], expons, deriv=True)
+    assert_almost_equal(sg, g, decimal=12)
+    assert_almost_equal(sdg, dg, decimal=12)
+    counts = screened._screened_counts(expons)
+    assert counts[1] < counts[0] // 2 and counts[3] < counts[2] // 2
+    assert_equal(len(screened.screened_points(expons)), np.max(counts))
+    for i, count in enumerate(counts):
+        assert np.all(sdg[screened._order[count:]][:, [i, 4 + i]] == 0.)
+        assert np.all(np.abs(dg[screened._order[count:], i]) < 1e-16)
+    assert_raises(ValueError, AtomicGaussianDensity, points, None, 1, 0, False, 128, -1.)
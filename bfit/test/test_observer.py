@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# BFit is a Python library for fitting a convex sum of Gaussian
+# functions to any probability distribution
+#
+# Copyright (C) 2020- The QC-Devs Community
+#
+# This file is part of BFit.
+#
+# BFit is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# BFit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+# ---
+r"""Test bfit.observer module."""
+
+import io
+import json
+import os
+import tempfile
+
+import numpy as np
+from numpy.testing import assert_equal, assert_raises
+
+from bfit.observer import JSONLinesObserver, NullObserver, Observer, RingBufferObserver
+
+
+def test_observer_abstract():
+    r"""Test the base observer can't be constructed and null observer discards the records."""
+    assert_raises(TypeError, Observer)
+    with NullObserver() as observer:
+        observer.update({"iteration": 1})
+
+
+def test_ring_buffer_observer():
+    r"""Test the ring buffer observer keeps the last records."""
+    assert_raises(ValueError, RingBufferObserver, 0)
+    assert_raises(ValueError, RingBufferObserver, 2.)
+    observer = RingBufferObserver(maxlen=3)
+    assert_equal(observer.maxlen, 3)
+    for i in range(5):
+        observer.update({"iteration": i})
+    assert_equal(len(observer), 3)
+    assert_equal([record["iteration"] for record in observer.records], [2, 3, 4])
+    observer.clear()
+    assert_equal(observer.records, [])
+    # unbounded buffer
+    observer = RingBufferObserver(maxlen=None)
+    for i in range(2000):
+        observer.update({"iteration": i})
+    assert_equal(len(observer), 2000)
+
+
+def test_json_lines_observer():
+    r"""Test the JSON-lines observer writes one record per line to a path or file object."""
+    records = [
+        {"iteration": 1, "fun": np.float64(0.5), "performance": np.arange(2.), "ok": np.bool_(1)},
+        {"iteration": np.int64(2), "fun": None, "delta_fun": np.inf},
+    ]
+    expected = [
+        {"iteration": 1, "fun": 0.5, "performance": [0., 1.], "ok": True},
+        {"iteration": 2, "fun": None, "delta_fun": np.inf},
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "records.jsonl")
+        with JSONLinesObserver(path) as observer:
+            observer.update(records[0])
+            # flushed after each record
+            with open(path) as file:
+                assert_equal(json.loads(file.readline()), expected[0])
+        with JSONLinesObserver(path, mode="a", flush=False) as observer:
+            observer.update(records[1])
+        with open(path) as file:
+            assert_equal([json.loads(line) for line in file], expected)
+        assert_raises(ValueError, JSONLinesObserver, path, mode="r")
+    # file object isn't closed by the observer
+    file = io.StringIO()
+    observer = JSONLinesObserver(file)
+    observer.update(records[1])
+    observer.close()
+    assert not file.closed
+    assert_equal(json.loads(file.getvalue()), expected[1])
+    assert_raises(TypeError, JSONLinesObserver, 1)
+    assert_raises(TypeError, observer.update, {"model": object()})
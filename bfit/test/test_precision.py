@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# BFit is a Python library for fitting a convex sum of Gaussian
+# functions to any probability distribution
+#
+# Copyright (C) 2020- The QC-Devs Community
+#
+# This file is part of BFit.
+#
+# BFit is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# BFit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+# ---
+r"""Test bfit.precision module."""
+
+import numpy as np
+from numpy.testing import assert_almost_equal, assert_equal, assert_raises
+
+from bfit.precision import Precision
+
+
+def test_raises_precision():
+    r"""Test raises errors of Precision."""
+    assert_raises(TypeError, Precision, np.int64)
+    assert_raises(TypeError, Precision, np.float16)
+    assert_raises(ValueError, Precision, np.float64, "kahan")
+    assert_raises(ValueError, Precision, np.float64, None)
+
+
+def test_precision_attributes():
+    r"""Test the attributes and comparison of Precision."""
+    precision = Precision()
+    assert_equal(precision.dtype, np.float64)
+    assert_equal(precision.summation, "plain")
+    assert_equal(Precision(np.float32, "compensated").dtype, np.float32)
+    assert Precision(np.float32, "extended") == Precision("float32", "extended")
+    assert Precision(np.float32) != Precision(np.float64)
+    assert_equal(Precision(np.float32).asarray([1., 2.]).dtype, np.float32)
+
+
+def test_integrate_precision():
+    r"""Test the summation of the integrals of Precision against an exact sum."""
+    # many terms of different magnitudes whose plain float32 sum accumulates rounding errors
+    rng = np.random.default_rng(42)
+    weights = rng.uniform(0., 1., 200000).astype(np.float32)
+    integrand = rng.uniform(0., 1e3, 200000).astype(np.float32)
+    exact = np.dot(weights.astype(np.longdouble), integrand.astype(np.longdouble))
+    for summation in ["plain", "compensated", "extended"]:
+        value = Precision(np.float32, summation).integrate(weights, integrand)
+        assert_almost_equal(value / exact, 1., decimal=5)
+    # compensated and extended summation are accurate to the rounding of the float64 products
+    for summation in ["compensated", "extended"]:
+        value = Precision(np.float32, summation).integrate(weights, integrand)
+        assert_almost_equal(value / exact, 1., decimal=13)
+    # compensated summation of terms cancelling each other
+    value = Precision(np.float64, "compensated").integrate(
+        np.ones(4), np.array([1e20, 1., -1e20, 1.])
+    )
+    assert_equal(value, 2.)
+    assert_equal(Precision(np.float64, "plain").integrate(np.ones(3), np.ones(3)), 3.)
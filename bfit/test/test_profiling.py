@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# BFit is a Python library for fitting a convex sum of Gaussian
+# functions to any probability distribution
+#
+# Copyright (C) 2020- The QC-Devs Community
+#
+# This file is part of BFit.
+#
+# BFit is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 3
+# of the License, or (at your option) any later version.
+#
+# BFit is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>
+#
+# ---
+r"""Test bfit.profiling module."""
+
+import copy
+import pickle
+
+from numpy.testing import assert_equal, assert_raises
+
+from bfit.profiling import _profiled, _profiled_run, Profile
+
+
+class _Counter:
+    r"""Object with profiled methods."""
+
+    _profile = None
+
+    def __init__(self):
+        self.inner = _Counter.__new__(_Counter)
+
+    def _profiled_objects(self):
+        return [self, self.inner]
+
+    @_profiled("evaluate", deriv=1)
+    def evaluate(self, x, deriv=False):
+        return 2 * x
+
+    @_profiled_run("run")
+    def run(self, x):
+        return {"value": self.evaluate(x) + self.evaluate(x, True) + self.inner.evaluate(x)}
+
+
+def test_profile():
+    r"""Test recording the calls in a profile."""
+    profile = Profile()
+    profile.add("b", 1.)
+    profile.add("a", 0.5)
+    profile.add("b", 2.)
+    assert_equal(profile.totals(), {"a": {"calls": 1, "time": 0.5},
+                                    "b": {"calls": 2, "time": 3.}})
+    assert_equal(list(profile.totals()), ["a", "b"])
+    # copies of the fitting objects share the profile, but not pickled ones
+    assert copy.deepcopy([profile])[0] is profile
+    other = pickle.loads(pickle.dumps(profile))
+    other.add("a", 1.)
+    assert_equal(other.totals()["a"], {"calls": 2, "time": 1.5})
+    assert_equal(profile.totals()["a"], {"calls": 1, "time": 0.5})
+    profile.reset()
+    assert_equal(profile.totals(), {})
+
+
+def test_profiled_run():
+    r"""Test profile enabled by the run only, with derivative evaluations recorded separately."""
+    counter = _Counter()
+    assert_equal(counter.run(1.), {"value": 6.})
+    results = counter.run(1., profile=True)
+    assert_equal(results["value"], 6.)
+    assert_equal({key: value["calls"] for key, value in results["profile"].items()},
+                 {"evaluate": 2, "evaluate(deriv)": 1, "run": 1})
+    assert counter._profile is None and counter.inner._profile is None
+    # accumulate the calls of several runs
+    profile = Profile()
+    counter.run(1., profile=profile)
+    results = counter.run(2., profile=profile)
+    assert_equal(results["profile"]["run"]["calls"], 2)
+    assert_equal(results["profile"]["evaluate"]["calls"], 4)
+    assert_raises(TypeError, counter.run, 1., profile="yes")